@@ -0,0 +1,316 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from statistics import median, median_low
+from typing import Dict, List, Optional
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from draw.tkinter_singleton import TkinterSingleton
+from graph_search.algorithms import Algorithm
+from graph_search.batch import get_peak_memory_bytes
+from graph_search.gui_path_processor import GuiPathProcessor
+from graph_search.utils import Button, Options, RenderBackend, Scale, Status, Utils
+
+DEFAULT_GRID_SIZES = [60, 500, 2000]
+# High enough that playback is limited by how fast steps can be applied
+MAXIMUM_STEPS_PER_SECOND = 10_000_000
+# Slower first frames are flagged in the printed results
+FIRST_FRAME_BUDGET_IN_SECONDS = 0.2
+# Scattered walls, so that the goal directed searches have to search instead
+# of walking straight to the goal
+WALL_RATIO = 0.2
+MAP_WALL_TABLE = bytes(
+    ord("@") if value < WALL_RATIO * 256 else ord(".") for value in range(256)
+)
+
+
+@dataclass
+class BenchmarkScenario:
+    grid_size: int
+    algorithm: Algorithm
+    render_backend: RenderBackend
+    playback_seconds: float
+    # Of the search problems, so every run of a scenario searches the same
+    # ones. A single problem can be a few steps long for the goal directed
+    # searches, so results are medians across them.
+    seeds: List[int] = field(default_factory=lambda: [0])
+
+
+# pylint: disable=too-many-instance-attributes
+@dataclass
+class BenchmarkResult:
+    grid_size: int
+    algorithm: str
+    render_backend: str
+    seeds: List[int]
+    startup_seconds: float
+    search_seconds: float
+    expansions: int
+    playback_steps_per_second: float
+    restart_seconds: float
+    reset_seconds: float
+    # Rescaling the grid view for a new tile size, up to its first frame
+    options_change_seconds: float
+    peak_memory_bytes: Optional[int]
+    canvas_calls: int
+
+
+def time_next_callback() -> float:
+    start_time = time.perf_counter()
+    TkinterSingleton.root.run_next_callback()
+    return time.perf_counter() - start_time
+
+
+# A MovingAI map of the seed's walls
+def write_random_map(path: str, grid_size: int, seed: int):
+    random_generator = random.Random(seed)
+    with open(path, "wb") as map_file:
+        map_file.write(
+            f"type octile\nheight {grid_size}\nwidth {grid_size}\nmap\n".encode()
+        )
+        for _ in range(grid_size):
+            map_file.write(
+                random_generator.randbytes(grid_size).translate(MAP_WALL_TABLE) + b"\n"
+            )
+
+
+def run_scenario(scenario: BenchmarkScenario, seed: int) -> BenchmarkResult:
+    with tempfile.TemporaryDirectory() as directory:
+        map_path = os.path.join(directory, f"benchmark_{seed}.map")
+        write_random_map(map_path, scenario.grid_size, seed)
+        return run_problem(scenario, seed, map_path)
+
+
+def run_problem(
+    scenario: BenchmarkScenario, seed: int, map_path: str
+) -> BenchmarkResult:
+    TkinterSingleton.start(title="Benchmark", headless=True)
+    current_options = Utils.get_default_options_dictionary()
+    current_options[Options.MAP_PATH] = map_path
+    current_options[Options.ALGORITHM] = scenario.algorithm
+    current_options[Options.RENDER_BACKEND] = scenario.render_backend
+    current_options[Options.SEED] = seed
+
+    start_time = time.perf_counter()
+    gui_path_processor = GuiPathProcessor(current_options)
+    gui_path_processor.process()
+    startup_seconds = time.perf_counter() - start_time
+    statistics = gui_path_processor.search_steps.statistics
+
+    status_dictionary = gui_path_processor.status_dictionary
+    Scale.on_scale(current_options, MAXIMUM_STEPS_PER_SECOND)
+    Button.play_forward(status_dictionary)
+    start_time = time.perf_counter()
+    while (
+        not status_dictionary[Status.ON_PAUSE]
+        and time.perf_counter() - start_time < scenario.playback_seconds
+    ):
+        TkinterSingleton.root.run_next_callback()
+    playback_seconds = time.perf_counter() - start_time
+    played_steps = gui_path_processor.current_path_index
+
+    Button.pause(status_dictionary)
+    Button.restart(status_dictionary)
+    restart_seconds = time_next_callback()
+    Button.reset(status_dictionary)
+    reset_seconds = time_next_callback()
+    # One pixel larger tiles, which rescales the whole grid view
+    tile_size = current_options[Options.TILE_SIZE]
+    current_options[Options.TILE_SIZE] = Dim2D(tile_size.x + 1, tile_size.y + 1)
+    status_dictionary[Status.OPTIONS_SET] = True
+    time_next_callback()
+    options_change_seconds = gui_path_processor.profiler.first_frame_times_in_seconds[
+        -1
+    ]
+
+    return BenchmarkResult(
+        grid_size=scenario.grid_size,
+        algorithm=scenario.algorithm.name.lower(),
+        render_backend=scenario.render_backend.name.lower(),
+        seeds=[seed],
+        startup_seconds=startup_seconds,
+        search_seconds=statistics.elapsed_seconds,
+        expansions=statistics.expansions,
+        playback_steps_per_second=played_steps / playback_seconds,
+        restart_seconds=restart_seconds,
+        reset_seconds=reset_seconds,
+        options_change_seconds=options_change_seconds,
+        peak_memory_bytes=get_peak_memory_bytes(),
+        canvas_calls=TkinterSingleton.canvas.number_of_calls,
+    )
+
+
+# The peak memory is the largest of any problem, as that is what has to fit
+def get_median_result(results: List[BenchmarkResult]) -> BenchmarkResult:
+    peak_memory_bytes = [
+        result.peak_memory_bytes
+        for result in results
+        if result.peak_memory_bytes is not None
+    ]
+    return BenchmarkResult(
+        grid_size=results[0].grid_size,
+        algorithm=results[0].algorithm,
+        render_backend=results[0].render_backend,
+        seeds=[seed for result in results for seed in result.seeds],
+        startup_seconds=median(result.startup_seconds for result in results),
+        search_seconds=median(result.search_seconds for result in results),
+        expansions=median_low(result.expansions for result in results),
+        playback_steps_per_second=median(
+            result.playback_steps_per_second for result in results
+        ),
+        restart_seconds=median(result.restart_seconds for result in results),
+        reset_seconds=median(result.reset_seconds for result in results),
+        options_change_seconds=median(
+            result.options_change_seconds for result in results
+        ),
+        peak_memory_bytes=max(peak_memory_bytes) if peak_memory_bytes else None,
+        canvas_calls=median_low(result.canvas_calls for result in results),
+    )
+
+
+# Every problem gets a fresh process so the singleton state and the peak
+# memory of one problem do not leak into the next
+def run_scenarios(scenarios: List[BenchmarkScenario]) -> List[BenchmarkResult]:
+    results = []
+    for scenario in scenarios:
+        seed_results = []
+        for seed in scenario.seeds:
+            with multiprocessing.Pool(processes=1, maxtasksperchild=1) as pool:
+                seed_results.append(pool.apply(run_scenario, (scenario, seed)))
+        result = get_median_result(seed_results)
+        print_result(result)
+        results.append(result)
+    return results
+
+
+def get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results: List[BenchmarkResult], output_path: str):
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "git_commit": get_git_commit(),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [asdict(result) for result in results],
+    }
+    with open(output_path, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+
+
+def print_result(result: BenchmarkResult):
+    peak_memory = (
+        "n/a"
+        if result.peak_memory_bytes is None
+        else f"{result.peak_memory_bytes / 2**20:.0f} MB"
+    )
+    over_budget = (
+        " (over the first frame budget)"
+        if max(result.startup_seconds, result.options_change_seconds)
+        > FIRST_FRAME_BUDGET_IN_SECONDS
+        else ""
+    )
+    print(
+        f"{result.grid_size}x{result.grid_size} {result.algorithm} "
+        f"{result.render_backend}, median of {len(result.seeds)} problems: "
+        f"startup {result.startup_seconds:.3f} s, "
+        f"search {result.search_seconds:.3f} s ({result.expansions} expansions), "
+        f"playback {result.playback_steps_per_second:.0f} steps/s, "
+        f"restart {result.restart_seconds * 1000:.1f} ms, "
+        f"reset {result.reset_seconds * 1000:.1f} ms, "
+        f"options change {result.options_change_seconds * 1000:.1f} ms, "
+        f"peak {peak_memory}{over_budget}"
+    )
+
+
+def compare_results(results: List[BenchmarkResult], baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as baseline_file:
+        baseline_results: Dict[tuple, dict] = {
+            (result["grid_size"], result["algorithm"], result["render_backend"]): result
+            for result in json.load(baseline_file)["results"]
+        }
+    print(f"Compared with {baseline_path} (new / old):")
+    for result in results:
+        key = (result.grid_size, result.algorithm, result.render_backend)
+        if key not in baseline_results:
+            continue
+        ratios = []
+        for name in (
+            "startup_seconds",
+            "search_seconds",
+            "playback_steps_per_second",
+            "restart_seconds",
+            "reset_seconds",
+            "options_change_seconds",
+            "peak_memory_bytes",
+        ):
+            old_value, new_value = baseline_results[key].get(name), getattr(
+                result, name
+            )
+            if old_value and new_value is not None:
+                ratios.append(f"{name} x{new_value / old_value:.2f}")
+        print(f"{key[0]}x{key[0]} {key[1]} {key[2]}: " + ", ".join(ratios))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Headless benchmarks of the graph search GUI hot paths",
+    )
+    parser.add_argument("--grid-sizes", type=int, nargs="+", default=DEFAULT_GRID_SIZES)
+    parser.add_argument(
+        "--algorithms",
+        nargs="+",
+        choices=[algorithm.name.lower() for algorithm in Algorithm],
+        default=[algorithm.name.lower() for algorithm in Algorithm],
+    )
+    parser.add_argument(
+        "--render-backends",
+        nargs="+",
+        choices=[render_backend.name.lower() for render_backend in RenderBackend],
+        default=[render_backend.name.lower() for render_backend in RenderBackend],
+    )
+    parser.add_argument("--playback-seconds", type=float, default=2.0)
+    parser.add_argument(
+        "--seeds", type=int, default=5, help="search problems per scenario"
+    )
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier JSON output to compare against")
+    arguments = parser.parse_args()
+
+    scenarios = [
+        BenchmarkScenario(
+            grid_size,
+            Algorithm[algorithm.upper()],
+            RenderBackend[render_backend.upper()],
+            arguments.playback_seconds,
+            list(range(arguments.first_seed, arguments.first_seed + arguments.seeds)),
+        )
+        for grid_size in arguments.grid_sizes
+        for algorithm in arguments.algorithms
+        for render_backend in arguments.render_backends
+    ]
+    results = run_scenarios(scenarios)
+    save_results(results, arguments.output)
+    print(f"Saved {len(results)} results to {arguments.output}")
+    if arguments.compare:
+        compare_results(results, arguments.compare)
@@ -9,3 +9,19 @@ class Colour(Enum):
     GREEN = "green"
     BLACK = "black"
     PURPLE = "purple"
+
+    # Same values as the Tk colour names
+    @property
+    def rgb(self) -> bytes:
+        return _RGB_VALUES[self]
+
+
+_RGB_VALUES = {
+    Colour.RED: bytes((255, 0, 0)),
+    Colour.BLUE: bytes((0, 0, 255)),
+    Colour.WHITE: bytes((255, 255, 255)),
+    Colour.BROWN: bytes((165, 42, 42)),
+    Colour.GREEN: bytes((0, 255, 0)),
+    Colour.BLACK: bytes((0, 0, 0)),
+    Colour.PURPLE: bytes((160, 32, 240)),
+}
@@ -0,0 +1,176 @@
+import struct
+import zlib
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+from draw.pixel_buffer import PixelBuffer
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Compressed data is cut into chunks of about this size
+PNG_DATA_CHUNK_SIZE = 1 << 16
+PNG_COMPRESSION_LEVEL = 6
+
+
+def get_png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+    )
+
+
+def get_png_header(width: int, height: int) -> bytes:
+    # 8 bit RGB, no interlacing
+    return get_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+
+# Each cell becomes a scale x scale block of pixels
+def get_scaled_rows(
+    pixel_buffer: PixelBuffer, first_row: int, end_row: int, scale: int = 1
+) -> Iterator[bytes]:
+    row_size = pixel_buffer.grid_size.x * PixelBuffer.BYTES_PER_PIXEL
+    pixels = pixel_buffer.pixels
+    for row in range(first_row, end_row):
+        row_pixels = bytes(pixels[row * row_size : (row + 1) * row_size])
+        if scale > 1:
+            if np is not None:
+                row_pixels = (
+                    np.frombuffer(row_pixels, dtype=np.uint8)
+                    .reshape(-1, PixelBuffer.BYTES_PER_PIXEL)
+                    .repeat(scale, axis=0)
+                    .tobytes()
+                )
+            else:
+                row_pixels = b"".join(
+                    row_pixels[offset : offset + PixelBuffer.BYTES_PER_PIXEL] * scale
+                    for offset in range(0, row_size, PixelBuffer.BYTES_PER_PIXEL)
+                )
+        for _ in range(scale):
+            yield row_pixels
+
+
+# Compresses row by row, so only the compressor state and one chunk are held
+def get_png_data_chunks(rows: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(PNG_COMPRESSION_LEVEL)
+    pending = bytearray()
+    for row in rows:
+        # Filter type 0, the rows are stored as they are
+        pending += compressor.compress(b"\x00" + row)
+        if len(pending) >= PNG_DATA_CHUNK_SIZE:
+            yield bytes(pending)
+            pending.clear()
+    pending += compressor.flush()
+    if pending:
+        yield bytes(pending)
+
+
+def write_ppm(path: str, pixel_buffer: PixelBuffer, scale: int = 1):
+    grid_size = pixel_buffer.grid_size
+    with open(path, "wb") as image_file:
+        image_file.write(
+            f"P6 {grid_size.x * scale} {grid_size.y * scale} 255\n".encode()
+        )
+        for row in get_scaled_rows(pixel_buffer, 0, grid_size.y, scale):
+            image_file.write(row)
+
+
+def write_png(path: str, pixel_buffer: PixelBuffer, scale: int = 1):
+    grid_size = pixel_buffer.grid_size
+    with open(path, "wb") as image_file:
+        image_file.write(PNG_SIGNATURE)
+        image_file.write(get_png_header(grid_size.x * scale, grid_size.y * scale))
+        for data in get_png_data_chunks(
+            get_scaled_rows(pixel_buffer, 0, grid_size.y, scale)
+        ):
+            image_file.write(get_png_chunk(b"IDAT", data))
+        image_file.write(get_png_chunk(b"IEND", b""))
+
+
+# Animated PNG written one frame at a time. Frames after the first only need
+# to cover the rows that changed, and the frame count is patched in on close.
+class ApngWriter:
+    def __init__(
+        self,
+        path: str,
+        pixel_buffer_width: int,
+        pixel_buffer_height: int,
+        scale: int = 1,
+        frame_delay_in_milliseconds: int = 40,
+    ):
+        self.scale = scale
+        self.frame_delay_in_milliseconds = frame_delay_in_milliseconds
+        self.number_of_frames = 0
+        self._width = pixel_buffer_width * scale
+        self._sequence_number = 0
+        self._file: Optional[BinaryIO] = open(path, "wb")
+        self._file.write(PNG_SIGNATURE)
+        self._file.write(get_png_header(self._width, pixel_buffer_height * scale))
+        self._animation_control_offset = self._file.tell()
+        self._file.write(self._get_animation_control())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _get_animation_control(self) -> bytes:
+        # Loops forever
+        return get_png_chunk(b"acTL", struct.pack(">II", self.number_of_frames, 0))
+
+    def _get_next_sequence_number(self) -> int:
+        sequence_number = self._sequence_number
+        self._sequence_number += 1
+        return sequence_number
+
+    def add_frame(
+        self, pixel_buffer: PixelBuffer, first_row: int = 0, end_row: int = None
+    ):
+        if self.number_of_frames == 0 or end_row is None:
+            first_row, end_row = 0, pixel_buffer.grid_size.y
+        if end_row <= first_row:
+            return
+        self._file.write(
+            get_png_chunk(
+                b"fcTL",
+                struct.pack(
+                    ">IIIIIHHBB",
+                    self._get_next_sequence_number(),
+                    self._width,
+                    (end_row - first_row) * self.scale,
+                    0,
+                    first_row * self.scale,
+                    self.frame_delay_in_milliseconds,
+                    1000,
+                    0,  # Keep the canvas as it is after the frame
+                    0,  # Replace the frame area instead of blending
+                ),
+            )
+        )
+        for data in get_png_data_chunks(
+            get_scaled_rows(pixel_buffer, first_row, end_row, self.scale)
+        ):
+            if self.number_of_frames == 0:
+                self._file.write(get_png_chunk(b"IDAT", data))
+            else:
+                self._file.write(
+                    get_png_chunk(
+                        b"fdAT",
+                        struct.pack(">I", self._get_next_sequence_number()) + data,
+                    )
+                )
+        self.number_of_frames += 1
+
+    def close(self):
+        if self._file is None:
+            return
+        self._file.write(get_png_chunk(b"IEND", b""))
+        self._file.seek(self._animation_control_offset)
+        self._file.write(self._get_animation_control())
+        self._file.close()
+        self._file = None
@@ -0,0 +1,120 @@
+from typing import List, Set, Tuple
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from draw.colour import Colour
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+# Cells laid out row by row (cell = y * width + x), each cell_fill long, moved
+# to a grid of another size. Cells in both grids keep their bytes, new edge
+# rows and columns get cell_fill and cut ones are dropped.
+def get_resized_cells(
+    cells: bytes, grid_size: Dim2D, new_grid_size: Dim2D, cell_fill: bytes = b"\0"
+) -> bytearray:
+    cell_length = len(cell_fill)
+    resized_cells = bytearray(cell_fill * (new_grid_size.x * new_grid_size.y))
+    row_length = min(grid_size.x, new_grid_size.x) * cell_length
+    for y in range(min(grid_size.y, new_grid_size.y)):
+        offset = y * grid_size.x * cell_length
+        new_offset = y * new_grid_size.x * cell_length
+        resized_cells[new_offset : new_offset + row_length] = cells[
+            offset : offset + row_length
+        ]
+    return resized_cells
+
+
+# One RGB pixel per grid cell, flushed to the screen as strips of dirty rows
+class PixelBuffer:
+    BYTES_PER_PIXEL = 3
+    # Dirty rows closer than this are sent as one strip to save Tk calls
+    MAXIMUM_STRIP_GAP = 4
+
+    def __init__(self, grid_size: Dim2D, colour: Colour):
+        self.grid_size = grid_size
+        self._row_size = grid_size.x * PixelBuffer.BYTES_PER_PIXEL
+        self._pixels = bytearray(colour.rgb * (grid_size.x * grid_size.y))
+        self._dirty_rows: Set[int] = set(range(grid_size.y))
+
+    @property
+    def pixels(self) -> bytearray:
+        return self._pixels
+
+    def fill(self, colour: Colour):
+        self._pixels[:] = colour.rgb * (self.grid_size.x * self.grid_size.y)
+        self._dirty_rows.update(range(self.grid_size.y))
+
+    # New cells get the colour
+    def resize(self, grid_size: Dim2D, colour: Colour):
+        self._pixels = get_resized_cells(
+            self._pixels, self.grid_size, grid_size, colour.rgb
+        )
+        self.grid_size = grid_size
+        self._row_size = grid_size.x * PixelBuffer.BYTES_PER_PIXEL
+        self._dirty_rows = set(range(grid_size.y))
+
+    def set_cell(self, cell: int, colour: Colour):
+        offset = cell * PixelBuffer.BYTES_PER_PIXEL
+        self._pixels[offset : offset + PixelBuffer.BYTES_PER_PIXEL] = colour.rgb
+        self._dirty_rows.add(cell // self.grid_size.x)
+
+    # Colours every cell whose mask byte is non zero
+    def set_mask(self, mask: bytes, colour: Colour):
+        if np is not None:
+            pixels = np.frombuffer(self._pixels, dtype=np.uint8).reshape(
+                -1, PixelBuffer.BYTES_PER_PIXEL
+            )
+            is_masked = np.frombuffer(mask, dtype=np.uint8) != 0
+            pixels[is_masked] = list(colour.rgb)
+            self._dirty_rows.update(
+                np.flatnonzero(
+                    is_masked.reshape(self.grid_size.y, self.grid_size.x).any(axis=1)
+                ).tolist()
+            )
+            return
+        for cell, value in enumerate(mask):
+            if value:
+                self.set_cell(cell, colour)
+
+    def mark_rows_dirty(self, first_row: int, end_row: int):
+        self._dirty_rows.update(range(first_row, end_row))
+
+    def get_cell_rgb(self, cell: int) -> bytes:
+        offset = cell * PixelBuffer.BYTES_PER_PIXEL
+        return bytes(self._pixels[offset : offset + PixelBuffer.BYTES_PER_PIXEL])
+
+    # Returns (first_row, end_row) pairs and marks everything clean
+    def pop_dirty_strips(self) -> List[Tuple[int, int]]:
+        strips: List[Tuple[int, int]] = []
+        for row in sorted(self._dirty_rows):
+            if strips and row - strips[-1][1] <= PixelBuffer.MAXIMUM_STRIP_GAP:
+                strips[-1] = (strips[-1][0], row + 1)
+            else:
+                strips.append((row, row + 1))
+        self._dirty_rows.clear()
+        return strips
+
+    def get_ppm_strip(self, first_row: int, end_row: int) -> bytes:
+        header = f"P6 {self.grid_size.x} {end_row - first_row} 255\n".encode()
+        return (
+            header + self._pixels[first_row * self._row_size : end_row * self._row_size]
+        )
+
+    # The cells of columns first_column to end_column of the rows, as one PPM
+    def get_ppm_window(
+        self, first_column: int, end_column: int, first_row: int, end_row: int
+    ) -> bytes:
+        if first_column == 0 and end_column == self.grid_size.x:
+            return self.get_ppm_strip(first_row, end_row)
+        header = f"P6 {end_column - first_column} {end_row - first_row} 255\n"
+        pixels, row_size = memoryview(self._pixels), self._row_size
+        first_offset = first_column * PixelBuffer.BYTES_PER_PIXEL
+        end_offset = end_column * PixelBuffer.BYTES_PER_PIXEL
+        return header.encode() + b"".join(
+            pixels[row * row_size + first_offset : row * row_size + end_offset]
+            for row in range(first_row, end_row)
+        )
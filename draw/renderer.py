@@ -0,0 +1,500 @@
+import tkinter as tk
+from abc import ABC, abstractmethod
+from typing import List, Sequence
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from draw.colour import Colour
+from draw.pixel_buffer import PixelBuffer, get_resized_cells
+from draw.viewport import Viewport
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+# Maps each of the given palette indices to 1 and the rest to 0, for
+# bytes.translate over a whole index array
+def get_membership_table(palette_indices: Sequence[int]) -> bytes:
+    return bytes(1 if index in palette_indices else 0 for index in range(256))
+
+
+def get_replacement_table(palette_indices: Sequence[int], palette_index: int) -> bytes:
+    return bytes(
+        palette_index if index in palette_indices else index for index in range(256)
+    )
+
+
+# Sets the index of every cell whose mask byte is non zero
+def set_masked_indices(cell_indices: bytearray, mask: bytes, palette_index: int):
+    if np is not None:
+        np.frombuffer(cell_indices, dtype=np.uint8)[
+            np.frombuffer(mask, dtype=np.uint8) != 0
+        ] = palette_index
+        return
+    for cell, value in enumerate(mask):
+        if value:
+            cell_indices[cell] = palette_index
+
+
+# A grid of flat cells (cell = y * width + x), each holding an index into a
+# palette of colours and all starting at index 0. Cells are recoloured in
+# batches, and all cells of one index at once by replacing the index or its
+# palette colour.
+class Renderer(ABC):
+    # The smallest tile a viewport may zoom out to
+    MINIMUM_TILE_SIDE = 1
+
+    def __init__(self, grid_size: Dim2D, tile_size: Dim2D, palette: Sequence[Colour]):
+        self.grid_size = grid_size
+        self.tile_size = tile_size
+        # Copied since palette colours can be changed
+        self.palette = list(palette)
+        self.number_of_applied_cells = 0
+
+    @property
+    def number_of_cells(self) -> int:
+        return self.grid_size.x * self.grid_size.y
+
+    @abstractmethod
+    def apply(self, cells: Sequence[int], palette_indices: Sequence[int]):
+        pass
+
+    @abstractmethod
+    def fill(self, palette_index: int):
+        pass
+
+    # Sets every cell whose mask byte is non zero, such as the blocked cells
+    def apply_mask(self, mask: bytes, palette_index: int):
+        cells = [cell for cell, value in enumerate(mask) if value]
+        self.apply(cells, [palette_index] * len(cells))
+
+    # Moves every cell at one of the old indices to the new one
+    @abstractmethod
+    def replace(self, old_palette_indices: Sequence[int], palette_index: int):
+        pass
+
+    # Recolours every cell at the index
+    @abstractmethod
+    def set_palette_colour(self, palette_index: int, colour: Colour):
+        pass
+
+    # Redraws what the viewport shows after it pans or zooms
+    def update_viewport(self):
+        pass
+
+    # Cells in both grids keep their indices and new edge cells start at
+    # index 0. A viewport is resized first.
+    def resize(self, grid_size: Dim2D):
+        self.grid_size = grid_size
+
+
+# Discards everything, so only the cost outside drawing is left
+class NullRenderer(Renderer):
+    def apply(self, cells, palette_indices):
+        self.number_of_applied_cells += len(cells)
+
+    def fill(self, palette_index):
+        pass
+
+    def apply_mask(self, mask, palette_index):
+        pass
+
+    def replace(self, old_palette_indices, palette_index):
+        pass
+
+    def set_palette_colour(self, palette_index, colour):
+        self.palette[palette_index] = colour
+
+
+# Palette index per cell kept in memory, for headless runs. The RGB raster is
+# only built when asked for.
+class RasterRenderer(Renderer):
+    def __init__(self, grid_size, tile_size, palette):
+        super().__init__(grid_size, tile_size, palette)
+        self.palette_indices = np.zeros((grid_size.y, grid_size.x), dtype=np.uint8)
+        self._flat_palette_indices = self.palette_indices.reshape(-1)
+
+    @property
+    def raster(self):
+        return np.array([list(colour.rgb) for colour in self.palette], dtype=np.uint8)[
+            self.palette_indices
+        ]
+
+    def apply(self, cells, palette_indices):
+        if not cells:
+            return
+        self._flat_palette_indices[np.asarray(cells, dtype=np.int64)] = palette_indices
+        self.number_of_applied_cells += len(cells)
+
+    def fill(self, palette_index):
+        self.palette_indices[:] = palette_index
+
+    def apply_mask(self, mask, palette_index):
+        self._flat_palette_indices[np.frombuffer(mask, dtype=np.uint8) != 0] = (
+            palette_index
+        )
+
+    def replace(self, old_palette_indices, palette_index):
+        self.palette_indices[np.isin(self.palette_indices, old_palette_indices)] = (
+            palette_index
+        )
+
+    def set_palette_colour(self, palette_index, colour):
+        self.palette[palette_index] = colour
+
+    def resize(self, grid_size):
+        palette_indices = np.zeros((grid_size.y, grid_size.x), dtype=np.uint8)
+        height = min(grid_size.y, self.grid_size.y)
+        width = min(grid_size.x, self.grid_size.x)
+        palette_indices[:height, :width] = self.palette_indices[:height, :width]
+        super().resize(grid_size)
+        self.palette_indices = palette_indices
+        self._flat_palette_indices = palette_indices.reshape(-1)
+
+
+# One rectangle item per visible tile, tagged with its palette index so all
+# rectangles of an index are recoloured or moved to another index with one
+# itemconfig. The indices of all cells are kept in a bytearray, so panning
+# only touches the rectangles that change.
+# pylint: disable=too-many-instance-attributes
+class CanvasRectanglesRenderer(Renderer):
+    RECTANGLE_TAG = "rectangle"
+    PALETTE_TAG_PREFIX = "palette_"
+    # Keeps the number of rectangles bounded when zoomed out
+    MINIMUM_TILE_SIDE = 4
+    # Tcl lambda taking the canvas, the columns, rows, tile width and height,
+    # a palette index per rectangle, the palette colours and the tags,
+    # returning the new item ids
+    CREATE_RECTANGLES_SCRIPT = """
+        {canvas columns rows width height indices colours tag prefix} {
+            set rectangles {}
+            set index 0
+            for {set row 0} {$row < $rows} {incr row} {
+                set y [expr {$row * $height + 1}]
+                for {set column 0} {$column < $columns} {incr column} {
+                    set x [expr {$column * $width + 1}]
+                    set palette_index [lindex $indices $index]
+                    set colour [lindex $colours $palette_index]
+                    lappend rectangles [$canvas create rectangle $x $y \\
+                        [expr {$x + $width}] [expr {$y + $height}] \\
+                        -fill $colour -outline $colour \\
+                        -tags [list $tag $prefix$palette_index]]
+                    incr index
+                }
+            }
+            return $rectangles
+        }
+    """
+
+    def __init__(self, grid_size, tile_size, palette, canvas, viewport=None):
+        super().__init__(grid_size, tile_size, palette)
+        self.canvas = canvas
+        self.viewport = (
+            Viewport.get_full_view(grid_size, tile_size)
+            if viewport is None
+            else viewport
+        )
+        self._cell_indices = bytearray(self.number_of_cells)
+        # Row by row over the visible tiles, with the index each one shows
+        self._rectangles: List[int] = []
+        self._rectangle_indices = bytearray()
+        self._origin = Dim2D(0, 0)
+        self._visible_size = Dim2D(0, 0)
+        self._tile_size = Dim2D(0, 0)
+        self.update_viewport()
+
+    @staticmethod
+    def get_tags(palette_index: int):
+        return (
+            CanvasRectanglesRenderer.RECTANGLE_TAG,
+            f"{CanvasRectanglesRenderer.PALETTE_TAG_PREFIX}{palette_index}",
+        )
+
+    def apply(self, cells, palette_indices):
+        origin, visible_size = self._origin, self._visible_size
+        cell_indices, grid_width = self._cell_indices, self.grid_size.x
+        for cell, palette_index in zip(cells, palette_indices):
+            cell_indices[cell] = palette_index
+            y, x = divmod(cell, grid_width)
+            column, row = x - origin.x, y - origin.y
+            if 0 <= column < visible_size.x and 0 <= row < visible_size.y:
+                self._set_rectangle(row * visible_size.x + column, palette_index)
+        self.number_of_applied_cells += len(cells)
+
+    def fill(self, palette_index):
+        self._cell_indices[:] = bytes([palette_index]) * self.number_of_cells
+        self._rectangle_indices[:] = bytes([palette_index]) * len(self._rectangles)
+        self._configure_tag(CanvasRectanglesRenderer.RECTANGLE_TAG, palette_index)
+
+    def apply_mask(self, mask, palette_index):
+        set_masked_indices(self._cell_indices, mask, palette_index)
+        self._refresh_rectangles()
+
+    def replace(self, old_palette_indices, palette_index):
+        table = get_replacement_table(old_palette_indices, palette_index)
+        self._cell_indices = self._cell_indices.translate(table)
+        self._rectangle_indices = self._rectangle_indices.translate(table)
+        for old_palette_index in old_palette_indices:
+            self._configure_tag(
+                CanvasRectanglesRenderer.get_tags(old_palette_index)[1], palette_index
+            )
+
+    def set_palette_colour(self, palette_index, colour):
+        self.palette[palette_index] = colour
+        self._configure_tag(
+            CanvasRectanglesRenderer.get_tags(palette_index)[1], palette_index
+        )
+
+    # Colours and retags every item matching the tag or id in one call
+    def _configure_tag(self, tag_or_item, palette_index: int):
+        colour_value = self.palette[palette_index].value
+        self.canvas.itemconfig(
+            tag_or_item,
+            fill=colour_value,
+            outline=colour_value,
+            tags=CanvasRectanglesRenderer.get_tags(palette_index),
+        )
+
+    def resize(self, grid_size):
+        self._cell_indices = get_resized_cells(
+            self._cell_indices, self.grid_size, grid_size
+        )
+        super().resize(grid_size)
+        self.update_viewport()
+
+    def _set_rectangle(self, rectangle: int, palette_index: int):
+        if self._rectangle_indices[rectangle] != palette_index:
+            self._rectangle_indices[rectangle] = palette_index
+            self._configure_tag(self._rectangles[rectangle], palette_index)
+
+    # Rectangles are only created again when the zoom changes their number,
+    # otherwise they stay in place and take the indices of their new cells. A
+    # new tile size alone scales them all in one call.
+    def update_viewport(self):
+        viewport = self.viewport
+        self._origin = Dim2D(viewport.origin.x, viewport.origin.y)
+        visible_size, tile_size = viewport.visible_size, viewport.tile_size
+        if visible_size == self._visible_size:
+            if tile_size != self._tile_size:
+                # Rectangles start one pixel in, so they are scaled from there
+                self.canvas.scale(
+                    CanvasRectanglesRenderer.RECTANGLE_TAG,
+                    1,
+                    1,
+                    tile_size.x / self._tile_size.x,
+                    tile_size.y / self._tile_size.y,
+                )
+                self._tile_size = Dim2D(tile_size.x, tile_size.y)
+            self._refresh_rectangles()
+            return
+        self._visible_size = visible_size
+        self._tile_size = Dim2D(tile_size.x, tile_size.y)
+        self.canvas.delete(CanvasRectanglesRenderer.RECTANGLE_TAG)
+        self._rectangle_indices = bytearray().join(
+            self._cell_indices[first_cell : first_cell + visible_size.x]
+            for first_cell in self._get_visible_row_starts()
+        )
+        self._rectangles = self._create_rectangles()
+
+    def _get_visible_row_starts(self) -> range:
+        grid_width, origin = self.grid_size.x, self._origin
+        return range(
+            origin.y * grid_width + origin.x,
+            (origin.y + self._visible_size.y) * grid_width,
+            grid_width,
+        )
+
+    # Creates the rectangles of the visible tiles, row by row. A real canvas
+    # gets them all from one Tcl evaluation instead of a call per rectangle.
+    def _create_rectangles(self) -> List[int]:
+        canvas, visible_size, tile_size = (
+            self.canvas,
+            self._visible_size,
+            self._tile_size,
+        )
+        if isinstance(canvas, tk.Canvas):
+            return [
+                int(rectangle)
+                for rectangle in canvas.tk.splitlist(
+                    canvas.tk.call(
+                        "apply",
+                        CanvasRectanglesRenderer.CREATE_RECTANGLES_SCRIPT,
+                        str(canvas),
+                        visible_size.x,
+                        visible_size.y,
+                        tile_size.x,
+                        tile_size.y,
+                        tuple(self._rectangle_indices),
+                        tuple(colour.value for colour in self.palette),
+                        CanvasRectanglesRenderer.RECTANGLE_TAG,
+                        CanvasRectanglesRenderer.PALETTE_TAG_PREFIX,
+                    )
+                )
+            ]
+        rectangles = []
+        for row in range(visible_size.y):
+            for column in range(visible_size.x):
+                palette_index = self._rectangle_indices[len(rectangles)]
+                colour_value = self.palette[palette_index].value
+                rectangles.append(
+                    canvas.create_rectangle(
+                        column * tile_size.x + 1,
+                        row * tile_size.y + 1,
+                        (column + 1) * tile_size.x + 1,
+                        (row + 1) * tile_size.y + 1,
+                        fill=colour_value,
+                        outline=colour_value,
+                        tags=CanvasRectanglesRenderer.get_tags(palette_index),
+                    )
+                )
+        return rectangles
+
+    def _refresh_rectangles(self):
+        visible_width, cell_indices = self._visible_size.x, self._cell_indices
+        for row, first_cell in enumerate(self._get_visible_row_starts()):
+            first_rectangle = row * visible_width
+            for column in range(visible_width):
+                self._set_rectangle(
+                    first_rectangle + column, cell_indices[first_cell + column]
+                )
+
+
+# Cells are pixels of a one pixel per cell image of the visible cells, which
+# Tk scales up to the tile size. The whole grid stays in the pixel buffer and
+# only its dirty visible rows cross the Tcl bridge.
+# pylint: disable=too-many-instance-attributes
+class PixelBufferRenderer(Renderer):
+    def __init__(
+        self, grid_size, tile_size, palette, canvas, toolkit=tk, viewport=None
+    ):
+        super().__init__(grid_size, tile_size, palette)
+        self.canvas = canvas
+        self.toolkit = toolkit
+        self.viewport = (
+            Viewport.get_full_view(grid_size, tile_size)
+            if viewport is None
+            else viewport
+        )
+        self.pixel_buffer = PixelBuffer(grid_size, self.palette[0])
+        self._cell_indices = bytearray(self.number_of_cells)
+        self._source_image = None
+        self._image = None
+        self._image_item = None
+        self._origin = Dim2D(0, 0)
+        self._visible_size = Dim2D(0, 0)
+        self._tile_size = Dim2D(0, 0)
+        self.update_viewport()
+
+    def apply(self, cells, palette_indices):
+        set_cell, cell_indices, palette = (
+            self.pixel_buffer.set_cell,
+            self._cell_indices,
+            self.palette,
+        )
+        for cell, palette_index in zip(cells, palette_indices):
+            cell_indices[cell] = palette_index
+            set_cell(cell, palette[palette_index])
+        self.number_of_applied_cells += len(cells)
+        self._flush()
+
+    def fill(self, palette_index):
+        self._cell_indices[:] = bytes([palette_index]) * self.number_of_cells
+        self.pixel_buffer.fill(self.palette[palette_index])
+        self._flush()
+
+    def apply_mask(self, mask, palette_index):
+        set_masked_indices(self._cell_indices, mask, palette_index)
+        self.pixel_buffer.set_mask(mask, self.palette[palette_index])
+        self._flush()
+
+    def replace(self, old_palette_indices, palette_index):
+        mask = self._cell_indices.translate(get_membership_table(old_palette_indices))
+        self._cell_indices = self._cell_indices.translate(
+            get_replacement_table(old_palette_indices, palette_index)
+        )
+        self.pixel_buffer.set_mask(mask, self.palette[palette_index])
+        self._flush()
+
+    def set_palette_colour(self, palette_index, colour):
+        self.palette[palette_index] = colour
+        self.pixel_buffer.set_mask(
+            self._cell_indices.translate(get_membership_table([palette_index])),
+            colour,
+        )
+        self._flush()
+
+    def resize(self, grid_size):
+        self.pixel_buffer.resize(grid_size, self.palette[0])
+        self._cell_indices = get_resized_cells(
+            self._cell_indices, self.grid_size, grid_size
+        )
+        super().resize(grid_size)
+        self.update_viewport()
+
+    # The images are only created again when the zoom changes their size
+    def update_viewport(self):
+        viewport = self.viewport
+        self._origin = Dim2D(viewport.origin.x, viewport.origin.y)
+        visible_size, tile_size = viewport.visible_size, viewport.tile_size
+        if visible_size != self._visible_size or tile_size != self._tile_size:
+            self._visible_size = visible_size
+            self._tile_size = Dim2D(tile_size.x, tile_size.y)
+            if self._image_item is not None:
+                self.canvas.delete(self._image_item)
+            self._source_image = self.toolkit.PhotoImage(
+                width=visible_size.x, height=visible_size.y
+            )
+            self._image = self.toolkit.PhotoImage(
+                width=visible_size.x * tile_size.x,
+                height=visible_size.y * tile_size.y,
+            )
+            self._image_item = self.canvas.create_image(
+                1, 1, image=self._image, anchor="nw"
+            )
+        self.pixel_buffer.mark_rows_dirty(
+            self._origin.y, self._origin.y + visible_size.y
+        )
+        self._flush()
+
+    def _flush(self):
+        source_image, image = self._source_image, self._image
+        origin, visible_size, tile_size = (
+            self._origin,
+            self._visible_size,
+            self._tile_size,
+        )
+        for first_row, end_row in self.pixel_buffer.pop_dirty_strips():
+            first_row = max(first_row, origin.y)
+            end_row = min(end_row, origin.y + visible_size.y)
+            if first_row >= end_row:
+                continue
+            source_image.tk.call(
+                source_image,
+                "put",
+                self.pixel_buffer.get_ppm_window(
+                    origin.x, origin.x + visible_size.x, first_row, end_row
+                ),
+                "-format",
+                "ppm",
+                "-to",
+                0,
+                first_row - origin.y,
+            )
+            image.tk.call(
+                image,
+                "copy",
+                source_image,
+                "-from",
+                0,
+                first_row - origin.y,
+                visible_size.x,
+                end_row - origin.y,
+                "-to",
+                0,
+                (first_row - origin.y) * tile_size.y,
+                "-zoom",
+                tile_size.x,
+                tile_size.y,
+            )
@@ -0,0 +1,206 @@
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+
+# Display-free stand-ins for the tkinter classes TkinterSingleton creates, so
+# the GUI code can run headless (benchmarks, batch runs). Canvases only count
+# their items and calls instead of drawing.
+class Widget:
+    def __init__(self, master=None, *_, **options):
+        self.master = master
+        self.options: Dict[str, Any] = dict(options)
+
+    def configure(self, **options):
+        self.options.update(options)
+
+    config = configure
+
+    def cget(self, key):
+        return self.options.get(key)
+
+    def pack(self, **_):
+        pass
+
+    def grid(self, **_):
+        pass
+
+    def rowconfigure(self, *_, **__):
+        pass
+
+    def columnconfigure(self, *_, **__):
+        pass
+
+    def bind(self, *_, **__):
+        pass
+
+    def focus_set(self):
+        pass
+
+    def grab_set(self):
+        pass
+
+    def destroy(self):
+        pass
+
+
+class Tk(Widget):
+    def __init__(self, *_, **options):
+        super().__init__(None, **options)
+        self.callbacks: Deque[Tuple[int, Any]] = deque()
+        self._is_destroyed = False
+
+    def title(self, *_):
+        pass
+
+    def resizable(self, **_):
+        pass
+
+    def geometry(self, *_):
+        pass
+
+    def protocol(self, *_):
+        pass
+
+    def after(self, in_milliseconds, callback_function):
+        self.callbacks.append((in_milliseconds, callback_function))
+
+    # Runs the oldest scheduled callback straight away, ignoring its delay
+    def run_next_callback(self) -> bool:
+        if not self.callbacks:
+            return False
+        _, callback_function = self.callbacks.popleft()
+        callback_function()
+        return True
+
+    def update(self):
+        pass
+
+    def update_idletasks(self):
+        pass
+
+    def mainloop(self):
+        while not self._is_destroyed and self.run_next_callback():
+            pass
+
+    def destroy(self):
+        self._is_destroyed = True
+
+
+class Toplevel(Tk):
+    pass
+
+
+class Canvas(Widget):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self.number_of_items = 0
+        self.number_of_calls = 0
+        self._last_item_id = 0
+
+    def _create_item(self) -> int:
+        self.number_of_calls += 1
+        self.number_of_items += 1
+        self._last_item_id += 1
+        return self._last_item_id
+
+    def create_rectangle(self, *_, **__) -> int:
+        return self._create_item()
+
+    def create_image(self, *_, **__) -> int:
+        return self._create_item()
+
+    def create_text(self, *_, **__) -> int:
+        return self._create_item()
+
+    def itemconfig(self, *_, **__):
+        self.number_of_calls += 1
+
+    itemconfigure = itemconfig
+
+    def coords(self, *_):
+        self.number_of_calls += 1
+
+    def move(self, *_):
+        self.number_of_calls += 1
+
+    def scale(self, *_):
+        self.number_of_calls += 1
+
+    def delete(self, *items):
+        self.number_of_calls += 1
+        if "all" in items:
+            self.number_of_items = 0
+        else:
+            self.number_of_items -= len(items)
+
+
+class Frame(Widget):
+    pass
+
+
+class Button(Widget):
+    pass
+
+
+class Label(Widget):
+    pass
+
+
+class OptionMenu(Widget):
+    pass
+
+
+class Text(Widget):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self._text = ""
+
+    def delete(self, *_):
+        self._text = ""
+
+    def insert(self, _, text):
+        self._text += str(text)
+
+    def get(self, *_):
+        return self._text
+
+
+class Scale(Widget):
+    def __init__(self, master=None, **options):
+        super().__init__(master, **options)
+        self._value = options.get("from_", 0)
+
+    def set(self, value):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+
+class StringVar:
+    def __init__(self, master=None, value=""):
+        self.master = master
+        self._value = value
+
+    def set(self, value):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+
+class PhotoImage:
+    def __init__(self, width=0, height=0, **_):
+        self._width = width
+        self._height = height
+        self.tk = self
+        self.number_of_calls = 0
+
+    def call(self, *_):
+        self.number_of_calls += 1
+
+    def width(self) -> int:
+        return self._width
+
+    def height(self) -> int:
+        return self._height
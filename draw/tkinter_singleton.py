@@ -4,24 +4,37 @@ from typing import Any, Dict
 from dekespo_ai_sdk.core.dimensions import Dim2D
 from dekespo_ai_sdk.core.utils import error_print
 
-from draw.widget import ButtonData, PackData, TextData, LabelData, WidgetData, ScaleData
+from draw.widget import (
+    ButtonData,
+    PackData,
+    TextData,
+    LabelData,
+    WidgetData,
+    ScaleData,
+    OptionMenuData,
+)
 from draw.colour import Colour
+from draw import stub_toolkit
 
 # TODO: Should not use singleton but inherit an abstract class with fundamental methods
 # TODO: Singleton should have been in a different structure hence disabled mypy
 # mypy: ignore-errors
 class TkinterSingleton:
+    # Swapped for the stub toolkit to run without a display
+    toolkit = tk
     root = None
     canvas = None
 
     grid_frames: Dict[Dim2D, tk.Frame] = {}
     canvas_rectangles: Dict[Dim2D, Any] = {}
     widgets: Dict[int, Any] = {}
+    widget_variables: Dict[int, Any] = {}
 
     @staticmethod
-    def start(title, resizeable=(False, False)):
+    def start(title, resizeable=(False, False), headless=False):
         if TkinterSingleton.root is None:
-            TkinterSingleton.root = tk.Tk()
+            TkinterSingleton.toolkit = stub_toolkit if headless else tk
+            TkinterSingleton.root = TkinterSingleton.toolkit.Tk()
             TkinterSingleton.root.title(title)
             TkinterSingleton.root.resizable(width=resizeable[0], height=resizeable[1])
         else:
@@ -34,7 +47,9 @@ class TkinterSingleton:
     @staticmethod
     def create_canvas(size=Dim2D(1, 1)):
         if TkinterSingleton.canvas is None:
-            TkinterSingleton.canvas = tk.Canvas(TkinterSingleton.root)
+            TkinterSingleton.canvas = TkinterSingleton.toolkit.Canvas(
+                TkinterSingleton.root
+            )
             TkinterSingleton.resize_canvas(size)
         else:
             error_print("Canvas is already created")
@@ -57,7 +72,7 @@ class TkinterSingleton:
             frame = TkinterSingleton.grid_frames[grid_index]
             frame.configure(background=colour.value)
         else:
-            frame = tk.Frame(
+            frame = TkinterSingleton.toolkit.Frame(
                 TkinterSingleton.root,
                 width=frame_size.x,
                 height=frame_size.y,
@@ -91,9 +106,22 @@ class TkinterSingleton:
     def clear_rectangle():
         TkinterSingleton.canvas_rectangles = {}
 
+    @staticmethod
+    def clear_canvas():
+        TkinterSingleton.canvas.delete("all")
+        TkinterSingleton.clear_rectangle()
+
+    @staticmethod
+    def bind_canvas(sequence, callback_function):
+        TkinterSingleton.canvas.bind(sequence, callback_function)
+
+    @staticmethod
+    def bind_root(sequence, callback_function):
+        TkinterSingleton.root.bind(sequence, callback_function)
+
     @staticmethod
     def create_button_with_grid(button_data: ButtonData):
-        button = tk.Button(
+        button = TkinterSingleton.toolkit.Button(
             TkinterSingleton.root,
             text=button_data.text,
             command=lambda: button_data.callback_function(button_data.parameters),
@@ -112,7 +140,7 @@ class TkinterSingleton:
     def create_frame_with_pack(pack_data: PackData, root=None):
         if root is None:
             root = TkinterSingleton.root
-        frame = tk.Frame(root)
+        frame = TkinterSingleton.toolkit.Frame(root)
         frame.pack(side=pack_data.side, fill=pack_data.fill, expand=pack_data.expand)
         return frame
 
@@ -129,6 +157,8 @@ class TkinterSingleton:
             widget = TkinterSingleton.create_label(root, widget_data)
         elif isinstance(widget_data, ScaleData):
             widget = TkinterSingleton.create_scale(root, widget_data)
+        elif isinstance(widget_data, OptionMenuData):
+            widget = TkinterSingleton.create_option_menu(root, widget_data)
         widget.pack(
             side=widget_data.pack_data.side,
             fill=widget_data.pack_data.fill,
@@ -138,7 +168,7 @@ class TkinterSingleton:
 
     @staticmethod
     def create_button(root, button_data: ButtonData):
-        return tk.Button(
+        return TkinterSingleton.toolkit.Button(
             root,
             text=button_data.text,
             command=lambda: button_data.callback_function(button_data.parameters),
@@ -146,7 +176,7 @@ class TkinterSingleton:
 
     @staticmethod
     def create_text(root, text_data: TextData):
-        text = tk.Text(
+        text = TkinterSingleton.toolkit.Text(
             root, height=text_data.number_of_lines, width=text_data.number_of_characters
         )
         text.delete(1.0, "end-1c")
@@ -155,24 +185,39 @@ class TkinterSingleton:
 
     @staticmethod
     def create_label(root, label_data: LabelData):
-        return tk.Label(
+        return TkinterSingleton.toolkit.Label(
             root,
             text=label_data.text,
         )
 
     @staticmethod
     def create_scale(root, scale_data: ScaleData):
-        return tk.Scale(
+        return TkinterSingleton.toolkit.Scale(
             root,
             label=scale_data.text,
             from_=scale_data.from_,
             to=scale_data.to,
             orient=scale_data.orientation,
+            length=scale_data.length,
             command=lambda steps_per_second: scale_data.callback_function(
                 scale_data.parameters, steps_per_second
             ),
         )
 
+    @staticmethod
+    def create_option_menu(root, option_menu_data: OptionMenuData):
+        variable = TkinterSingleton.toolkit.StringVar(
+            root, value=option_menu_data.text
+        )
+        TkinterSingleton.widget_variables[option_menu_data.id_] = variable
+        return TkinterSingleton.toolkit.OptionMenu(
+            root, variable, *option_menu_data.choices
+        )
+
+    @staticmethod
+    def get_widget_variable_value(id_):
+        return TkinterSingleton.widget_variables[id_].get()
+
     @staticmethod
     def update(callback_function, in_milliseconds=1000):
         TkinterSingleton.root.after(in_milliseconds, callback_function)
@@ -187,7 +232,7 @@ class TkinterSingleton:
 
     @staticmethod
     def create_menu_window(title):
-        menu_window = tk.Toplevel(TkinterSingleton.root)
+        menu_window = TkinterSingleton.toolkit.Toplevel(TkinterSingleton.root)
         menu_window.title(title)
         menu_window.resizable(width=False, height=False)
         return menu_window
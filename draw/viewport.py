@@ -0,0 +1,124 @@
+from typing import Optional
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+
+def get_ceiling_division(dividend: int, divisor: int) -> int:
+    return -(-dividend // divisor)
+
+
+# The part of the grid shown on a canvas of fixed size: the top left visible
+# cell and the pixels per cell. Renderers only draw the visible cells, so the
+# drawing cost follows the screen size instead of the grid size.
+class Viewport:
+    MAXIMUM_TILE_SIDE = 64
+
+    def __init__(
+        self,
+        grid_size: Dim2D,
+        tile_size: Dim2D,
+        screen_size: Dim2D,
+        minimum_tile_side: int = 1,
+    ):
+        self.grid_size = grid_size
+        self.screen_size = screen_size
+        self.minimum_tile_side = minimum_tile_side
+        # Copied since zooming changes it
+        self.tile_size = Dim2D(tile_size.x, tile_size.y)
+        self.origin = Dim2D(0, 0)
+        # Panned pixels smaller than a tile are kept for the next pan
+        self._pixel_remainder = Dim2D(0, 0)
+
+    # The whole grid at its tile size, for canvases sized to the grid
+    @staticmethod
+    def get_full_view(grid_size: Dim2D, tile_size: Dim2D) -> "Viewport":
+        return Viewport(grid_size, tile_size, tile_size.vectoral_multiply(grid_size))
+
+    # The number of visible columns and rows, counting a partly visible last
+    # one. It does not depend on the origin, which stops one screen short of
+    # the grid's end.
+    @property
+    def visible_size(self) -> Dim2D:
+        return Dim2D(
+            min(
+                self.grid_size.x,
+                get_ceiling_division(self.screen_size.x, self.tile_size.x),
+            ),
+            min(
+                self.grid_size.y,
+                get_ceiling_division(self.screen_size.y, self.tile_size.y),
+            ),
+        )
+
+    # The cell under a canvas pixel, or None past the grid's end
+    def get_cell_position(self, pixel: Dim2D) -> Optional[Dim2D]:
+        position = Dim2D(
+            self.origin.x + pixel.x // self.tile_size.x,
+            self.origin.y + pixel.y // self.tile_size.y,
+        )
+        if 0 <= position.x < self.grid_size.x and 0 <= position.y < self.grid_size.y:
+            return position
+        return None
+
+    # For a new grid, tile or screen size. The origin stays where it is as far
+    # as the new sizes let it.
+    def resize(self, grid_size: Dim2D, tile_size: Dim2D, screen_size: Dim2D):
+        self.grid_size = grid_size
+        self.tile_size = Dim2D(tile_size.x, tile_size.y)
+        self.screen_size = screen_size
+        self._pixel_remainder = Dim2D(0, 0)
+        self._move_origin(self.origin)
+
+    # Returns True if the origin moved
+    def pan(self, offset_in_pixels: Dim2D) -> bool:
+        pixels = offset_in_pixels + self._pixel_remainder
+        # Truncated towards zero, so small drags either way add up
+        cells = Dim2D(
+            int(pixels.x / self.tile_size.x), int(pixels.y / self.tile_size.y)
+        )
+        self._pixel_remainder = pixels - cells.vectoral_multiply(self.tile_size)
+        return self._move_origin(self.origin + cells)
+
+    # Doubles the tile size per step in, halves it per step out, and keeps the
+    # cell under the anchor pixel (the screen centre by default) in place.
+    # Returns True if anything changed.
+    def zoom(self, steps: int, anchor_in_pixels: Optional[Dim2D] = None) -> bool:
+        if anchor_in_pixels is None:
+            anchor_in_pixels = Dim2D(self.screen_size.x // 2, self.screen_size.y // 2)
+        factor = 2.0**steps
+        tile_size = Dim2D(
+            self._get_zoomed_tile_side(self.tile_size.x, factor),
+            self._get_zoomed_tile_side(self.tile_size.y, factor),
+        )
+        if tile_size == self.tile_size:
+            return False
+        anchor_cell = Dim2D(
+            self.origin.x + anchor_in_pixels.x // self.tile_size.x,
+            self.origin.y + anchor_in_pixels.y // self.tile_size.y,
+        )
+        self.tile_size = tile_size
+        self._pixel_remainder = Dim2D(0, 0)
+        self._move_origin(
+            Dim2D(
+                anchor_cell.x - anchor_in_pixels.x // tile_size.x,
+                anchor_cell.y - anchor_in_pixels.y // tile_size.y,
+            )
+        )
+        return True
+
+    def _get_zoomed_tile_side(self, tile_side: int, factor: float) -> int:
+        return max(
+            self.minimum_tile_side,
+            min(Viewport.MAXIMUM_TILE_SIDE, round(tile_side * factor)),
+        )
+
+    def _move_origin(self, origin: Dim2D) -> bool:
+        visible_size = self.visible_size
+        origin = Dim2D(
+            max(0, min(origin.x, self.grid_size.x - visible_size.x)),
+            max(0, min(origin.y, self.grid_size.y - visible_size.y)),
+        )
+        if origin == self.origin:
+            return False
+        self.origin = origin
+        return True
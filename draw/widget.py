@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import Any, Union
+from typing import Any, List, Union
 
 from dekespo_ai_sdk.core.dimensions import Dim2D
 
@@ -49,6 +49,12 @@ class _ScaleDataBase:
     from_: int
     to: int
     orientation: str
+    length: int = 100
+
+
+@dataclass
+class _OptionMenuDataBase:
+    choices: List[str]
 
 
 @dataclass
@@ -69,3 +75,8 @@ class LabelData(_WidgetDataDefaults, WidgetData):
 @dataclass
 class ScaleData(_WidgetDataDefaults, _ScaleDataBase, WidgetData):
     pass
+
+
+@dataclass
+class OptionMenuData(_WidgetDataDefaults, _OptionMenuDataBase, WidgetData):
+    pass
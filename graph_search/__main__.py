@@ -1,17 +1,241 @@
+import argparse
+import time
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
 from draw.tkinter_singleton import TkinterSingleton
 
+from .algorithms import Algorithm, HeuristicType
+from .batch import (
+    create_batch_runs,
+    create_seeded_problem,
+    run_batch,
+    write_batch_results,
+)
+from .export import FrameFormat, export_trace_frames
+from .grid_map import GridMapLoader
 from .gui_path_processor import GuiPathProcessor
+from .stream_server import run_stream_server
+from .trace_file import TRACE_FILE_SUFFIX, MappedSearchTrace, write_trace_file
+from .utils import Options, Utils
 
 
-def main():
+def run_gui(arguments):
     TkinterSingleton.start(title="Graph Search Program")
 
-    gui_path_processor = GuiPathProcessor()
+    options = Utils.get_default_options_dictionary()
+    if arguments.map:
+        options[Options.MAP_PATH] = arguments.map
+    if arguments.trace_cache:
+        options[Options.TRACE_CACHE_PATH] = arguments.trace_cache
+    if arguments.trace:
+        options[Options.TRACE_PATH] = arguments.trace
+    gui_path_processor = GuiPathProcessor(options)
     gui_path_processor.process()
 
     TkinterSingleton.loop()
-    gui_path_processor.depth_first_search.kill_thread()
-    gui_path_processor.depth_first_search.join()
+    gui_path_processor.stop_search()
+    if arguments.profile:
+        gui_path_processor.profiler.export(arguments.profile)
+
+
+def run_batch_experiment(arguments):
+    batch_runs = create_batch_runs(
+        list(range(arguments.first_seed, arguments.first_seed + arguments.seeds)),
+        arguments.grid_sizes,
+        [Algorithm[algorithm.upper()] for algorithm in arguments.algorithms],
+        HeuristicType[arguments.heuristic.upper()],
+        arguments.trace_memory,
+        arguments.map,
+        (
+            GridMapLoader.load_scenarios(arguments.scenarios)
+            if arguments.scenarios
+            else None
+        ),
+        arguments.trace_cache,
+    )
+    start_time = time.perf_counter()
+    number_of_results = write_batch_results(
+        run_batch(batch_runs, arguments.workers), arguments.output
+    )
+    print(
+        f"Saved {number_of_results} runs to {arguments.output} in "
+        f"{time.perf_counter() - start_time:.1f} s"
+    )
+
+
+def run_serve(arguments):
+    run_stream_server(
+        create_batch_runs(
+            list(range(arguments.first_seed, arguments.first_seed + arguments.seeds)),
+            arguments.grid_sizes,
+            [Algorithm[algorithm.upper()] for algorithm in arguments.algorithms],
+            HeuristicType[arguments.heuristic.upper()],
+            map_path=arguments.map,
+            scenarios=(
+                GridMapLoader.load_scenarios(arguments.scenarios)
+                if arguments.scenarios
+                else None
+            ),
+        ),
+        arguments.host,
+        arguments.port,
+        arguments.steps_per_frame,
+        arguments.frame_delay,
+    )
+
+
+def run_export(arguments):
+    if arguments.trace:
+        search_trace = MappedSearchTrace(arguments.trace)
+        trace_key, blocked = search_trace.key, search_trace.read_blocked()
+    else:
+        grid_map = GridMapLoader.load(arguments.map) if arguments.map else None
+        grid_size = (
+            Dim2D(arguments.grid_sizes[0], arguments.grid_sizes[0])
+            if grid_map is None
+            else grid_map.grid_size
+        )
+        graph_data, start_point, goal_point = create_seeded_problem(
+            arguments.first_seed, grid_size, grid_map
+        )
+        search_arguments = (
+            graph_data,
+            Algorithm[arguments.algorithms[0].upper()],
+            HeuristicType[arguments.heuristic.upper()],
+            start_point,
+            goal_point,
+        )
+        trace_key = Utils.get_trace_key(*search_arguments, arguments.first_seed)
+        search_trace = Utils.create_search_trace(*search_arguments)
+        blocked = graph_data.grid_graph.blocked
+    if arguments.export.lower().endswith(TRACE_FILE_SUFFIX):
+        if arguments.trace:
+            search_trace = search_trace.load()
+        write_trace_file(arguments.export, search_trace, trace_key, blocked)
+        print(f"Saved {len(search_trace)} steps to {arguments.export}")
+        return
+    frame_format = (
+        FrameFormat.APNG
+        if arguments.export.lower().endswith((".png", ".apng"))
+        else FrameFormat[arguments.frame_format.upper()]
+    )
+    number_of_frames = export_trace_frames(
+        search_trace,
+        arguments.export,
+        frame_format,
+        arguments.steps_per_frame,
+        arguments.scale,
+        arguments.frame_delay,
+        blocked,
+    )
+    print(f"Exported {number_of_frames} frames to {arguments.export}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m graph_search")
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="save the playback profile on exit, as CSV for a .csv path or JSON",
+    )
+    parser.add_argument(
+        "--map",
+        metavar="PATH",
+        help="obstacle map as a MovingAI .map, a PGM image or a 2D .npy array",
+    )
+    parser.add_argument(
+        "--trace-cache",
+        metavar="DIRECTORY",
+        help="keep finished search traces here and replay them instead of rerunning",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="replay a saved .trace file, memory mapped, in the GUI or export mode",
+    )
+    batch_group = parser.add_argument_group("batch mode")
+    batch_group.add_argument(
+        "--batch", action="store_true", help="run searches headless across processes"
+    )
+    batch_group.add_argument("--seeds", type=int, default=100)
+    batch_group.add_argument("--first-seed", type=int, default=0)
+    batch_group.add_argument("--grid-sizes", type=int, nargs="+", default=[60])
+    batch_group.add_argument(
+        "--algorithms",
+        nargs="+",
+        choices=[algorithm.name.lower() for algorithm in Algorithm],
+        default=[algorithm.name.lower() for algorithm in Algorithm],
+    )
+    batch_group.add_argument(
+        "--heuristic",
+        choices=[heuristic_type.name.lower() for heuristic_type in HeuristicType],
+        default=HeuristicType.MANHATTAN.name.lower(),
+    )
+    batch_group.add_argument(
+        "--scenarios",
+        metavar="PATH",
+        help="MovingAI .scen file for --map, replacing the seeded start and goal",
+    )
+    batch_group.add_argument("--workers", type=int, help="defaults to the CPU count")
+    batch_group.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="also record each run's peak Python allocations (slower)",
+    )
+    batch_group.add_argument(
+        "--output",
+        default="batch_results.csv",
+        help="CSV for a .csv path, JSON lines otherwise",
+    )
+    export_group = parser.add_argument_group(
+        "export mode",
+        "replays the first seed, grid size and algorithm of the batch options",
+    )
+    export_group.add_argument(
+        "--export",
+        metavar="PATH",
+        help="animated PNG for a .png or .apng path, a trace file for a .trace "
+        "path, otherwise a frame directory",
+    )
+    export_group.add_argument(
+        "--frame-format",
+        choices=[FrameFormat.PNG.name.lower(), FrameFormat.PPM.name.lower()],
+        default=FrameFormat.PNG.name.lower(),
+    )
+    export_group.add_argument("--steps-per-frame", type=int, default=1000)
+    export_group.add_argument(
+        "--scale", type=int, default=1, help="pixels per cell side"
+    )
+    export_group.add_argument(
+        "--frame-delay", type=int, default=40, help="animation delay in milliseconds"
+    )
+    serve_group = parser.add_argument_group(
+        "serve mode",
+        "streams the runs of the batch options one after another, paced by the "
+        "export frame options",
+    )
+    serve_group.add_argument(
+        "--serve",
+        action="store_true",
+        help="stream searches headless to viewers over TCP or a WebSocket",
+    )
+    serve_group.add_argument("--host", default="127.0.0.1")
+    serve_group.add_argument(
+        "--port", type=int, default=8765, help="0 picks a free port"
+    )
+    arguments = parser.parse_args()
+    if arguments.scenarios and not arguments.map:
+        parser.error("--scenarios needs --map")
+
+    if arguments.batch:
+        run_batch_experiment(arguments)
+    elif arguments.serve:
+        run_serve(arguments)
+    elif arguments.export:
+        run_export(arguments)
+    else:
+        run_gui(arguments)
 
 
 if __name__ == "__main__":
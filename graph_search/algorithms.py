@@ -0,0 +1,527 @@
+import heapq
+import itertools
+import math
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum, auto
+from typing import Callable, Dict, Generator, Iterable, List, Optional, Tuple, Type
+
+from dekespo_ai_sdk.core.neighbour import NeighbourType
+
+from .grid_graph import NEIGHBOUR_DIRECTIONS, GridGraph, np
+from .hierarchy import get_cluster_abstraction
+from .jump_points import JumpPointFinder, get_jump_distances
+from .trace import SearchTrace
+
+
+class Algorithm(Enum):
+    DEPTH_FIRST_SEARCH = auto()
+    BREADTH_FIRST_SEARCH = auto()
+    DIJKSTRA = auto()
+    A_STAR = auto()
+    GREEDY_BEST_FIRST_SEARCH = auto()
+    LIFELONG_PLANNING_A_STAR = auto()
+    JUMP_POINT_SEARCH = auto()
+    HIERARCHICAL_A_STAR = auto()
+
+
+class HeuristicType(Enum):
+    MANHATTAN = auto()
+    EUCLIDEAN = auto()
+    CHEBYSHEV = auto()
+    NONE = auto()
+
+
+# (cell, goal_cell, grid_width) -> estimated distance
+HeuristicFunction = Callable[[int, int, int], float]
+SearchSteps = Generator[int, None, List[int]]
+
+
+class Heuristic:
+    @staticmethod
+    def manhattan(cell: int, goal_cell: int, width: int) -> float:
+        return abs(cell % width - goal_cell % width) + abs(
+            cell // width - goal_cell // width
+        )
+
+    @staticmethod
+    def euclidean(cell: int, goal_cell: int, width: int) -> float:
+        return math.hypot(
+            cell % width - goal_cell % width, cell // width - goal_cell // width
+        )
+
+    @staticmethod
+    def chebyshev(cell: int, goal_cell: int, width: int) -> float:
+        return max(
+            abs(cell % width - goal_cell % width),
+            abs(cell // width - goal_cell // width),
+        )
+
+    @staticmethod
+    def none(*_) -> float:
+        return 0
+
+
+HEURISTICS: Dict[HeuristicType, HeuristicFunction] = {
+    HeuristicType.MANHATTAN: Heuristic.manhattan,
+    HeuristicType.EUCLIDEAN: Heuristic.euclidean,
+    HeuristicType.CHEBYSHEV: Heuristic.chebyshev,
+    HeuristicType.NONE: Heuristic.none,
+}
+
+
+@dataclass
+class SearchStatistics:
+    algorithm: Algorithm
+    expansions: int
+    path_length: int
+    elapsed_seconds: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.algorithm.name.lower()}: {self.expansions} expansions, "
+            f"path {self.path_length}, {self.elapsed_seconds * 1000:.1f} ms"
+        )
+
+
+class SearchStrategy(ABC):
+    algorithm: Algorithm
+    is_goal_directed = False
+    # Keeps a planner that can repair its search after cells change
+    is_incremental = False
+
+    def __init__(self, heuristic: HeuristicFunction = Heuristic.manhattan):
+        self.heuristic = heuristic
+
+    # Yields every expanded cell in order and returns the path to the goal
+    @abstractmethod
+    def get_steps(
+        self, grid_graph: GridGraph, start_cell: int, goal_cell: Optional[int] = None
+    ) -> SearchSteps:
+        pass
+
+    def create_trace(
+        self, grid_graph: GridGraph, start_cell: int, goal_cell: Optional[int] = None
+    ) -> SearchTrace:
+        trace = SearchTrace(
+            grid_graph.grid_size, start_cell=start_cell, goal_cell=goal_cell
+        )
+        path: List[int] = []
+
+        def collect_steps():
+            nonlocal path
+            path = yield from self.get_steps(grid_graph, start_cell, goal_cell)
+
+        start_time = time.perf_counter()
+        trace.extend(collect_steps())
+        elapsed_seconds = time.perf_counter() - start_time
+        trace.path.extend(path)
+        trace.statistics = SearchStatistics(
+            self.algorithm, len(trace), len(path), elapsed_seconds
+        )
+        return trace
+
+    @staticmethod
+    def _create_parents(number_of_cells: int) -> array:
+        return array(SearchTrace.get_typecode(number_of_cells), [-1]) * number_of_cells
+
+    @staticmethod
+    def _reconstruct_path(parents, goal_cell: int) -> List[int]:
+        path = [goal_cell]
+        while parents[path[-1]] >= 0:
+            path.append(int(parents[path[-1]]))
+        path.reverse()
+        return path
+
+
+# Same visiting order as the SDK depth first search: neighbours are pushed in the
+# order the graph gives them and the last pushed is expanded first. The open set
+# lives in two flat arrays since it can hold several entries per cell.
+class DepthFirstSearch(SearchStrategy):
+    algorithm = Algorithm.DEPTH_FIRST_SEARCH
+
+    def get_steps(self, grid_graph, start_cell, goal_cell=None) -> SearchSteps:
+        visited = bytearray(grid_graph.number_of_cells)
+        typecode = SearchTrace.get_typecode(grid_graph.number_of_cells)
+        get_neighbour_cells = grid_graph.get_neighbour_cells
+        open_cells = array(typecode, [start_cell])
+        if goal_cell is None:
+            while open_cells:
+                cell = open_cells.pop()
+                if visited[cell]:
+                    continue
+                visited[cell] = 1
+                yield cell
+                for neighbour in get_neighbour_cells(cell):
+                    if not visited[neighbour]:
+                        open_cells.append(neighbour)
+            return []
+        # Parents are only tracked when there is a path to return
+        parents = SearchStrategy._create_parents(grid_graph.number_of_cells)
+        open_parents = array(typecode, [-1])
+        while open_cells:
+            cell = open_cells.pop()
+            parent = open_parents.pop()
+            if visited[cell]:
+                continue
+            visited[cell] = 1
+            parents[cell] = parent
+            yield cell
+            if cell == goal_cell:
+                return SearchStrategy._reconstruct_path(parents, cell)
+            for neighbour in get_neighbour_cells(cell):
+                if not visited[neighbour]:
+                    open_cells.append(neighbour)
+                    open_parents.append(cell)
+        return []
+
+
+class BreadthFirstSearch(SearchStrategy):
+    algorithm = Algorithm.BREADTH_FIRST_SEARCH
+
+    def get_steps(self, grid_graph, start_cell, goal_cell=None) -> SearchSteps:
+        if np is not None:
+            return (
+                yield from self._get_vectorised_steps(grid_graph, start_cell, goal_cell)
+            )
+        discovered = bytearray(grid_graph.number_of_cells)
+        parents = SearchStrategy._create_parents(grid_graph.number_of_cells)
+        get_neighbour_cells = grid_graph.get_neighbour_cells
+        discovered[start_cell] = 1
+        open_set = deque([start_cell])
+        while open_set:
+            cell = open_set.popleft()
+            yield cell
+            if cell == goal_cell:
+                return SearchStrategy._reconstruct_path(parents, cell)
+            for neighbour in get_neighbour_cells(cell):
+                if not discovered[neighbour]:
+                    discovered[neighbour] = 1
+                    parents[neighbour] = cell
+                    open_set.append(neighbour)
+        return []
+
+    @staticmethod
+    def _get_vectorised_steps(grid_graph, start_cell, goal_cell) -> SearchSteps:
+        parents = np.full(grid_graph.number_of_cells, -1, dtype=np.int64)
+        last_layer = None
+        for layer, layer_parents in grid_graph.get_breadth_first_layers(
+            start_cell, goal_cell
+        ):
+            parents[layer] = layer_parents
+            yield from layer.tolist()
+            last_layer = layer
+        if last_layer is not None and goal_cell == int(last_layer[-1]):
+            return SearchStrategy._reconstruct_path(parents, goal_cell)
+        return []
+
+
+# Priority is cost_weight * g + heuristic_weight * h, which covers Dijkstra,
+# A* and greedy best first with one binary heap
+class BestFirstSearch(SearchStrategy):
+    is_goal_directed = True
+    cost_weight = 1.0
+    heuristic_weight = 1.0
+
+    def get_steps(self, grid_graph, start_cell, goal_cell=None) -> SearchSteps:
+        width = grid_graph.grid_size.x
+        heuristic_weight = self.heuristic_weight if goal_cell is not None else 0
+        closed = bytearray(grid_graph.number_of_cells)
+        parents = SearchStrategy._create_parents(grid_graph.number_of_cells)
+        costs = array("d", [math.inf]) * grid_graph.number_of_cells
+        costs[start_cell] = 0
+        tie_breaker = itertools.count()
+        # Equal priorities go to the cell closest to the goal, which stops A*
+        # from fanning out over every tied cell on open grids
+        open_set = [(0.0, 0.0, next(tie_breaker), start_cell)]
+        while open_set:
+            _, _, _, cell = heapq.heappop(open_set)
+            if closed[cell]:
+                continue
+            closed[cell] = 1
+            yield cell
+            if cell == goal_cell:
+                return SearchStrategy._reconstruct_path(parents, cell)
+            for neighbour, distance in grid_graph.get_neighbours(cell):
+                if closed[neighbour]:
+                    continue
+                cost = costs[cell] + distance
+                if cost < costs[neighbour]:
+                    costs[neighbour] = cost
+                    parents[neighbour] = cell
+                    heuristic_value = (
+                        self.heuristic(neighbour, goal_cell, width)
+                        if heuristic_weight
+                        else 0.0
+                    )
+                    priority = (
+                        self.cost_weight * cost + heuristic_weight * heuristic_value
+                    )
+                    heapq.heappush(
+                        open_set,
+                        (priority, heuristic_value, next(tie_breaker), neighbour),
+                    )
+        return []
+
+
+class DijkstraSearch(BestFirstSearch):
+    algorithm = Algorithm.DIJKSTRA
+    heuristic_weight = 0.0
+
+
+class AStarSearch(BestFirstSearch):
+    algorithm = Algorithm.A_STAR
+
+
+class GreedyBestFirstSearch(BestFirstSearch):
+    algorithm = Algorithm.GREEDY_BEST_FIRST_SEARCH
+    cost_weight = 0.0
+
+
+# Jump Point Search for uniform cost, 4-connected grids: A* over the jump
+# points only, skipping each straight run of cells without a forced neighbour
+# with one lookup in the map's JPS+ jump distances. Only the expanded jump
+# points are yielded, and the path is filled back in cell by cell.
+class JumpPointSearch(SearchStrategy):
+    algorithm = Algorithm.JUMP_POINT_SEARCH
+    is_goal_directed = True
+
+    def get_steps(self, grid_graph, start_cell, goal_cell=None) -> SearchSteps:
+        # The pruning rules only hold for 4 neighbours
+        if goal_cell is None or grid_graph.neighbour_type != NeighbourType.CROSS:
+            return (
+                yield from AStarSearch(self.heuristic).get_steps(
+                    grid_graph, start_cell, goal_cell
+                )
+            )
+        width = grid_graph.grid_size.x
+        jump_point_finder = JumpPointFinder(
+            get_jump_distances(
+                width, grid_graph.grid_size.y, bytes(grid_graph.blocked)
+            ),
+            goal_cell,
+        )
+        closed = bytearray(grid_graph.number_of_cells)
+        parents = SearchStrategy._create_parents(grid_graph.number_of_cells)
+        costs = array("d", [math.inf]) * grid_graph.number_of_cells
+        costs[start_cell] = 0
+        tie_breaker = itertools.count()
+        open_set = [(0.0, 0.0, next(tie_breaker), start_cell)]
+        while open_set:
+            _, _, _, cell = heapq.heappop(open_set)
+            if closed[cell]:
+                continue
+            closed[cell] = 1
+            yield cell
+            if cell == goal_cell:
+                return JumpPointSearch._fill_path(
+                    SearchStrategy._reconstruct_path(parents, cell), width
+                )
+            for jump_point in jump_point_finder.get_successors(cell, parents[cell]):
+                if closed[jump_point]:
+                    continue
+                cost = costs[cell] + Heuristic.manhattan(cell, jump_point, width)
+                if cost < costs[jump_point]:
+                    costs[jump_point] = cost
+                    parents[jump_point] = cell
+                    heuristic_value = self.heuristic(jump_point, goal_cell, width)
+                    heapq.heappush(
+                        open_set,
+                        (
+                            cost + heuristic_value,
+                            heuristic_value,
+                            next(tie_breaker),
+                            jump_point,
+                        ),
+                    )
+        return []
+
+    # Consecutive jump points share a row or a column
+    @staticmethod
+    def _fill_path(jump_points: List[int], width: int) -> List[int]:
+        path = jump_points[:1]
+        for jump_point in jump_points[1:]:
+            previous_cell = path[-1]
+            step = 1 if jump_point // width == previous_cell // width else width
+            if jump_point < previous_cell:
+                step = -step
+            path.extend(range(previous_cell + step, jump_point + step, step))
+        return path
+
+
+# Lifelong Planning A*: keeps the g values and their one step lookahead rhs
+# values between searches, so after cells are blocked or freed only the cells
+# whose distance from the start changed are expanded again
+# pylint: disable=too-many-instance-attributes
+class LifelongPlanningAStar:
+    def __init__(
+        self,
+        grid_graph: GridGraph,
+        start_cell: int,
+        goal_cell: int,
+        heuristic: HeuristicFunction = Heuristic.manhattan,
+    ):
+        self.grid_graph = grid_graph
+        self.start_cell = start_cell
+        self.goal_cell = goal_cell
+        self.heuristic = heuristic
+        width = grid_graph.grid_size.x
+        # The neighbour order does not change the costs, so the graph's random
+        # order is not needed
+        self._offsets = [
+            (
+                x_offset,
+                y_offset,
+                y_offset * width + x_offset,
+                math.hypot(x_offset, y_offset),
+            )
+            for x_offset, y_offset in NEIGHBOUR_DIRECTIONS[grid_graph.neighbour_type]
+        ]
+        self._costs = array("d", [math.inf]) * grid_graph.number_of_cells
+        self._lookahead_costs = array("d", [math.inf]) * grid_graph.number_of_cells
+        self._lookahead_costs[start_cell] = 0
+        self._tie_breaker = itertools.count()
+        # Entries go stale instead of being removed, and are skipped once their
+        # key no longer matches the cell's
+        self._open_set: List[Tuple[float, float, int, int]] = []
+        self._push(start_cell)
+
+    # Ties go to the smaller cost, which the repairs rely on being correct,
+    # so on open grids it expands more cells than A* does the first time
+    def _get_key(self, cell: int) -> Tuple[float, float]:
+        cost = min(self._costs[cell], self._lookahead_costs[cell])
+        return (
+            cost + self.heuristic(cell, self.goal_cell, self.grid_graph.grid_size.x),
+            cost,
+        )
+
+    def _push(self, cell: int):
+        heapq.heappush(
+            self._open_set, (*self._get_key(cell), next(self._tie_breaker), cell)
+        )
+
+    def _get_neighbours(self, cell: int) -> List[Tuple[int, float]]:
+        width, height = self.grid_graph.grid_size.x, self.grid_graph.grid_size.y
+        blocked = self.grid_graph.blocked
+        y, x = divmod(cell, width)
+        return [
+            (cell + cell_offset, distance)
+            for x_offset, y_offset, cell_offset, distance in self._offsets
+            if 0 <= x + x_offset < width
+            and 0 <= y + y_offset < height
+            and not blocked[cell + cell_offset]
+        ]
+
+    def _update_cell(self, cell: int):
+        costs, lookahead_costs = self._costs, self._lookahead_costs
+        if cell != self.start_cell:
+            lookahead_cost = math.inf
+            if not self.grid_graph.blocked[cell]:
+                for neighbour, distance in self._get_neighbours(cell):
+                    if costs[neighbour] + distance < lookahead_cost:
+                        lookahead_cost = costs[neighbour] + distance
+            lookahead_costs[cell] = lookahead_cost
+        if costs[cell] != lookahead_costs[cell]:
+            self._push(cell)
+
+    # Yields every expanded cell, including cells expanded again because their
+    # cost went up, and returns the path to the goal
+    def get_steps(self) -> SearchSteps:
+        costs, lookahead_costs = self._costs, self._lookahead_costs
+        open_set, goal_cell = self._open_set, self.goal_cell
+        while open_set and (
+            open_set[0][:2] < self._get_key(goal_cell)
+            or costs[goal_cell] != lookahead_costs[goal_cell]
+        ):
+            first_key, second_key, _, cell = heapq.heappop(open_set)
+            if costs[cell] == lookahead_costs[cell] or (
+                first_key,
+                second_key,
+            ) != self._get_key(cell):
+                continue
+            yield cell
+            if costs[cell] > lookahead_costs[cell]:
+                costs[cell] = lookahead_costs[cell]
+            else:
+                costs[cell] = math.inf
+                self._update_cell(cell)
+            for neighbour, _ in self._get_neighbours(cell):
+                self._update_cell(neighbour)
+        return self.get_path()
+
+    # Blocked flags of the cells are changed by the caller first
+    def get_repair_steps(self, changed_cells: Iterable[int]) -> SearchSteps:
+        for cell in changed_cells:
+            self._update_cell(cell)
+            for neighbour in self.grid_graph.get_adjacent_cells(cell):
+                self._update_cell(neighbour)
+        return (yield from self.get_steps())
+
+    # Walks back from the goal through the cheapest neighbours
+    def get_path(self) -> List[int]:
+        costs = self._costs
+        if costs[self.goal_cell] == math.inf:
+            return []
+        path = [self.goal_cell]
+        while path[-1] != self.start_cell:
+            path.append(
+                min(
+                    self._get_neighbours(path[-1]),
+                    key=lambda neighbour: costs[neighbour[0]] + neighbour[1],
+                )[0]
+            )
+        path.reverse()
+        return path
+
+
+class LifelongPlanningAStarSearch(SearchStrategy):
+    algorithm = Algorithm.LIFELONG_PLANNING_A_STAR
+    is_goal_directed = True
+    is_incremental = True
+
+    def __init__(self, heuristic: HeuristicFunction = Heuristic.manhattan):
+        super().__init__(heuristic)
+        # Set once the search starts, and kept for repairing it later
+        self.planner: Optional[LifelongPlanningAStar] = None
+
+    def get_steps(self, grid_graph, start_cell, goal_cell=None) -> SearchSteps:
+        self.planner = LifelongPlanningAStar(
+            grid_graph, start_cell, goal_cell, self.heuristic
+        )
+        return (yield from self.planner.get_steps())
+
+
+# HPA*: A* over the cluster entrances of a cached abstraction of the map,
+# refined into a path inside each cluster. Near optimal rather than optimal.
+class HierarchicalAStarSearch(SearchStrategy):
+    algorithm = Algorithm.HIERARCHICAL_A_STAR
+    is_goal_directed = True
+
+    def get_steps(self, grid_graph, start_cell, goal_cell=None) -> SearchSteps:
+        # Distances inside clusters are counted in 4 neighbour steps
+        if goal_cell is None or grid_graph.neighbour_type != NeighbourType.CROSS:
+            return (
+                yield from AStarSearch(self.heuristic).get_steps(
+                    grid_graph, start_cell, goal_cell
+                )
+            )
+        return (
+            yield from get_cluster_abstraction(grid_graph).get_steps(
+                start_cell, goal_cell, self.heuristic
+            )
+        )
+
+
+SEARCH_STRATEGIES: Dict[Algorithm, Type[SearchStrategy]] = {
+    Algorithm.DEPTH_FIRST_SEARCH: DepthFirstSearch,
+    Algorithm.BREADTH_FIRST_SEARCH: BreadthFirstSearch,
+    Algorithm.DIJKSTRA: DijkstraSearch,
+    Algorithm.A_STAR: AStarSearch,
+    Algorithm.GREEDY_BEST_FIRST_SEARCH: GreedyBestFirstSearch,
+    Algorithm.LIFELONG_PLANNING_A_STAR: LifelongPlanningAStarSearch,
+    Algorithm.JUMP_POINT_SEARCH: JumpPointSearch,
+    Algorithm.HIERARCHICAL_A_STAR: HierarchicalAStarSearch,
+}
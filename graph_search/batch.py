@@ -0,0 +1,240 @@
+import csv
+import functools
+import json
+import os
+import random
+import sys
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, fields
+from typing import Iterator, List, Optional, Tuple
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from .algorithms import Algorithm, HeuristicType
+from .grid_map import GridMap, GridMapLoader, Scenario
+from .trace_cache import TraceCache
+from .utils import GraphData, Utils
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+
+# pylint: disable=too-many-instance-attributes
+@dataclass
+class BatchRun:
+    seed: int
+    # Ignored when a map gives the grid size
+    grid_size: Optional[int]
+    algorithm: Algorithm
+    heuristic_type: HeuristicType
+    trace_memory: bool = False
+    map_path: Optional[str] = None
+    # Replaces the seeded start and goal points
+    scenario: Optional[Scenario] = None
+    # Directory of traces from earlier runs, which are read instead of rerun
+    trace_cache_path: Optional[str] = None
+
+
+# pylint: disable=too-many-instance-attributes
+@dataclass
+class BatchResult:
+    seed: int
+    map_name: str
+    grid_width: int
+    grid_height: int
+    algorithm: str
+    heuristic: str
+    start_cell: int
+    goal_cell: int
+    expansions: int
+    path_length: int
+    elapsed_seconds: float
+    # Peak resident memory of the worker process so far
+    peak_rss_bytes: Optional[int]
+    # Peak Python allocations during this run, only with trace_memory
+    peak_traced_bytes: Optional[int]
+    # Read from the trace cache, so the elapsed time is the original run's
+    is_cached: bool
+
+
+def get_peak_memory_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak_memory if sys.platform == "darwin" else peak_memory * 1024
+
+
+# Each worker process keeps the last few maps instead of reloading per run
+load_cached_grid_map = functools.lru_cache(maxsize=4)(GridMapLoader.load)
+
+
+# One trace cache per directory and worker, so a run repeated within the batch
+# does not even read the disk
+@functools.lru_cache(maxsize=None)
+def get_trace_cache(directory: str) -> TraceCache:
+    return TraceCache(directory=directory)
+
+
+# The seed alone fixes the start, the goal and the neighbour order, so the
+# same seed gives every algorithm the same problem. The points and the
+# neighbour order have a generator each, as in the GUI, so a seed's trace is
+# the same in both and they can share a trace cache.
+def create_seeded_problem(
+    seed: int, grid_size: Dim2D, grid_map: Optional[GridMap] = None
+) -> Tuple[GraphData, Dim2D, Dim2D]:
+    grid_graph = Utils.create_grid_graph(
+        grid_size, random.Random(seed), None if grid_map is None else grid_map.blocked
+    )
+    random_generator = random.Random(seed)
+    start_point = Utils.get_random_start_point(grid_graph, random_generator)
+    goal_point = Utils.get_random_start_point(grid_graph, random_generator)
+    return GraphData(Dim2D(1, 1), grid_size, grid_graph), start_point, goal_point
+
+
+# The grid and points of a run, from its map or size, seed and scenario
+def create_batch_problem(batch_run: BatchRun) -> Tuple[GraphData, Dim2D, Dim2D]:
+    grid_map = None
+    if batch_run.map_path is None:
+        grid_size = Dim2D(batch_run.grid_size, batch_run.grid_size)
+    else:
+        grid_map = load_cached_grid_map(batch_run.map_path)
+        grid_size = grid_map.grid_size
+    graph_data, start_point, goal_point = create_seeded_problem(
+        batch_run.seed, grid_size, grid_map
+    )
+    if batch_run.scenario is not None:
+        start_point = batch_run.scenario.start_point
+        goal_point = batch_run.scenario.goal_point
+    return graph_data, start_point, goal_point
+
+
+def run_search(batch_run: BatchRun) -> BatchResult:
+    graph_data, start_point, goal_point = create_batch_problem(batch_run)
+    grid_size = graph_data.grid_size
+    search_arguments = (
+        graph_data,
+        batch_run.algorithm,
+        batch_run.heuristic_type,
+        start_point,
+        goal_point,
+    )
+    if batch_run.trace_memory:
+        tracemalloc.start()
+    is_cached = False
+    if batch_run.trace_cache_path is None:
+        statistics = Utils.create_search_trace(*search_arguments).statistics
+    else:
+        trace_cache = get_trace_cache(batch_run.trace_cache_path)
+        hits = trace_cache.hits
+        statistics = Utils.create_cached_search_trace(
+            trace_cache, *search_arguments, batch_run.seed
+        ).statistics
+        is_cached = trace_cache.hits > hits
+    peak_traced_bytes = None
+    if batch_run.trace_memory:
+        peak_traced_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return BatchResult(
+        seed=batch_run.seed,
+        map_name=(
+            "" if batch_run.map_path is None else os.path.basename(batch_run.map_path)
+        ),
+        grid_width=grid_size.x,
+        grid_height=grid_size.y,
+        algorithm=batch_run.algorithm.name.lower(),
+        heuristic=batch_run.heuristic_type.name.lower(),
+        start_cell=Utils.get_flat_index(start_point, grid_size),
+        goal_cell=Utils.get_flat_index(goal_point, grid_size),
+        expansions=statistics.expansions,
+        path_length=statistics.path_length,
+        elapsed_seconds=statistics.elapsed_seconds,
+        peak_rss_bytes=get_peak_memory_bytes(),
+        peak_traced_bytes=peak_traced_bytes,
+        is_cached=is_cached,
+    )
+
+
+def run_searches(batch_runs: List[BatchRun]) -> List[BatchResult]:
+    return [run_search(batch_run) for batch_run in batch_runs]
+
+
+# A map replaces the grid sizes, and its scenarios replace the seeds
+def create_batch_runs(
+    seeds: List[int],
+    grid_sizes: List[int],
+    algorithms: List[Algorithm],
+    heuristic_type: HeuristicType,
+    trace_memory: bool = False,
+    map_path: Optional[str] = None,
+    scenarios: Optional[List[Scenario]] = None,
+    trace_cache_path: Optional[str] = None,
+) -> List[BatchRun]:
+    if scenarios:
+        return [
+            BatchRun(
+                index,
+                None,
+                algorithm,
+                heuristic_type,
+                trace_memory,
+                map_path,
+                scenario,
+                trace_cache_path,
+            )
+            for index, scenario in enumerate(scenarios)
+            for algorithm in algorithms
+        ]
+    return [
+        BatchRun(
+            seed,
+            grid_size,
+            algorithm,
+            heuristic_type,
+            trace_memory,
+            map_path,
+            trace_cache_path=trace_cache_path,
+        )
+        for grid_size in (grid_sizes if map_path is None else [None])
+        for seed in seeds
+        for algorithm in algorithms
+    ]
+
+
+# Runs are sent in chunks so small searches are not dominated by the pickling
+# round trip, and results come back in completion order
+def run_batch(
+    batch_runs: List[BatchRun], max_workers: Optional[int] = None
+) -> Iterator[BatchResult]:
+    max_workers = max_workers or os.cpu_count() or 1
+    chunk_size = max(1, min(64, len(batch_runs) // (max_workers * 8)))
+    chunks = [
+        batch_runs[index : index + chunk_size]
+        for index in range(0, len(batch_runs), chunk_size)
+    ]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_searches, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+# Each result is written and flushed as soon as it arrives, as CSV for a .csv
+# path and JSON lines otherwise
+def write_batch_results(results: Iterator[BatchResult], output_path: str) -> int:
+    is_csv = output_path.lower().endswith(".csv")
+    number_of_results = 0
+    with open(output_path, "w", newline="", encoding="utf-8") as output_file:
+        writer = csv.writer(output_file) if is_csv else None
+        if writer is not None:
+            writer.writerow([field.name for field in fields(BatchResult)])
+        for result in results:
+            if writer is not None:
+                writer.writerow(asdict(result).values())
+            else:
+                output_file.write(json.dumps(asdict(result)) + "\n")
+            output_file.flush()
+            number_of_results += 1
+    return number_of_results
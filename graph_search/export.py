@@ -0,0 +1,71 @@
+import os
+from enum import Enum, auto
+from typing import Iterator, Optional, Tuple
+
+from draw.colour import Colour
+from draw.image_writer import ApngWriter, write_png, write_ppm
+from draw.pixel_buffer import PixelBuffer
+
+from .trace import SearchTrace
+
+
+class FrameFormat(Enum):
+    PPM = auto()
+    PNG = auto()
+    APNG = auto()
+
+
+# Replays the trace into one pixel buffer, coloured as in the GUI, and yields
+# it with the changed rows every steps_per_frame steps and at the end. The same
+# buffer is yielded each time, so memory stays at one frame.
+def iterate_trace_frames(
+    search_trace: SearchTrace,
+    steps_per_frame: int,
+    blocked: Optional[bytes] = None,
+) -> Iterator[Tuple[int, PixelBuffer, int, int]]:
+    pixel_buffer = PixelBuffer(search_trace.grid_size, Colour.BLACK)
+    if blocked is not None:
+        pixel_buffer.set_mask(blocked, Colour.BROWN)
+    number_of_steps = len(search_trace)
+    previous_cell = None
+    for step in range(number_of_steps):
+        cell = search_trace[step]
+        if previous_cell is not None:
+            pixel_buffer.set_cell(previous_cell, Colour.WHITE)
+        pixel_buffer.set_cell(cell, Colour.RED)
+        previous_cell = cell
+        if (step + 1) % steps_per_frame == 0 or step + 1 == number_of_steps:
+            strips = pixel_buffer.pop_dirty_strips()
+            yield step + 1, pixel_buffer, strips[0][0], strips[-1][1]
+
+
+def export_trace_frames(
+    search_trace: SearchTrace,
+    path: str,
+    frame_format: FrameFormat,
+    steps_per_frame: int = 1000,
+    scale: int = 1,
+    frame_delay_in_milliseconds: int = 40,
+    blocked: Optional[bytes] = None,
+) -> int:
+    frames = iterate_trace_frames(search_trace, steps_per_frame, blocked)
+    number_of_frames = 0
+    if frame_format == FrameFormat.APNG:
+        grid_size = search_trace.grid_size
+        with ApngWriter(
+            path, grid_size.x, grid_size.y, scale, frame_delay_in_milliseconds
+        ) as apng_writer:
+            for _, pixel_buffer, first_row, end_row in frames:
+                apng_writer.add_frame(pixel_buffer, first_row, end_row)
+            number_of_frames = apng_writer.number_of_frames
+        return number_of_frames
+    # Otherwise path is a directory for one file per frame
+    os.makedirs(path, exist_ok=True)
+    write_frame = write_png if frame_format == FrameFormat.PNG else write_ppm
+    extension = frame_format.name.lower()
+    for step, pixel_buffer, _, _ in frames:
+        write_frame(
+            os.path.join(path, f"frame_{step:09d}.{extension}"), pixel_buffer, scale
+        )
+        number_of_frames += 1
+    return number_of_frames
@@ -0,0 +1,189 @@
+import copy
+import math
+import random
+from array import array
+from itertools import permutations
+from typing import Iterator, List, Optional, Tuple
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+from dekespo_ai_sdk.core.neighbour import NeighbourType
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+
+# Same directions and order as the SDK cross and square neighbours
+NEIGHBOUR_DIRECTIONS = {
+    NeighbourType.CROSS: ((1, 0), (-1, 0), (0, 1), (0, -1)),
+    NeighbourType.SQUARE: (
+        (-1, -1),
+        (0, -1),
+        (1, -1),
+        (-1, 0),
+        (1, 0),
+        (-1, 1),
+        (0, 1),
+        (1, 1),
+    ),
+}
+
+
+# Rectangle grid stored as flat buffers: cell = y * width + x and a bytearray of
+# blocked flags, with neighbour offsets worked out once per grid
+# pylint: disable=too-many-instance-attributes
+class GridGraph:
+    RANDOM_POOL_SIZE = 1 << 16
+
+    def __init__(
+        self,
+        grid_size: Dim2D,
+        blocked: Optional[bytearray] = None,
+        neighbour_type: NeighbourType = NeighbourType.CROSS,
+        random_output: bool = False,
+        random_generator: Optional[random.Random] = None,
+    ):
+        self.grid_size = grid_size
+        self.blocked = bytearray(self.number_of_cells) if blocked is None else blocked
+        self.neighbour_type = neighbour_type
+        self.random_output = random_output
+        self.random_generator = (
+            random.Random() if random_generator is None else random_generator
+        )
+        self._offsets = [
+            (
+                x_offset,
+                y_offset,
+                y_offset * grid_size.x + x_offset,
+                math.hypot(x_offset, y_offset),
+            )
+            for x_offset, y_offset in NEIGHBOUR_DIRECTIONS[neighbour_type]
+        ]
+        # Picking one of the precomputed orders with a pooled random number is
+        # much cheaper than random.shuffle on every expansion
+        self._offset_orders = (
+            [list(order) for order in permutations(self._offsets)]
+            if random_output and neighbour_type == NeighbourType.CROSS
+            else []
+        )
+        self._reset_random_pool()
+
+    @property
+    def number_of_cells(self) -> int:
+        return self.grid_size.x * self.grid_size.y
+
+    @property
+    def size_in_bytes(self) -> int:
+        return len(self.blocked)
+
+    # Shares the blocked flags and offsets but not the pooled random numbers,
+    # so the copy's neighbour order only depends on the new generator
+    def copy_with_random_generator(
+        self, random_generator: random.Random
+    ) -> "GridGraph":
+        grid_graph = copy.copy(self)
+        grid_graph.random_generator = random_generator
+        GridGraph._reset_random_pool(grid_graph)
+        return grid_graph
+
+    def _reset_random_pool(self):
+        self._random_pool = array("H")
+        self._random_pool_index = 0
+
+    def get_cell(self, position: Dim2D) -> int:
+        return position.y * self.grid_size.x + position.x
+
+    def get_position(self, cell: int) -> Dim2D:
+        return Dim2D(cell % self.grid_size.x, cell // self.grid_size.x)
+
+    def is_blocked(self, cell: int) -> bool:
+        return bool(self.blocked[cell])
+
+    def _get_offsets(self) -> List[Tuple[int, int, int, float]]:
+        if not self.random_output:
+            return self._offsets
+        if self._offset_orders:
+            if self._random_pool_index == len(self._random_pool):
+                self._random_pool = array(
+                    "H", self.random_generator.randbytes(GridGraph.RANDOM_POOL_SIZE * 2)
+                )
+                self._random_pool_index = 0
+            random_value = self._random_pool[self._random_pool_index]
+            self._random_pool_index += 1
+            return self._offset_orders[random_value % len(self._offset_orders)]
+        offsets = list(self._offsets)
+        self.random_generator.shuffle(offsets)
+        return offsets
+
+    def get_neighbours(self, cell: int) -> Iterator[Tuple[int, float]]:
+        width, height = self.grid_size.x, self.grid_size.y
+        blocked = self.blocked
+        y, x = divmod(cell, width)
+        for x_offset, y_offset, cell_offset, distance in self._get_offsets():
+            if 0 <= x + x_offset < width and 0 <= y + y_offset < height:
+                neighbour = cell + cell_offset
+                if not blocked[neighbour]:
+                    yield neighbour, distance
+
+    # Blocked or not, in the fixed direction order
+    def get_adjacent_cells(self, cell: int) -> List[int]:
+        width, height = self.grid_size.x, self.grid_size.y
+        y, x = divmod(cell, width)
+        return [
+            cell + cell_offset
+            for x_offset, y_offset, cell_offset, _ in self._offsets
+            if 0 <= x + x_offset < width and 0 <= y + y_offset < height
+        ]
+
+    # Cheaper than get_neighbours for searches that ignore the distances
+    def get_neighbour_cells(self, cell: int) -> List[int]:
+        width, height = self.grid_size.x, self.grid_size.y
+        blocked = self.blocked
+        y, x = divmod(cell, width)
+        neighbour_cells = []
+        for x_offset, y_offset, cell_offset, _ in self._get_offsets():
+            if 0 <= x + x_offset < width and 0 <= y + y_offset < height:
+                if not blocked[cell + cell_offset]:
+                    neighbour_cells.append(cell + cell_offset)
+        return neighbour_cells
+
+    # Whole breadth first layers at a time with NumPy; the goal, when given,
+    # ends the search inside its layer
+    def get_breadth_first_layers(
+        self, start_cell: int, goal_cell: Optional[int] = None
+    ) -> Iterator[Tuple["np.ndarray", "np.ndarray"]]:
+        width, height = self.grid_size.x, self.grid_size.y
+        free = np.frombuffer(self.blocked, dtype=np.uint8) == 0
+        discovered = np.zeros(self.number_of_cells, dtype=bool)
+        # Deduplicates a layer without sorting: the last write to a cell wins
+        claims = np.zeros(self.number_of_cells, dtype=np.int32)
+        discovered[start_cell] = True
+        layer = np.array([start_cell], dtype=np.int64)
+        parents = np.array([-1], dtype=np.int64)
+        while layer.size:
+            if goal_cell is not None and discovered[goal_cell]:
+                goal_index = int(np.flatnonzero(layer == goal_cell)[0])
+                yield layer[: goal_index + 1], parents[: goal_index + 1]
+                return
+            yield layer, parents
+            ys, xs = np.divmod(layer, width)
+            candidates, candidate_parents = [], []
+            for x_offset, y_offset, cell_offset, _ in self._offsets:
+                inside = (
+                    (xs + x_offset >= 0)
+                    & (xs + x_offset < width)
+                    & (ys + y_offset >= 0)
+                    & (ys + y_offset < height)
+                )
+                candidates.append(layer[inside] + cell_offset)
+                candidate_parents.append(layer[inside])
+            next_layer = np.concatenate(candidates)
+            next_parents = np.concatenate(candidate_parents)
+            keep = free[next_layer] & ~discovered[next_layer]
+            next_layer, next_parents = next_layer[keep], next_parents[keep]
+            positions = np.arange(next_layer.size, dtype=np.int32)
+            claims[next_layer] = positions
+            unique = claims[next_layer] == positions
+            layer, parents = next_layer[unique], next_parents[unique]
+            discovered[layer] = True
@@ -0,0 +1,167 @@
+import mmap
+import os
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from .grid_graph import np
+
+
+@dataclass
+class GridMap:
+    grid_size: Dim2D
+    # One byte per flat cell, 1 for blocked, ready to be a GridGraph's buffer
+    blocked: bytearray
+
+
+@dataclass
+class Scenario:
+    bucket: int
+    map_name: str
+    grid_size: Dim2D
+    start_point: Dim2D
+    goal_point: Dim2D
+    optimal_length: float
+
+
+def get_byte_table(blocked_values: bytes) -> bytes:
+    return bytes(1 if value in blocked_values else 0 for value in range(256))
+
+
+# Everything is converted with bytes.translate or NumPy on the whole buffer,
+# never cell by cell
+class GridMapLoader:
+    # MovingAI terrain: . and G are ground, S is swamp, the rest is blocked
+    MOVING_AI_BLOCKED_TABLE = bytes(
+        0 if chr(value) in ".GS" else 1 for value in range(256)
+    )
+
+    @staticmethod
+    def load(path: str) -> GridMap:
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".map":
+            return GridMapLoader.load_moving_ai_map(path)
+        if extension in (".pgm", ".pnm"):
+            return GridMapLoader.load_pgm(path)
+        if extension == ".npy":
+            return GridMapLoader.load_npy(path)
+        raise ValueError(f"Unknown map format: {path}")
+
+    @staticmethod
+    def load_moving_ai_map(path: str) -> GridMap:
+        with open(path, "rb") as map_file, mmap.mmap(
+            map_file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            header = {}
+            while True:
+                line = mapped.readline()
+                if not line:
+                    raise ValueError(f"{path} has no map section")
+                words = line.split()
+                if words == [b"map"]:
+                    break
+                if len(words) == 2:
+                    header[words[0].decode()] = words[1].decode()
+            grid_size = Dim2D(int(header["width"]), int(header["height"]))
+            blocked = bytearray(
+                mapped[mapped.tell() :]
+                .rstrip()
+                .translate(GridMapLoader.MOVING_AI_BLOCKED_TABLE, b"\r\n")
+            )
+        GridMapLoader._check_size(path, grid_size, blocked)
+        return GridMap(grid_size, blocked)
+
+    # Dark pixels, below half of the maximum value, are obstacles
+    @staticmethod
+    def load_pgm(path: str) -> GridMap:
+        with open(path, "rb") as map_file, mmap.mmap(
+            map_file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mapped:
+            magic_number, header_values, data_offset = GridMapLoader._read_pgm_header(
+                mapped
+            )
+            width, height, maximum_value = header_values
+            grid_size = Dim2D(width, height)
+            threshold = (maximum_value + 1) // 2
+            if magic_number == b"P2":
+                values = mapped[data_offset:].split()
+                blocked = bytearray(int(value) < threshold for value in values)
+            elif magic_number == b"P5":
+                data = mapped[data_offset : data_offset + width * height * 2]
+                if maximum_value > 255:
+                    # Big endian 16 bit samples, the high byte is enough here
+                    data, threshold = data[0::2], threshold >> 8
+                blocked = bytearray(
+                    data[: width * height].translate(
+                        get_byte_table(bytes(range(threshold)))
+                    )
+                )
+            else:
+                raise ValueError(f"{path} is not a grey PGM file")
+        GridMapLoader._check_size(path, grid_size, blocked)
+        return GridMap(grid_size, blocked)
+
+    @staticmethod
+    def _read_pgm_header(mapped) -> Tuple[bytes, List[int], int]:
+        tokens: List[bytes] = []
+        offset = 0
+        while len(tokens) < 4:
+            while mapped[offset : offset + 1].isspace():
+                offset += 1
+            if mapped[offset : offset + 1] == b"#":
+                offset = mapped.find(b"\n", offset) + 1
+                continue
+            end = offset
+            while end < len(mapped) and not mapped[end : end + 1].isspace():
+                end += 1
+            if end == offset:
+                raise ValueError("Truncated PGM header")
+            tokens.append(mapped[offset:end])
+            offset = end
+        # A single whitespace character separates the header from the data
+        return tokens[0], [int(token) for token in tokens[1:]], offset + 1
+
+    # Any non zero value is an obstacle
+    @staticmethod
+    def load_npy(path: str) -> GridMap:
+        if np is None:
+            raise ValueError("NumPy is needed to load .npy maps")
+        grid = np.load(path, mmap_mode="r", allow_pickle=False)
+        if grid.ndim != 2:
+            raise ValueError(f"{path} holds a {grid.ndim}D array instead of 2D")
+        height, width = grid.shape
+        return GridMap(
+            Dim2D(width, height), bytearray(np.not_equal(grid, 0).view(np.uint8))
+        )
+
+    @staticmethod
+    def _check_size(path: str, grid_size: Dim2D, blocked: bytearray):
+        if len(blocked) != grid_size.x * grid_size.y:
+            raise ValueError(
+                f"{path} has {len(blocked)} cells instead of "
+                f"{grid_size.x}x{grid_size.y}"
+            )
+
+    # MovingAI .scen files, one start and goal per line after the version
+    @staticmethod
+    def load_scenarios(path: str) -> List[Scenario]:
+        scenarios = []
+        with open(path, encoding="utf-8") as scenario_file:
+            for line in scenario_file:
+                fields = line.split()
+                if len(fields) != 9:
+                    continue
+                bucket, map_name, *numbers, optimal_length = fields
+                width, height, start_x, start_y, goal_x, goal_y = map(int, numbers)
+                scenarios.append(
+                    Scenario(
+                        int(bucket),
+                        map_name,
+                        Dim2D(width, height),
+                        Dim2D(start_x, start_y),
+                        Dim2D(goal_x, goal_y),
+                        float(optimal_length),
+                    )
+                )
+        return scenarios
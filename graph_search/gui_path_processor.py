@@ -1,67 +1,570 @@
+import random
+import time
+from array import array
+from collections import deque
+from typing import Dict, List, Optional, Set
+
 from dekespo_ai_sdk.core.dimensions import Dim2D
-from dekespo_ai_sdk.core.raw_data_handler import RawDataHandler
+from dekespo_ai_sdk.core.utils import error_print
 from draw.tkinter_singleton import TkinterSingleton
 from draw.colour import Colour
+from draw.pixel_buffer import get_resized_cells
+from draw.viewport import Viewport
 
-from dekespo_ai_sdk.core.shapes import Shape2DType
-from dekespo_ai_sdk.core.graph import Graph
+from .utils import (
+    CellState,
+    ColourScheme,
+    Status,
+    Utils,
+    GuiUtils,
+    GraphData,
+    Options,
+    SearchMode,
+)
+from .algorithms import (
+    SEARCH_STRATEGIES,
+    Algorithm,
+    HeuristicType,
+    LifelongPlanningAStar,
+    SearchStatistics,
+)
+from .grid_map import GridMap
+from .hierarchy import get_cluster_abstraction
+from .trace import SearchTrace
+from .trace_cache import TraceCache
+from .playback import PlaybackScheduler
+from .profiler import PlaybackProfiler
 
-from .utils import Status, Utils, GuiUtils, GraphData, Options
 
 # TODO: Make sure to have more user friendly (automatic start with reset,
 #  should first step show red and etc)
 # pylint: disable=too-many-instance-attributes
 class GuiPathProcessor:
+    PROFILER_OVERLAY_INTERVAL_IN_SECONDS = 0.5
+
+    @property
+    def search_worker(self):
+        return self._search_worker
+
+    @property
+    def status_dictionary(self):
+        return self._status_dictionary
+
+    @property
+    def current_options(self):
+        return self._current_options
 
-    # TODO: Generalise this to any Graph Search Algorithm
     @property
-    def depth_first_search(self):
-        return self._depth_first_search
+    def search_steps(self):
+        return self._search_steps
 
-    def __init__(self):
+    @property
+    def current_path_index(self):
+        return self._current_path_index
+
+    @property
+    def renderer(self):
+        return self._renderer
+
+    @property
+    def profiler(self):
+        return self._profiler
+
+    @property
+    def viewport(self):
+        return self._viewport
+
+    @property
+    def trace_cache(self):
+        return self._trace_cache
+
+    def __init__(self, current_options=None):
+        self._profiler = PlaybackProfiler()
+        self._profiler.start_first_frame()
+        self._colour_scheme = ColourScheme.CLASSIC
         self._status_dictionary = Utils.get_default_status_dictionary()
-        self._current_options = Utils.get_default_options_dictionary()
+        self._current_options = (
+            Utils.get_default_options_dictionary()
+            if current_options is None
+            else current_options
+        )
+        trace_path = self._current_options[Options.TRACE_PATH]
+        self._trace_file = Utils.open_trace_file(trace_path) if trace_path else None
         TkinterSingleton.create_canvas()
-        self._graph_data = GuiPathProcessor._set_gui(self._current_options)
+        self._graph_data = GuiPathProcessor._set_gui(
+            self._current_options, self._trace_file
+        )
+        self._create_grid_view()
         GuiUtils.create_buttons_layer(self._status_dictionary, self._current_options)
-        GuiUtils.create_slider_layer(self._current_options)
+        GuiUtils.create_slider_layer(self._status_dictionary, self._current_options)
+        GuiUtils.bind_viewport_controls(self._status_dictionary)
+        GuiUtils.bind_cell_controls(self._status_dictionary)
         TkinterSingleton.refresh()
         self._start_path_index = 0
         self._current_path_index = self._start_path_index
+        self._timeline_step = None
+        self._timeline_number_of_steps = None
+        self._playback_scheduler = PlaybackScheduler(
+            self._current_options[Options.FRAMES_PER_SECOND]
+        )
+        self._profiler_overlay_time = None
+        self._trace_cache = TraceCache(
+            directory=self._current_options[Options.TRACE_CACHE_PATH] or None
+        )
+        self._next_seed = self._current_options[Options.SEED]
         # TODO: Should run _reset instead?
-        self._run_dfs()
+        if self._trace_file is None:
+            self._choose_search_problem()
+        else:
+            self._choose_trace_file_problem()
+        self._run_search()
+        # The options window gives options new values rather than changing
+        # them, so this is what the GUI was last set up with
+        self._applied_options = dict(self._current_options)
 
+    # An opened trace file brings its own grid, ahead of any map
     @staticmethod
-    def _set_gui(current_options) -> GraphData:
+    def _set_gui(current_options, trace_file=None) -> GraphData:
+        map_path = current_options[Options.MAP_PATH]
+        if trace_file is not None:
+            grid_map = GridMap(trace_file.grid_size, trace_file.read_blocked())
+        else:
+            grid_map = Utils.load_grid_map(map_path) if map_path else None
+        if grid_map is not None:
+            current_options[Options.GRID_SIZE] = grid_map.grid_size
         tile_size: Dim2D = current_options[Options.TILE_SIZE]
         grid_size: Dim2D = current_options[Options.GRID_SIZE]
-        TkinterSingleton.resize_canvas(tile_size.vectoral_multiply(grid_size))
+        graph_data = GraphData(
+            tile_size,
+            grid_size,
+            Utils.create_grid_graph(
+                grid_size, blocked=None if grid_map is None else grid_map.blocked
+            ),
+        )
+        TkinterSingleton.resize_canvas(Utils.get_canvas_size(graph_data))
         TkinterSingleton.canvas.configure(background=Colour.GREEN.value)
         TkinterSingleton.canvas.pack(fill="both", expand=True)
-        graph_data = GraphData(tile_size, grid_size, None)
-        TkinterSingleton.clear_rectangle()
-        raw_grid_data = Utils.create_rectangle_canvas(graph_data)
-        raw_data_handler = RawDataHandler(raw_grid_data)
-        graph_data.graph = Graph(raw_data_handler, Shape2DType.RECTANGLE)
         return graph_data
 
-    def _run_dfs(self):
-        self._depth_first_search = Utils.initialize_depth_first_search(self._graph_data)
-        self._graph_search_closed_set = self._depth_first_search.get_closed_set()
+    def _create_grid_view(self):
+        render_backend = self._current_options[Options.RENDER_BACKEND]
+        self._viewport = Viewport(
+            self._graph_data.grid_size,
+            self._graph_data.tile_size,
+            Utils.get_canvas_size(self._graph_data),
+        )
+        self._renderer = Utils.create_renderer(
+            self._graph_data,
+            render_backend,
+            self._colour_scheme,
+            self._viewport,
+        )
+        self._viewport.minimum_tile_side = self._renderer.MINIMUM_TILE_SIDE
+        # Entrances of the shown cluster layer, None while it is hidden
+        self._entrance_cells: Optional[Set[int]] = None
+        self._paint_walls()
+
+    # Pans and zooms queued by canvas events since the last tick
+    def _update_viewport(self):
+        pan = self._status_dictionary[Status.VIEWPORT_PAN]
+        zoom = self._status_dictionary[Status.VIEWPORT_ZOOM]
+        if pan is None and zoom is None:
+            return
+        self._status_dictionary[Status.VIEWPORT_PAN] = None
+        self._status_dictionary[Status.VIEWPORT_ZOOM] = None
+        is_changed = False
+        if zoom is not None:
+            is_changed = self._viewport.zoom(*zoom)
+        if pan is not None:
+            is_changed = self._viewport.pan(pan) or is_changed
+        if is_changed:
+            self._renderer.update_viewport()
+
+    def _paint_walls(self):
+        blocked = self._graph_data.grid_graph.blocked
+        if blocked.find(1) >= 0:
+            self._renderer.apply_mask(blocked, CellState.WALL)
+
+    # Visited and current cells go back to unvisited as one class, without
+    # touching cells one by one
+    def _clear_grid_view(self):
+        self._renderer.replace(
+            (CellState.VISITED, CellState.CURRENT), CellState.UNVISITED
+        )
+        self._paint_entrances()
+
+    # The cluster layer of the hierarchical search, drawn under the search
+    # on entrances that are not visited yet
+    def _update_cluster_layer(self):
+        if self._status_dictionary[Status.SHOW_CLUSTERS] == (
+            self._entrance_cells is not None
+        ):
+            return
+        if self._entrance_cells is None:
+            self._show_cluster_layer()
+        else:
+            self._hide_cluster_layer()
+
+    def _show_cluster_layer(self):
+        self._entrance_cells = get_cluster_abstraction(
+            self._graph_data.grid_graph
+        ).entrances
+        self._paint_entrances()
+
+    def _hide_cluster_layer(self):
+        self._renderer.replace((CellState.ENTRANCE,), CellState.UNVISITED)
+        self._entrance_cells = None
+
+    def _paint_entrances(self):
+        if not self._entrance_cells:
+            return
+        cells = list(self._entrance_cells)
+        self._renderer.apply(
+            cells,
+            [self._get_cell_state(cell, self._current_path_index) for cell in cells],
+        )
+
+    # Recolours each cell state as a whole
+    def _cycle_colour_scheme(self):
+        if not self._status_dictionary[Status.SHOULD_CYCLE_COLOUR_SCHEME]:
+            return
+        self._status_dictionary[Status.SHOULD_CYCLE_COLOUR_SCHEME] = False
+        colour_schemes = list(ColourScheme)
+        self._colour_scheme = colour_schemes[
+            (colour_schemes.index(self._colour_scheme) + 1) % len(colour_schemes)
+        ]
+        for cell_state, colour in zip(CellState, self._colour_scheme.value):
+            self._renderer.set_palette_colour(cell_state, colour)
+
+    # The seed fixes the neighbour order, so the same points and seed give the
+    # same trace for each algorithm. A seeded problem has the points of batch
+    # runs with the same seed and walls.
+    def _choose_search_problem(self):
+        grid_graph = self._graph_data.grid_graph
+        if self._next_seed is None:
+            random_generator = random
+            self._seed = random.getrandbits(32)
+        else:
+            random_generator = random.Random(self._next_seed)
+            self._seed = self._next_seed
+            self._next_seed += 1
+        self._start_point = Utils.get_random_start_point(grid_graph, random_generator)
+        self._goal_point = Utils.get_random_start_point(grid_graph, random_generator)
+
+    # The problem the trace file was saved with, so that it is replayed first
+    def _choose_trace_file_problem(self):
+        trace_key = self._trace_file.key
+        grid_size = self._graph_data.grid_size
+        self._start_point = Utils.get_position(trace_key.start_cell, grid_size)
+        # Searches without a goal match any goal point
+        self._goal_point = Utils.get_position(
+            trace_key.start_cell if trace_key.goal_cell < 0 else trace_key.goal_cell,
+            grid_size,
+        )
+        self._seed = trace_key.seed
+        self._current_options[Options.ALGORITHM] = Algorithm[trace_key.algorithm]
+        self._current_options[Options.HEURISTIC] = HeuristicType[trace_key.heuristic]
+
+    # Options that keep the points on free cells keep the problem, so going
+    # back to earlier options replays their trace from the cache
+    def _is_search_problem_valid(self):
+        grid_graph = self._graph_data.grid_graph
+        return all(
+            0 <= point.x < grid_graph.grid_size.x
+            and 0 <= point.y < grid_graph.grid_size.y
+            and not grid_graph.is_blocked(grid_graph.get_cell(point))
+            for point in (self._start_point, self._goal_point)
+        )
+
+    def _run_search(self):
+        grid_size = self._graph_data.grid_size
+        search_mode = self._current_options[Options.SEARCH_MODE]
+        search_arguments = (
+            Utils.get_seeded_graph_data(self._graph_data, self._seed),
+            self._current_options[Options.ALGORITHM],
+            self._current_options[Options.HEURISTIC],
+            self._start_point,
+            self._goal_point,
+        )
+        self._search_worker = None
+        self._time_sliced_search = None
+        self._search_strategy = None
+        self._trace_key = Utils.get_trace_key(*search_arguments, self._seed)
+        if self._trace_file is not None and self._trace_key == self._trace_file.key:
+            saved_trace = self._trace_file
+        else:
+            saved_trace = self._trace_cache.get(self._trace_key)
+        # A trace file or cached trace is complete, so every search mode
+        # replays it as is
+        if saved_trace is not None:
+            self._search_steps = saved_trace
+            GuiUtils.update_statistics([self._search_steps.statistics])
+            return
+        if search_mode == SearchMode.TRACE:
+            self._search_strategy, *search_problem = Utils.get_search_problem(
+                *search_arguments
+            )
+            self._search_steps = self._search_strategy.create_trace(*search_problem)
+            self._trace_cache.put(self._trace_key, self._search_steps)
+            GuiUtils.update_statistics([self._search_steps.statistics])
+            return
+        if search_mode == SearchMode.THREADED:
+            step_source = self._search_worker = Utils.start_search_worker(
+                *search_arguments
+            )
+        else:
+            step_source = self._time_sliced_search = Utils.create_time_sliced_search(
+                *search_arguments
+            )
+        self._search_strategy = step_source.search_strategy
+        self._search_steps = SearchTrace(
+            grid_size,
+            start_cell=step_source.start_cell,
+            goal_cell=step_source.goal_cell,
+        )
+        GuiUtils.update_statistics([])
+
+    # Steps are only taken from the worker as playback needs them, so a fast
+    # search waits on the bounded channel instead of racing ahead
+    def _receive_steps(self, number_of_steps):
+        if self._search_worker is None:
+            return
+        channel = self._search_worker.channel
+        while len(self._search_steps) < number_of_steps:
+            chunk = channel.get_nowait()
+            if chunk is None:
+                break
+            self._search_steps.extend(chunk)
+        if not channel.is_finished:
+            return
+        if self._search_worker.statistics is None:
+            self._on_search_failed(self._search_worker)
+        elif self._search_steps.statistics is None:
+            self._on_search_finished(self._search_worker)
+
+    def _advance_time_sliced_search(self):
+        if self._time_sliced_search is None or self._time_sliced_search.is_finished:
+            return
+        self._time_sliced_search.advance(self._search_steps)
+        if self._time_sliced_search.is_finished:
+            self._on_search_finished(self._time_sliced_search)
+
+    def _on_search_finished(self, step_source):
+        self._search_steps.path.extend(step_source.path)
+        self._search_steps.statistics = step_source.statistics
+        self._trace_cache.put(self._trace_key, self._search_steps)
+        GuiUtils.update_statistics([self._search_steps.statistics])
+
+    # The steps so far stay on screen, but the trace is not cached as it has
+    # no path or statistics. The worker is dropped so this happens once.
+    def _on_search_failed(self, search_worker):
+        self._search_worker = None
+        if search_worker.error is not None:
+            error_print(f"The search failed: {search_worker.error!r}")
 
+    def _is_search_finished(self):
+        if self._search_worker is not None:
+            return self._search_worker.channel.is_finished
+        if self._time_sliced_search is not None:
+            return self._time_sliced_search.is_finished
+        return True
+
+    # Walls toggled with the right mouse button. A finished incremental search
+    # is repaired and the repair steps are added to the end of the trace; any
+    # other search is run again on the same problem.
+    def _toggle_cells(self):
+        toggle_points = self._status_dictionary[Status.TOGGLE_POINTS]
+        if not toggle_points:
+            return
+        self._status_dictionary[Status.TOGGLE_POINTS] = None
+        grid_graph = self._graph_data.grid_graph
+        fixed_cells = (
+            grid_graph.get_cell(self._start_point),
+            grid_graph.get_cell(self._goal_point),
+        )
+        cells: List[int] = []
+        for point in toggle_points:
+            position = self._viewport.get_cell_position(point)
+            if position is None:
+                continue
+            cell = grid_graph.get_cell(position)
+            if cell not in fixed_cells and cell not in cells:
+                cells.append(cell)
+        if not cells:
+            return
+        # Taken before the flags change, so it still matches the old walls
+        planner = self._get_planner()
+        for cell in cells:
+            grid_graph.blocked[cell] ^= 1
+        self._renderer.apply(
+            cells,
+            [self._get_cell_state(cell, self._current_path_index) for cell in cells],
+        )
+        # Entrances move with the walls
+        if self._entrance_cells is not None:
+            self._hide_cluster_layer()
+            self._show_cluster_layer()
+        if planner is None:
+            self._rerun_search(should_choose_search_problem=False)
+        else:
+            self._repair_search(planner, cells)
+
+    # A cached trace comes without a planner, so one is brought up to date
+    # with a search that is not shown
+    def _get_planner(self) -> Optional[LifelongPlanningAStar]:
+        algorithm = self._current_options[Options.ALGORITHM]
+        if (
+            not SEARCH_STRATEGIES[algorithm].is_incremental
+            or self._search_steps.statistics is None
+        ):
+            return None
+        if self._search_strategy is None:
+            self._search_strategy, *search_problem = Utils.get_search_problem(
+                Utils.get_seeded_graph_data(self._graph_data, self._seed),
+                algorithm,
+                self._current_options[Options.HEURISTIC],
+                self._start_point,
+                self._goal_point,
+            )
+            deque(self._search_strategy.get_steps(*search_problem), maxlen=0)
+        return self._search_strategy.planner
+
+    # Works on a copy, since the trace may also be in the trace cache under
+    # the old walls
+    def _repair_search(self, planner: LifelongPlanningAStar, cells: List[int]):
+        search_trace = self._search_steps.copy()
+        first_repair_step = len(search_trace)
+        path: List[int] = []
+
+        def collect_steps():
+            nonlocal path
+            path = yield from planner.get_repair_steps(cells)
+
+        start_time = time.perf_counter()
+        search_trace.extend(collect_steps())
+        elapsed_seconds = time.perf_counter() - start_time
+        search_trace.path = array(search_trace.steps.typecode, path)
+        repair_statistics = SearchStatistics(
+            search_trace.statistics.algorithm,
+            len(search_trace) - first_repair_step,
+            len(path),
+            elapsed_seconds,
+        )
+        search_trace.statistics = SearchStatistics(
+            repair_statistics.algorithm,
+            len(search_trace),
+            len(path),
+            search_trace.statistics.elapsed_seconds + elapsed_seconds,
+        )
+        self._search_steps = search_trace
+        GuiUtils.update_statistics([repair_statistics])
+        # Playback that had reached the end goes on through the repair
+        if self._current_path_index == first_repair_step:
+            self._status_dictionary[Status.ON_PAUSE] = False
+            self._status_dictionary[Status.SHOULD_PLAY_FORWARD] = True
+
+    def stop_search(self):
+        if self._search_worker is not None:
+            self._search_worker.stop()
+
+    # Only what changed is applied. A new tile size rescales the view, a new
+    # grid size adds or cuts edge rows and columns, and the search only runs
+    # again for a new graph or search. A new map or renderer builds the GUI
+    # again.
     def _set_options(self):
-        self._graph_data = GuiPathProcessor._set_gui(self._current_options)
-        TkinterSingleton.refresh()
+        self._profiler.start_first_frame()
         self._status_dictionary[Status.OPTIONS_SET] = False
-        self._reset()
+        options, applied_options = self._current_options, self._applied_options
+        self._applied_options = dict(options)
+
+        def is_changed(*changed_options):
+            return any(
+                options[option] != applied_options[option] for option in changed_options
+            )
+
+        if is_changed(Options.MAP_PATH, Options.RENDER_BACKEND):
+            self._rebuild_gui()
+            return
+        # A map or trace file sets the grid size
+        if self._trace_file is not None or options[Options.MAP_PATH]:
+            options[Options.GRID_SIZE] = self._graph_data.grid_size
+        is_graph_changed = options[Options.GRID_SIZE] != self._graph_data.grid_size
+        if is_graph_changed or options[Options.TILE_SIZE] != self._graph_data.tile_size:
+            self._resize_grid_view(
+                options[Options.GRID_SIZE], options[Options.TILE_SIZE]
+            )
+        # A finished trace is the same in every search mode
+        if (
+            is_graph_changed
+            or is_changed(Options.ALGORITHM, Options.HEURISTIC)
+            or (is_changed(Options.SEARCH_MODE) and not self._is_search_finished())
+        ):
+            self._reset(
+                should_choose_search_problem=not self._is_search_problem_valid()
+            )
+        else:
+            self._update_path()
+
+    def _rebuild_gui(self):
+        self._graph_data = GuiPathProcessor._set_gui(
+            self._current_options, self._trace_file
+        )
+        self._create_grid_view()
+        TkinterSingleton.refresh()
+        self._reset(should_choose_search_problem=not self._is_search_problem_valid())
+
+    # Walls and shown cells are kept where both grids have them, and new edge
+    # cells are free. The cluster layer comes back for the new graph on the
+    # next tick.
+    def _resize_grid_view(self, grid_size: Dim2D, tile_size: Dim2D):
+        graph_data = self._graph_data
+        is_grid_resized = grid_size != graph_data.grid_size
+        if is_grid_resized:
+            if self._entrance_cells is not None:
+                self._hide_cluster_layer()
+            grid_graph = Utils.create_grid_graph(
+                grid_size,
+                blocked=get_resized_cells(
+                    graph_data.grid_graph.blocked, graph_data.grid_size, grid_size
+                ),
+            )
+        else:
+            grid_graph = graph_data.grid_graph
+        self._graph_data = GraphData(tile_size, grid_size, grid_graph)
+        canvas_size = Utils.get_canvas_size(self._graph_data)
+        TkinterSingleton.resize_canvas(canvas_size)
+        self._viewport.resize(grid_size, tile_size, canvas_size)
+        if is_grid_resized:
+            self._renderer.resize(grid_size)
+        else:
+            self._renderer.update_viewport()
 
     def process(self):
+        self._profiler.start_tick()
+        self._advance_time_sliced_search()
+        self._update_viewport()
+        self._toggle_cells()
+        self._cycle_colour_scheme()
+        self._update_cluster_layer()
+        self._process()
+        self._profiler.end_tick(
+            self._current_options[Options.STEPS_PER_SECOND],
+            self._playback_scheduler.achieved_steps_per_second,
+            len(self._search_steps),
+        )
+        self._update_profiler_overlay()
+
+    def _process(self):
         if self._status_dictionary[Status.OPTIONS_SET]:
             self._set_options()
         elif self._status_dictionary[Status.SHOULD_RESET]:
             self._reset()
         elif self._status_dictionary[Status.SHOULD_RESTART]:
             self._restart()
+        elif self._status_dictionary[Status.SEEK_STEP] is not None:
+            self._seek()
+        elif self._status_dictionary[Status.SHOULD_COMPARE]:
+            self._compare()
         elif self._status_dictionary[Status.SHOULD_GO_BACK]:
             self._go_back()
         elif self._status_dictionary[Status.SHOULD_GO_NEXT]:
@@ -76,85 +579,178 @@ class GuiPathProcessor:
             self._on_play_backward()
 
     def _update_path(self):
-        TkinterSingleton.update(
-            self.process,
-            in_milliseconds=round(
-                1000 / self._current_options[Options.STEPS_PER_SECOND]
-            ),
-        )
+        self._update_timeline()
+        frame_interval = self._playback_scheduler.frame_interval_in_milliseconds
+        self._profiler.schedule(frame_interval)
+        TkinterSingleton.update(self.process, in_milliseconds=frame_interval)
 
-    def _reset(self):
-        self._depth_first_search.kill_thread()
-        self._depth_first_search.join()
-        Utils.create_rectangle_canvas(self._graph_data)
-        self._current_path_index = self._start_path_index
-        self._run_dfs()
+    # Label updates are throttled so the overlay does not cost a frame
+    def _update_profiler_overlay(self):
+        if not self._status_dictionary[Status.SHOW_PROFILER]:
+            if self._profiler_overlay_time is not None:
+                GuiUtils.update_profiler_overlay("")
+                self._profiler_overlay_time = None
+            return
+        now = time.perf_counter()
+        if (
+            self._profiler_overlay_time is None
+            or now - self._profiler_overlay_time
+            >= GuiPathProcessor.PROFILER_OVERLAY_INTERVAL_IN_SECONDS
+        ):
+            GuiUtils.update_profiler_overlay(self._profiler.get_overlay_text())
+            self._profiler_overlay_time = now
+
+    def _reset(self, should_choose_search_problem=True):
+        self._rerun_search(should_choose_search_problem)
         self._status_dictionary[Status.SHOULD_RESET] = False
         self._update_path()
 
+    def _rerun_search(self, should_choose_search_problem):
+        self.stop_search()
+        self._clear_grid_view()
+        self._current_path_index = self._start_path_index
+        if should_choose_search_problem:
+            self._choose_search_problem()
+        self._run_search()
+
     def _restart(self):
-        Utils.create_rectangle_canvas(self._graph_data)
+        self._clear_grid_view()
         self._current_path_index = self._start_path_index
         self._status_dictionary[Status.SHOULD_RESTART] = False
         self._update_path()
 
+    def _seek(self):
+        self._receive_steps(self._status_dictionary[Status.SEEK_STEP])
+        seek_step = min(
+            self._status_dictionary[Status.SEEK_STEP], len(self._search_steps)
+        )
+        self._status_dictionary[Status.SEEK_STEP] = None
+        # Moving the slider from code echoes its value back through the callback
+        if seek_step != self._timeline_step:
+            self._move_to(seek_step)
+        self._update_path()
+
+    def _compare(self):
+        GuiUtils.update_statistics(
+            Utils.compare_search_algorithms(
+                self._graph_data,
+                self._current_options[Options.HEURISTIC],
+                self._start_point,
+                self._goal_point,
+                self._seed,
+                self._trace_cache,
+            )
+        )
+        self._status_dictionary[Status.SHOULD_COMPARE] = False
+        self._update_path()
+
+    def _update_timeline(self):
+        number_of_steps = len(self._search_steps)
+        if (
+            self._current_path_index != self._timeline_step
+            or number_of_steps != self._timeline_number_of_steps
+        ):
+            GuiUtils.update_timeline(self._current_path_index, number_of_steps)
+            self._timeline_step = self._current_path_index
+            self._timeline_number_of_steps = number_of_steps
+
     def _go_back(self):
-        self._back_red_colouring()
-        self._back_black_colouring()
+        self._move_to(self._get_backward_target(1))
         self._status_dictionary[Status.SHOULD_GO_BACK] = False
         self._status_dictionary[Status.ON_PAUSE] = True
         self._on_pause()
 
     def _go_next(self):
-        self._next_white_colouring()
-        self._next_red_colouring()
+        self._move_to(self._get_forward_target(1))
         self._status_dictionary[Status.SHOULD_GO_NEXT] = False
         self._status_dictionary[Status.ON_PAUSE] = True
         self._on_pause()
 
     def _on_pause(self):
+        self._playback_scheduler.reset()
         self._update_path()
 
     def _is_last_step(self):
-        return self._current_path_index == len(self._graph_search_closed_set)
+        self._receive_steps(self._current_path_index + 1)
+        return (
+            self._current_path_index == len(self._search_steps)
+            and self._is_search_finished()
+        )
 
     def _on_last_step(self):
-        previous_point = self._graph_search_closed_set[self._current_path_index - 1].position
-        self._create_rectangle_at(previous_point, Colour.RED)
+        self._colour_cells(
+            {self._search_steps[self._current_path_index - 1]: CellState.CURRENT}
+        )
         self._status_dictionary[Status.ON_PAUSE] = True
         self._update_path()
 
     def _on_play_forward(self):
-        self._next_white_colouring()
-        self._next_red_colouring()
-        self._update_path()
+        steps_due = self._get_steps_due()
+        self._play_to(self._get_forward_target(steps_due))
 
     def _on_play_backward(self):
-        self._back_red_colouring()
-        self._back_black_colouring()
+        steps_due = self._get_steps_due()
+        self._play_to(self._get_backward_target(steps_due))
+
+    def _get_steps_due(self):
+        return self._playback_scheduler.get_steps_due(
+            self._current_options[Options.STEPS_PER_SECOND]
+        )
+
+    def _get_forward_target(self, number_of_steps):
+        self._receive_steps(self._current_path_index + number_of_steps)
+        return min(
+            self._current_path_index + number_of_steps,
+            len(self._search_steps),
+        )
+
+    def _get_backward_target(self, number_of_steps):
+        # The first step always stays coloured, as with stepping back one at a time
+        return min(
+            self._current_path_index,
+            max(self._current_path_index - number_of_steps, self._start_path_index + 1),
+        )
+
+    def _play_to(self, target_path_index):
+        applied_steps = abs(target_path_index - self._current_path_index)
+        self._move_to(target_path_index)
+        self._playback_scheduler.record_applied_steps(applied_steps)
+        GuiUtils.update_achieved_speed(
+            self._playback_scheduler.achieved_steps_per_second
+        )
         self._update_path()
 
-    def _next_white_colouring(self):
-        if self._current_path_index > self._start_path_index:
-            previous_point = self._graph_search_closed_set[self._current_path_index - 1].position
-            self._create_rectangle_at(previous_point, Colour.WHITE)
-
-    def _next_red_colouring(self):
-        if self._current_path_index < len(self._graph_search_closed_set):
-            # TODO: This part goes up to some 33 ms until dfs thread is done, find what causes this?
-            current_point = self._graph_search_closed_set[self._current_path_index].position
-            self._create_rectangle_at(current_point, Colour.RED)
-            self._current_path_index += 1
-
-    def _back_red_colouring(self):
-        if self._current_path_index > self._start_path_index + 1:
-            self._current_path_index -= 1
-            previous_point = self._graph_search_closed_set[self._current_path_index - 1].position
-            self._create_rectangle_at(previous_point, Colour.RED)
-
-    def _back_black_colouring(self):
-        current_point = self._graph_search_closed_set[self._current_path_index].position
-        self._create_rectangle_at(current_point, Colour.BLACK)
-
-    def _create_rectangle_at(self, point, colour: Colour):
-        TkinterSingleton.create_rectangle_at(point, self._graph_data.tile_size, colour)
+    # Only the cells between the two positions change, and their colours come
+    # from the first visit index, so a jump costs the same as the steps it skips
+    def _move_to(self, target_path_index):
+        start_time = time.perf_counter()
+        search_steps = self._search_steps
+        lower_path_index, upper_path_index = sorted(
+            (self._current_path_index, target_path_index)
+        )
+        colourings = {}
+        for cell in search_steps.get_step_range(
+            max(lower_path_index - 1, self._start_path_index), upper_path_index
+        ):
+            colourings[cell] = self._get_cell_state(cell, target_path_index)
+        self._colour_cells(colourings)
+        self._profiler.record_apply(
+            time.perf_counter() - start_time,
+            abs(target_path_index - self._current_path_index),
+        )
+        self._current_path_index = target_path_index
+
+    def _get_cell_state(self, cell, path_index) -> CellState:
+        if self._graph_data.grid_graph.blocked[cell]:
+            return CellState.WALL
+        first_visit_step = self._search_steps.get_first_visit_step(cell)
+        if first_visit_step < self._start_path_index or first_visit_step >= path_index:
+            if self._entrance_cells is not None and cell in self._entrance_cells:
+                return CellState.ENTRANCE
+            return CellState.UNVISITED
+        if first_visit_step == path_index - 1:
+            return CellState.CURRENT
+        return CellState.VISITED
+
+    def _colour_cells(self, colourings: Dict[int, CellState]):
+        self._renderer.apply(list(colourings), list(colourings.values()))
@@ -0,0 +1,422 @@
+import copy
+import heapq
+import itertools
+import threading
+from typing import Callable, Dict, Generator, List, Set, Tuple
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from .grid_graph import GridGraph, np
+
+
+# Pathfinding on an abstract graph, as in HPA*. The grid is split into square
+# clusters, and free cell pairs across their borders become entrances. Each
+# cluster keeps the distances between its own entrances, so a query searches
+# the entrances only and then fills in the path inside each cluster it crosses.
+# pylint: disable=too-many-instance-attributes
+class ClusterAbstraction:
+    DEFAULT_CLUSTER_SIDE = 32
+    # Shorter runs of free border pairs get one entrance in the middle, longer
+    # ones an entrance at each end
+    LONG_ENTRANCE_LENGTH = 6
+
+    def __init__(self, grid_graph: GridGraph, cluster_side: int = DEFAULT_CLUSTER_SIDE):
+        self.grid_size: Dim2D = grid_graph.grid_size
+        self.cluster_side = cluster_side
+        # The walls the abstraction was built for, as queries and updates see them
+        self.blocked = bytearray(grid_graph.blocked)
+        self.cluster_columns = -(-self.grid_size.x // cluster_side)
+        self.cluster_rows = -(-self.grid_size.y // cluster_side)
+        self.number_of_clusters = self.cluster_columns * self.cluster_rows
+        # Free cell pairs across each border, keyed by the cluster on its west
+        # or north side and the one on its east or south side
+        self._borders: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+        self.cluster_entrances: List[Set[int]] = [
+            set() for _ in range(self.number_of_clusters)
+        ]
+        # The entrances on the other side of a border from each entrance
+        self.crossings: Dict[int, Set[int]] = {}
+        # Distances between the entrances of a cluster without leaving it
+        self.distances: Dict[int, Dict[int, int]] = {}
+        for cluster in range(self.number_of_clusters):
+            for neighbour in self._get_neighbouring_clusters(cluster):
+                if neighbour > cluster:
+                    self._set_border(cluster, neighbour)
+        for cluster in range(self.number_of_clusters):
+            self._collect_entrances(cluster)
+        if np is not None:
+            self._set_all_distances_with_numpy()
+        else:
+            for cluster in range(self.number_of_clusters):
+                self._set_distances(cluster)
+
+    @property
+    def entrances(self) -> Set[int]:
+        return set(self.crossings)
+
+    def get_cluster(self, cell: int) -> int:
+        y, x = divmod(cell, self.grid_size.x)
+        return (y // self.cluster_side) * self.cluster_columns + x // self.cluster_side
+
+    # Enough of a copy to update without changing what searches of the
+    # original read: update replaces the border lists and distance
+    # dictionaries, but changes the walls and crossing sets in place
+    def copy(self) -> "ClusterAbstraction":
+        abstraction = copy.copy(self)
+        ClusterAbstraction._copy_containers(abstraction)
+        return abstraction
+
+    # Called on a shallow copy to stop it sharing containers with the original
+    def _copy_containers(self):
+        self.blocked = bytearray(self.blocked)
+        self._borders = dict(self._borders)
+        self.cluster_entrances = list(self.cluster_entrances)
+        self.crossings = {
+            cell: set(other_cells) for cell, other_cells in self.crossings.items()
+        }
+        self.distances = dict(self.distances)
+
+    # Copies the changed walls and builds again only the borders of the
+    # clusters they are in, and the distances of the clusters next to those
+    # borders
+    def update(self, cells: List[int], blocked: bytes):
+        clusters = set()
+        for cell in cells:
+            self.blocked[cell] = blocked[cell]
+            clusters.add(self.get_cluster(cell))
+        borders = set()
+        for cluster in clusters:
+            for neighbour in self._get_neighbouring_clusters(cluster):
+                borders.add((min(cluster, neighbour), max(cluster, neighbour)))
+        for border in borders:
+            self._set_border(*border)
+        for cluster in clusters.union(*borders):
+            for entrance in self.cluster_entrances[cluster]:
+                del self.distances[entrance]
+            self._collect_entrances(cluster)
+            self._set_distances(cluster)
+
+    # Yields the start, the entrances it expands and the goal, and returns
+    # the refined path, which can be a little longer than the shortest one
+    def get_steps(
+        self,
+        start_cell: int,
+        goal_cell: int,
+        heuristic: Callable[[int, int, int], float],
+    ) -> Generator[int, None, List[int]]:
+        width = self.grid_size.x
+        start_distances = self._search_cluster(start_cell)[0]
+        start_cluster = self.get_cluster(start_cell)
+        goal_distances = self._search_cluster(goal_cell)[0]
+        goal_cluster = self.get_cluster(goal_cell)
+        costs = {start_cell: 0}
+        parents = {start_cell: -1}
+        closed = set()
+        tie_breaker = itertools.count()
+        open_set = [(0.0, 0.0, next(tie_breaker), start_cell)]
+        while open_set:
+            _, _, _, cell = heapq.heappop(open_set)
+            if cell in closed:
+                continue
+            closed.add(cell)
+            yield cell
+            if cell == goal_cell:
+                abstract_path = [cell]
+                while parents[abstract_path[-1]] >= 0:
+                    abstract_path.append(parents[abstract_path[-1]])
+                return self._refine(abstract_path[::-1])
+            if cell == start_cell:
+                edges = [
+                    (entrance, start_distances[entrance])
+                    for entrance in self.cluster_entrances[start_cluster]
+                    if entrance in start_distances and entrance != start_cell
+                ]
+                if goal_cell in start_distances:
+                    edges.append((goal_cell, start_distances[goal_cell]))
+            else:
+                edges = list(self.distances.get(cell, {}).items())
+                if cell in goal_distances and self.get_cluster(cell) == goal_cluster:
+                    edges.append((goal_cell, goal_distances[cell]))
+            edges.extend((entrance, 1) for entrance in self.crossings.get(cell, ()))
+            for neighbour, distance in edges:
+                if neighbour in closed:
+                    continue
+                cost = costs[cell] + distance
+                if cost < costs.get(neighbour, cost + 1):
+                    costs[neighbour] = cost
+                    parents[neighbour] = cell
+                    heuristic_value = heuristic(neighbour, goal_cell, width)
+                    heapq.heappush(
+                        open_set,
+                        (
+                            cost + heuristic_value,
+                            heuristic_value,
+                            next(tie_breaker),
+                            neighbour,
+                        ),
+                    )
+        return []
+
+    # Cells in [x_begin, x_end) by [y_begin, y_end)
+    def _get_bounds(self, cluster: int) -> Tuple[int, int, int, int]:
+        cluster_y, cluster_x = divmod(cluster, self.cluster_columns)
+        x_begin, y_begin = cluster_x * self.cluster_side, cluster_y * self.cluster_side
+        return (
+            x_begin,
+            y_begin,
+            min(x_begin + self.cluster_side, self.grid_size.x),
+            min(y_begin + self.cluster_side, self.grid_size.y),
+        )
+
+    def _get_neighbouring_clusters(self, cluster: int) -> List[int]:
+        cluster_y, cluster_x = divmod(cluster, self.cluster_columns)
+        neighbours = []
+        if cluster_x > 0:
+            neighbours.append(cluster - 1)
+        if cluster_x + 1 < self.cluster_columns:
+            neighbours.append(cluster + 1)
+        if cluster_y > 0:
+            neighbours.append(cluster - self.cluster_columns)
+        if cluster_y + 1 < self.cluster_rows:
+            neighbours.append(cluster + self.cluster_columns)
+        return neighbours
+
+    def _set_border(self, cluster: int, neighbour: int):
+        for first_cell, second_cell in self._borders.pop((cluster, neighbour), ()):
+            for cell, other_cell in (
+                (first_cell, second_cell),
+                (second_cell, first_cell),
+            ):
+                self.crossings[cell].discard(other_cell)
+                if not self.crossings[cell]:
+                    del self.crossings[cell]
+        pairs = self._find_border_pairs(cluster, neighbour)
+        self._borders[(cluster, neighbour)] = pairs
+        for first_cell, second_cell in pairs:
+            self.crossings.setdefault(first_cell, set()).add(second_cell)
+            self.crossings.setdefault(second_cell, set()).add(first_cell)
+
+    def _find_border_pairs(self, cluster: int, neighbour: int) -> List[Tuple[int, int]]:
+        width = self.grid_size.x
+        x_begin, y_begin, x_end, y_end = self._get_bounds(cluster)
+        if neighbour // self.cluster_columns == cluster // self.cluster_columns:
+            across = 1
+            border_cells = range(
+                y_begin * width + x_end - 1, (y_end - 1) * width + x_end, width
+            )
+        else:
+            across = width
+            border_cells = range(
+                (y_end - 1) * width + x_begin, (y_end - 1) * width + x_end
+            )
+        pairs: List[Tuple[int, int]] = []
+        run: List[int] = []
+        for cell in border_cells:
+            if not self.blocked[cell] and not self.blocked[cell + across]:
+                run.append(cell)
+                continue
+            self._add_entrances(run, across, pairs)
+            run = []
+        self._add_entrances(run, across, pairs)
+        return pairs
+
+    def _add_entrances(self, run: List[int], across: int, pairs: List[Tuple[int, int]]):
+        if not run:
+            return
+        if len(run) < self.LONG_ENTRANCE_LENGTH:
+            cells = [run[len(run) // 2]]
+        else:
+            cells = [run[0], run[-1]]
+        pairs.extend((cell, cell + across) for cell in cells)
+
+    def _collect_entrances(self, cluster: int):
+        entrances = set()
+        for neighbour in self._get_neighbouring_clusters(cluster):
+            pairs = self._borders[(min(cluster, neighbour), max(cluster, neighbour))]
+            side = 0 if cluster < neighbour else 1
+            entrances.update(pair[side] for pair in pairs)
+        self.cluster_entrances[cluster] = entrances
+
+    def _set_distances(self, cluster: int):
+        entrances = self.cluster_entrances[cluster]
+        for entrance in entrances:
+            distances = self._search_cluster(entrance)[0]
+            self.distances[entrance] = {
+                other: distances[other]
+                for other in entrances
+                if other != entrance and other in distances
+            }
+
+    # Breadth first from the k-th entrance of every cluster at once, one
+    # layer of the whole grid per step
+    def _set_all_distances_with_numpy(self):
+        width, height = self.grid_size.x, self.grid_size.y
+        number_of_cells = width * height
+        free = np.frombuffer(bytes(self.blocked), dtype=np.uint8) == 0
+        clusters = (
+            (np.arange(height, dtype=np.int32) // self.cluster_side)[:, None]
+            * self.cluster_columns
+            + (np.arange(width, dtype=np.int32) // self.cluster_side)[None, :]
+        ).ravel()
+        # Whether a step from each cell by each offset stays free and inside
+        # its cluster
+        steps = []
+        for offset, edge_column in (
+            (1, width - 1),
+            (-1, 0),
+            (width, None),
+            (-width, None),
+        ):
+            can_step = np.zeros(number_of_cells, dtype=bool)
+            cells = slice(max(0, -offset), number_of_cells - max(0, offset))
+            neighbours = slice(max(0, offset), number_of_cells - max(0, -offset))
+            can_step[cells] = (
+                free[cells]
+                & free[neighbours]
+                & (clusters[cells] == clusters[neighbours])
+            )
+            # Flat neighbours past the first and last columns are in other rows,
+            # which are in the same cluster when the grid is one cluster wide
+            if edge_column is not None:
+                can_step.reshape(height, width)[:, edge_column] = False
+            steps.append((offset, can_step))
+        cluster_entrances = [sorted(entrances) for entrances in self.cluster_entrances]
+        for entrances in cluster_entrances:
+            for entrance in entrances:
+                self.distances[entrance] = {}
+        all_entrances = np.array(
+            [entrance for entrances in cluster_entrances for entrance in entrances],
+            dtype=np.int64,
+        )
+        # Marks the first of repeated candidates, without sorting them
+        owners = np.empty(number_of_cells, dtype=np.int64)
+        maximum_entrances = max(map(len, cluster_entrances), default=0)
+        for k in range(maximum_entrances):
+            sources = np.array(
+                [entrances[k] for entrances in cluster_entrances if len(entrances) > k],
+                dtype=np.int64,
+            )
+            distances = np.full(number_of_cells, -1, dtype=np.int32)
+            distances[sources] = 0
+            frontier, depth = sources, 0
+            while frontier.size:
+                depth += 1
+                candidates = []
+                for offset, can_step in steps:
+                    neighbours = frontier[can_step[frontier]] + offset
+                    candidates.append(neighbours[distances[neighbours] < 0])
+                candidates = np.concatenate(candidates)
+                positions = np.arange(candidates.size)
+                owners[candidates] = positions
+                frontier = candidates[owners[candidates] == positions]
+                distances[frontier] = depth
+            entrance_distances = distances[all_entrances].tolist()
+            index = 0
+            for entrances in cluster_entrances:
+                if len(entrances) > k:
+                    source_distances = self.distances[entrances[k]]
+                    for offset, entrance in enumerate(entrances):
+                        distance = entrance_distances[index + offset]
+                        if distance > 0:
+                            source_distances[entrance] = distance
+                index += len(entrances)
+
+    # Breadth first without leaving the source's cluster, returning the
+    # distances and parents of the cells it reaches
+    def _search_cluster(self, source: int) -> Tuple[Dict[int, int], Dict[int, int]]:
+        width = self.grid_size.x
+        x_begin, y_begin, x_end, y_end = self._get_bounds(self.get_cluster(source))
+        blocked = self.blocked
+        distances = {source: 0}
+        parents = {source: -1}
+        frontier = [source]
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for cell in frontier:
+                y, x = divmod(cell, width)
+                for neighbour, is_inside in (
+                    (cell + 1, x + 1 < x_end),
+                    (cell - 1, x > x_begin),
+                    (cell + width, y + 1 < y_end),
+                    (cell - width, y > y_begin),
+                ):
+                    if (
+                        is_inside
+                        and neighbour not in distances
+                        and not blocked[neighbour]
+                    ):
+                        distances[neighbour] = depth
+                        parents[neighbour] = cell
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+        return distances, parents
+
+    # Consecutive abstract cells are either across a border or in one cluster
+    def _refine(self, abstract_path: List[int]) -> List[int]:
+        path = abstract_path[:1]
+        for cell in abstract_path[1:]:
+            previous_cell = path[-1]
+            if cell in self.crossings.get(previous_cell, ()):
+                path.append(cell)
+                continue
+            parents = self._search_cluster(previous_cell)[1]
+            segment = [cell]
+            while parents[segment[-1]] != previous_cell:
+                segment.append(parents[segment[-1]])
+            path.extend(reversed(segment))
+        return path
+
+
+def get_changed_cells(old_blocked: bytes, new_blocked: bytes) -> List[int]:
+    if np is not None:
+        return np.flatnonzero(
+            np.frombuffer(old_blocked, dtype=np.uint8)
+            != np.frombuffer(new_blocked, dtype=np.uint8)
+        ).tolist()
+    old_view, new_view = memoryview(old_blocked), memoryview(new_blocked)
+    changed = []
+    chunk_size = 4096
+    for begin in range(0, len(new_view), chunk_size):
+        end = min(begin + chunk_size, len(new_view))
+        if old_view[begin:end] != new_view[begin:end]:
+            changed.extend(
+                cell for cell in range(begin, end) if old_view[cell] != new_view[cell]
+            )
+    return changed
+
+
+_ABSTRACTIONS_LOCK = threading.Lock()
+# Most recently used first
+_abstractions: List[ClusterAbstraction] = []
+MAXIMUM_CACHED_ABSTRACTIONS = 4
+
+
+# Built once per map. A cached abstraction of the same grid whose walls have
+# since changed in a few cells is copied and updated; each changed cell can
+# touch five clusters, so past one per cluster a new build is cheaper.
+# Cached abstractions are never changed, so a search on another thread can
+# keep reading the one it was given.
+def get_cluster_abstraction(
+    grid_graph: GridGraph, cluster_side: int = ClusterAbstraction.DEFAULT_CLUSTER_SIDE
+) -> ClusterAbstraction:
+    with _ABSTRACTIONS_LOCK:
+        for index, abstraction in enumerate(_abstractions):
+            if (
+                abstraction.grid_size != grid_graph.grid_size
+                or abstraction.cluster_side != cluster_side
+            ):
+                continue
+            changed_cells = get_changed_cells(abstraction.blocked, grid_graph.blocked)
+            if len(changed_cells) <= abstraction.number_of_clusters:
+                _abstractions.pop(index)
+                if changed_cells:
+                    abstraction = abstraction.copy()
+                    abstraction.update(changed_cells, grid_graph.blocked)
+                _abstractions.insert(0, abstraction)
+                return abstraction
+        abstraction = ClusterAbstraction(grid_graph, cluster_side)
+        _abstractions.insert(0, abstraction)
+        del _abstractions[MAXIMUM_CACHED_ABSTRACTIONS:]
+        return abstraction
@@ -0,0 +1,275 @@
+import functools
+from array import array
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from .grid_graph import np
+
+
+# JPS+ on a 4-connected grid. For every cell and direction, the distance to
+# the next cell a jump has to stop at, or zero or less when a wall or the
+# edge comes first: the negated number of free cells before it. Jumps stop at
+# cells with a forced neighbour, and vertical jumps also at cells from which a
+# horizontal jump would find one. Each jump is then one lookup.
+@dataclass
+class JumpDistances:
+    width: int
+    height: int
+    blocked: bytes
+    east: array
+    west: array
+    south: array
+    north: array
+
+
+# Worked out once per map and cached. The blocked flags are passed as bytes
+# to be the cache key.
+@functools.lru_cache(maxsize=4)
+def get_jump_distances(width: int, height: int, blocked: bytes) -> JumpDistances:
+    if np is not None:
+        return create_jump_distances_with_numpy(width, height, blocked)
+    return create_jump_distances(width, height, blocked)
+
+
+# The cells each direction's jumps stop at, as boolean grids
+def get_jump_points_with_numpy(free):
+    height, width = free.shape
+    padded = np.pad(free, 1)
+
+    def is_free(x_offset, y_offset):
+        return padded[
+            1 + y_offset : 1 + y_offset + height, 1 + x_offset : 1 + x_offset + width
+        ]
+
+    east = free & (
+        (is_free(0, -1) & ~is_free(-1, -1)) | (is_free(0, 1) & ~is_free(-1, 1))
+    )
+    west = free & (
+        (is_free(0, -1) & ~is_free(1, -1)) | (is_free(0, 1) & ~is_free(1, 1))
+    )
+    south = free & (
+        (is_free(-1, 0) & ~is_free(-1, -1)) | (is_free(1, 0) & ~is_free(1, -1))
+    )
+    north = free & (
+        (is_free(-1, 0) & ~is_free(-1, 1)) | (is_free(1, 0) & ~is_free(1, 1))
+    )
+    # The nearest east jump point and wall at or after each cell, and the
+    # nearest west ones at or before it
+    columns = np.arange(width, dtype=np.int32)
+    next_east = np.minimum.accumulate(np.where(east, columns, width)[:, ::-1], axis=1)
+    next_wall = np.minimum.accumulate(np.where(free, width, columns)[:, ::-1], axis=1)
+    next_east, next_wall = next_east[:, ::-1], next_wall[:, ::-1]
+    previous_west = np.maximum.accumulate(np.where(west, columns, -1), axis=1)
+    previous_wall = np.maximum.accumulate(np.where(free, -1, columns), axis=1)
+    branches = np.zeros_like(free)
+    branches[:, :-1] = next_east[:, 1:] < next_wall[:, 1:]
+    branches[:, 1:] |= previous_west[:, :-1] > previous_wall[:, :-1]
+    branches &= free
+    return east, west, south | branches, north | branches
+
+
+# Jump distances along each row, towards its end
+def get_row_jump_distances_with_numpy(jump_points, free):
+    width = free.shape[1]
+    columns = np.arange(width, dtype=np.int32)
+    # The nearest jump point and wall after each cell
+    next_jump_point = np.minimum.accumulate(
+        np.where(jump_points, columns, width)[:, ::-1], axis=1
+    )[:, ::-1]
+    next_wall = np.minimum.accumulate(np.where(free, width, columns)[:, ::-1], axis=1)[
+        :, ::-1
+    ]
+    next_jump_point = np.pad(
+        next_jump_point[:, 1:], ((0, 0), (0, 1)), constant_values=width
+    )
+    next_wall = np.pad(next_wall[:, 1:], ((0, 0), (0, 1)), constant_values=width)
+    return np.where(
+        next_jump_point < next_wall,
+        next_jump_point - columns,
+        columns + 1 - next_wall,
+    ).astype(np.int32)
+
+
+# West and north are the rows and columns reversed, south and north are done
+# on the transposed grid
+def create_jump_distances_with_numpy(
+    width: int, height: int, blocked: bytes
+) -> JumpDistances:
+    free = np.frombuffer(blocked, dtype=np.uint8).reshape(height, width) == 0
+    east, west, south, north = get_jump_points_with_numpy(free)
+
+    def to_array(distances):
+        distance_array = array("i")
+        distance_array.frombytes(np.ascontiguousarray(distances).tobytes())
+        return distance_array
+
+    return JumpDistances(
+        width,
+        height,
+        blocked,
+        to_array(get_row_jump_distances_with_numpy(east, free)),
+        to_array(
+            get_row_jump_distances_with_numpy(west[:, ::-1], free[:, ::-1])[:, ::-1]
+        ),
+        to_array(get_row_jump_distances_with_numpy(south.T, free.T).T),
+        to_array(
+            get_row_jump_distances_with_numpy(north.T[:, ::-1], free.T[:, ::-1])[
+                :, ::-1
+            ].T
+        ),
+    )
+
+
+# Same jump points cell by cell, for when NumPy is not installed
+def get_jump_points(width: int, height: int, blocked: bytes):
+    def is_free(x, y):
+        return 0 <= x < width and 0 <= y < height and not blocked[y * width + x]
+
+    number_of_cells = width * height
+    east, west = bytearray(number_of_cells), bytearray(number_of_cells)
+    south, north = bytearray(number_of_cells), bytearray(number_of_cells)
+    for y in range(height):
+        for x in range(width):
+            if not is_free(x, y):
+                continue
+            cell = y * width + x
+            east[cell] = (is_free(x, y - 1) and not is_free(x - 1, y - 1)) or (
+                is_free(x, y + 1) and not is_free(x - 1, y + 1)
+            )
+            west[cell] = (is_free(x, y - 1) and not is_free(x + 1, y - 1)) or (
+                is_free(x, y + 1) and not is_free(x + 1, y + 1)
+            )
+            south[cell] = (is_free(x - 1, y) and not is_free(x - 1, y - 1)) or (
+                is_free(x + 1, y) and not is_free(x + 1, y - 1)
+            )
+            north[cell] = (is_free(x - 1, y) and not is_free(x - 1, y + 1)) or (
+                is_free(x + 1, y) and not is_free(x + 1, y + 1)
+            )
+        is_reaching = False
+        for x in range(width - 1, -1, -1):
+            cell = y * width + x
+            if is_reaching and not blocked[cell]:
+                south[cell] = north[cell] = 1
+            is_reaching = not blocked[cell] and (east[cell] or is_reaching)
+        is_reaching = False
+        for x in range(width):
+            cell = y * width + x
+            if is_reaching and not blocked[cell]:
+                south[cell] = north[cell] = 1
+            is_reaching = not blocked[cell] and (west[cell] or is_reaching)
+    return east, west, south, north
+
+
+# Walks a row or column backwards from its end, the cells given in the
+# direction of the jump
+def set_jump_distances(
+    distances: array, cells: Sequence[int], blocked: bytes, jump_points: bytes
+):
+    distance = 0
+    for cell in reversed(cells):
+        if blocked[cell]:
+            distance = 0
+            continue
+        distances[cell] = distance
+        if jump_points[cell]:
+            distance = 1
+        elif distance > 0:
+            distance += 1
+        else:
+            distance -= 1
+
+
+def create_jump_distances(width: int, height: int, blocked: bytes) -> JumpDistances:
+    east, west, south, north = get_jump_points(width, height, blocked)
+    number_of_cells = width * height
+    jump_distances = JumpDistances(
+        width,
+        height,
+        blocked,
+        *(array("i", [0]) * number_of_cells for _ in range(4)),
+    )
+    for row in range(0, number_of_cells, width):
+        set_jump_distances(jump_distances.east, range(row, row + width), blocked, east)
+        set_jump_distances(
+            jump_distances.west, range(row + width - 1, row - 1, -1), blocked, west
+        )
+    for x in range(width):
+        set_jump_distances(
+            jump_distances.south, range(x, number_of_cells, width), blocked, south
+        )
+        set_jump_distances(
+            jump_distances.north,
+            range(number_of_cells - width + x, -1, -width),
+            blocked,
+            north,
+        )
+    return jump_distances
+
+
+# Jumps from a cell to the next jump point in a direction, stopping early at
+# the goal, or in the goal's row for vertical jumps that can reach it
+class JumpPointFinder:
+    def __init__(self, jump_distances: JumpDistances, goal_cell: int):
+        self.jump_distances = jump_distances
+        self.goal_cell = goal_cell
+        self.goal_y, self.goal_x = divmod(goal_cell, jump_distances.width)
+
+    # Straight on and both sides, or every direction from the start
+    def get_successors(self, cell: int, parent: int) -> List[int]:
+        width = self.jump_distances.width
+        y, x = divmod(cell, width)
+        if parent < 0:
+            jumps = (self.jump_east, self.jump_west, self.jump_south, self.jump_north)
+        elif parent // width == y:
+            jumps = (
+                self.jump_east if parent < cell else self.jump_west,
+                self.jump_south,
+                self.jump_north,
+            )
+        else:
+            jumps = (
+                self.jump_south if parent < cell else self.jump_north,
+                self.jump_east,
+                self.jump_west,
+            )
+        successors = []
+        for jump in jumps:
+            jump_point = jump(cell, x, y)
+            if jump_point is not None:
+                successors.append(jump_point)
+        return successors
+
+    def jump_east(self, cell: int, x: int, y: int) -> Optional[int]:
+        distance = self.jump_distances.east[cell]
+        if y == self.goal_y and x < self.goal_x <= x + abs(distance):
+            return self.goal_cell
+        return cell + distance if distance > 0 else None
+
+    def jump_west(self, cell: int, x: int, y: int) -> Optional[int]:
+        distance = self.jump_distances.west[cell]
+        if y == self.goal_y and x - abs(distance) <= self.goal_x < x:
+            return self.goal_cell
+        return cell - distance if distance > 0 else None
+
+    def jump_south(self, cell: int, x: int, y: int) -> Optional[int]:
+        distance = self.jump_distances.south[cell]
+        if y < self.goal_y <= y + abs(distance) and self._is_goal_in_reach(x):
+            return self.goal_y * self.jump_distances.width + x
+        return cell + distance * self.jump_distances.width if distance > 0 else None
+
+    def jump_north(self, cell: int, x: int, y: int) -> Optional[int]:
+        distance = self.jump_distances.north[cell]
+        if y - abs(distance) <= self.goal_y < y and self._is_goal_in_reach(x):
+            return self.goal_y * self.jump_distances.width + x
+        return cell - distance * self.jump_distances.width if distance > 0 else None
+
+    # No wall between the goal and column x of the goal's row. Only vertical
+    # jumps across the goal's row scan for it.
+    def _is_goal_in_reach(self, x: int) -> bool:
+        row = self.goal_y * self.jump_distances.width
+        return (
+            self.jump_distances.blocked.find(
+                1, row + min(x, self.goal_x), row + max(x, self.goal_x) + 1
+            )
+            < 0
+        )
@@ -0,0 +1,59 @@
+import time
+from collections import deque
+
+
+class PlaybackScheduler:
+    # Longest wall time a single tick can catch up on, so a stalled Tk loop
+    # does not dump a huge burst of steps in one frame
+    MAXIMUM_CATCH_UP_IN_SECONDS = 0.25
+    MEASUREMENT_WINDOW_IN_SECONDS = 1.0
+
+    def __init__(self, frames_per_second=60):
+        self.frames_per_second = frames_per_second
+        self._last_tick_time = None
+        self._step_debt = 0.0
+        self._applied_steps: deque = deque()
+
+    @property
+    def frame_interval_in_milliseconds(self) -> int:
+        return max(1, round(1000 / self.frames_per_second))
+
+    def reset(self):
+        self._last_tick_time = None
+        self._step_debt = 0.0
+        self._applied_steps.clear()
+
+    def get_steps_due(self, steps_per_second: float) -> int:
+        now = time.perf_counter()
+        if self._last_tick_time is None:
+            elapsed = 1 / self.frames_per_second
+        else:
+            elapsed = min(
+                now - self._last_tick_time,
+                PlaybackScheduler.MAXIMUM_CATCH_UP_IN_SECONDS,
+            )
+        self._last_tick_time = now
+        self._step_debt += elapsed * steps_per_second
+        steps_due = int(self._step_debt)
+        self._step_debt -= steps_due
+        return steps_due
+
+    def record_applied_steps(self, number_of_steps: int):
+        now = time.perf_counter()
+        self._applied_steps.append((now, number_of_steps))
+        while (
+            now - self._applied_steps[0][0]
+            > PlaybackScheduler.MEASUREMENT_WINDOW_IN_SECONDS
+        ):
+            self._applied_steps.popleft()
+
+    @property
+    def achieved_steps_per_second(self) -> float:
+        if len(self._applied_steps) < 2:
+            return 0.0
+        window = self._applied_steps[-1][0] - self._applied_steps[0][0]
+        if window <= 0:
+            return 0.0
+        # The first entry only marks the window start
+        steps = sum(number_of_steps for _, number_of_steps in self._applied_steps)
+        return (steps - self._applied_steps[0][1]) / window
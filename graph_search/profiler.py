@@ -0,0 +1,164 @@
+import csv
+import json
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, fields
+from typing import Deque, Dict, List, Optional
+
+
+# pylint: disable=too-many-instance-attributes
+@dataclass
+class TickRecord:
+    time_in_seconds: float
+    # How late Tk ran the tick compared with when it was scheduled for
+    lag_in_milliseconds: float
+    tick_in_milliseconds: float
+    apply_in_milliseconds: float
+    applied_steps: int
+    requested_steps_per_second: float
+    achieved_steps_per_second: float
+    search_steps: int
+
+
+# pylint: disable=too-many-instance-attributes
+class PlaybackProfiler:
+    MAXIMUM_RECORDS = 100_000
+    # Percentiles and frame rate cover the most recent ticks only
+    SUMMARY_WINDOW_IN_SECONDS = 2.0
+
+    def __init__(self):
+        self.records: Deque[TickRecord] = deque(maxlen=PlaybackProfiler.MAXIMUM_RECORDS)
+        self._start_time = time.perf_counter()
+        self._due_time: Optional[float] = None
+        self._tick_start_time = 0.0
+        self._apply_seconds = 0.0
+        self._applied_steps = 0
+        # From building the grid view to the end of the first tick that shows
+        # it, once at start up and once per options change
+        self.first_frame_times_in_seconds: List[float] = []
+        self._first_frame_start_time: Optional[float] = None
+
+    def start_first_frame(self):
+        self._first_frame_start_time = time.perf_counter()
+
+    def schedule(self, in_milliseconds: int):
+        self._due_time = time.perf_counter() + in_milliseconds / 1000
+
+    def start_tick(self):
+        self._tick_start_time = time.perf_counter()
+        self._apply_seconds = 0.0
+        self._applied_steps = 0
+
+    def record_apply(self, elapsed_seconds: float, number_of_steps: int):
+        self._apply_seconds += elapsed_seconds
+        self._applied_steps += number_of_steps
+
+    def end_tick(
+        self,
+        requested_steps_per_second: float,
+        achieved_steps_per_second: float,
+        search_steps: int,
+    ):
+        now = time.perf_counter()
+        lag_seconds = (
+            0.0 if self._due_time is None else self._tick_start_time - self._due_time
+        )
+        self.records.append(
+            TickRecord(
+                self._tick_start_time - self._start_time,
+                lag_seconds * 1000,
+                (now - self._tick_start_time) * 1000,
+                self._apply_seconds * 1000,
+                self._applied_steps,
+                requested_steps_per_second,
+                achieved_steps_per_second,
+                search_steps,
+            )
+        )
+        if self._first_frame_start_time is not None:
+            self.first_frame_times_in_seconds.append(now - self._first_frame_start_time)
+            self._first_frame_start_time = None
+
+    def get_recent_records(self) -> List[TickRecord]:
+        if not self.records:
+            return []
+        window_start = (
+            self.records[-1].time_in_seconds
+            - PlaybackProfiler.SUMMARY_WINDOW_IN_SECONDS
+        )
+        recent_records = []
+        for record in reversed(self.records):
+            if record.time_in_seconds < window_start:
+                break
+            recent_records.append(record)
+        recent_records.reverse()
+        return recent_records
+
+    @staticmethod
+    def get_percentile(values: List[float], percentile: float) -> float:
+        if not values:
+            return 0.0
+        sorted_values = sorted(values)
+        return sorted_values[
+            min(len(sorted_values) - 1, int(len(sorted_values) * percentile / 100))
+        ]
+
+    def get_summary(self) -> Dict[str, float]:
+        recent_records = self.get_recent_records()
+        lags = [record.lag_in_milliseconds for record in recent_records]
+        ticks = [record.tick_in_milliseconds for record in recent_records]
+        window = (
+            recent_records[-1].time_in_seconds - recent_records[0].time_in_seconds
+            if len(recent_records) > 1
+            else 0.0
+        )
+        return {
+            "frames_per_second": (len(recent_records) - 1) / window if window else 0.0,
+            "lag_p50_in_milliseconds": PlaybackProfiler.get_percentile(lags, 50),
+            "lag_p99_in_milliseconds": PlaybackProfiler.get_percentile(lags, 99),
+            "tick_p50_in_milliseconds": PlaybackProfiler.get_percentile(ticks, 50),
+            "tick_p99_in_milliseconds": PlaybackProfiler.get_percentile(ticks, 99),
+            "achieved_steps_per_second": (
+                recent_records[-1].achieved_steps_per_second if recent_records else 0.0
+            ),
+            "first_frame_in_milliseconds": (
+                self.first_frame_times_in_seconds[-1] * 1000
+                if self.first_frame_times_in_seconds
+                else 0.0
+            ),
+        }
+
+    def get_overlay_text(self) -> str:
+        summary = self.get_summary()
+        return (
+            f"{summary['frames_per_second']:.0f} fps, "
+            f"lag p50 {summary['lag_p50_in_milliseconds']:.1f} ms "
+            f"p99 {summary['lag_p99_in_milliseconds']:.1f} ms, "
+            f"tick p99 {summary['tick_p99_in_milliseconds']:.1f} ms, "
+            f"first frame {summary['first_frame_in_milliseconds']:.0f} ms"
+        )
+
+    # The format follows the file suffix: .csv for one row per tick, JSON
+    # with the summary otherwise
+    def export(self, path: str):
+        if path.lower().endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
+
+    def export_csv(self, path: str):
+        with open(path, "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow([field.name for field in fields(TickRecord)])
+            for record in self.records:
+                writer.writerow(asdict(record).values())
+
+    def export_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as json_file:
+            json.dump(
+                {
+                    "summary": self.get_summary(),
+                    "records": [asdict(record) for record in self.records],
+                },
+                json_file,
+            )
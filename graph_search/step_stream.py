@@ -0,0 +1,188 @@
+import itertools
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Deque, List, Optional
+
+from .algorithms import SearchStatistics, SearchStrategy
+from .grid_graph import GridGraph
+from .trace import SearchTrace
+
+
+# Bounded single producer, single consumer queue of packed step chunks. The
+# consumer never blocks: deque appends and pops are atomic, and only the
+# producer waits on the free slot count when the consumer falls behind.
+class StepChannel:
+    CHUNK_SIZE = 4096
+    MAXIMUM_CHUNKS = 64
+    WAIT_IN_SECONDS = 0.1
+    END_OF_STREAM = None
+
+    def __init__(self, maximum_chunks: int = MAXIMUM_CHUNKS):
+        self._chunks: Deque[Optional[array]] = deque()
+        self._free_slots = threading.Semaphore(maximum_chunks)
+        self._is_cancelled = threading.Event()
+        self._is_finished = False
+
+    # Waits for a free slot and returns False if the consumer cancelled
+    def put(self, chunk: array) -> bool:
+        while not self._is_cancelled.is_set():
+            if self._free_slots.acquire(timeout=StepChannel.WAIT_IN_SECONDS):
+                self._chunks.append(chunk)
+                return True
+        return False
+
+    def close(self):
+        self._chunks.append(StepChannel.END_OF_STREAM)
+
+    def cancel(self):
+        self._is_cancelled.set()
+
+    # None either when nothing is produced yet or at the end, which is_finished
+    # tells apart
+    def get_nowait(self) -> Optional[array]:
+        if not self._chunks:
+            return None
+        chunk = self._chunks.popleft()
+        if chunk is StepChannel.END_OF_STREAM:
+            self._is_finished = True
+            return None
+        self._free_slots.release()
+        return chunk
+
+    @property
+    def is_finished(self) -> bool:
+        return self._is_finished
+
+
+# Runs a search strategy on its own thread and streams the expanded cells
+# pylint: disable=too-many-instance-attributes
+class SearchWorker(threading.Thread):
+    def __init__(
+        self,
+        search_strategy: SearchStrategy,
+        grid_graph: GridGraph,
+        start_cell: int,
+        goal_cell: Optional[int] = None,
+    ):
+        super().__init__(daemon=True)
+        self.search_strategy = search_strategy
+        self.grid_graph = grid_graph
+        self.start_cell = start_cell
+        self.goal_cell = goal_cell
+        self.channel = StepChannel()
+        self.typecode = SearchTrace.get_typecode(grid_graph.number_of_cells)
+        # Set once the channel is finished: the path and statistics of a
+        # search that ran to the end, or the error of one that raised
+        self.path = array(self.typecode)
+        self.statistics: Optional[SearchStatistics] = None
+        self.error: Optional[Exception] = None
+
+    def run(self):
+        path: List[int] = []
+
+        def collect_steps():
+            nonlocal path
+            path = yield from self.search_strategy.get_steps(
+                self.grid_graph, self.start_cell, self.goal_cell
+            )
+
+        expansions = 0
+        waiting_seconds = 0.0
+        chunk = array(self.typecode)
+        start_time = time.perf_counter()
+        try:
+            for cell in collect_steps():
+                chunk.append(cell)
+                if len(chunk) == StepChannel.CHUNK_SIZE:
+                    expansions += len(chunk)
+                    waiting_start_time = time.perf_counter()
+                    if not self.channel.put(chunk):
+                        return
+                    waiting_seconds += time.perf_counter() - waiting_start_time
+                    chunk = array(self.typecode)
+            if chunk and not self.channel.put(chunk):
+                return
+            expansions += len(chunk)
+            self.path.extend(path)
+            # Time spent blocked on the consumer is not search time
+            self.statistics = SearchStatistics(
+                self.search_strategy.algorithm,
+                expansions,
+                len(path),
+                time.perf_counter() - start_time - waiting_seconds,
+            )
+        # Kept for the consumer, which sees the end of the channel next
+        except Exception as error:  # pylint: disable=broad-except
+            self.error = error
+        finally:
+            self.channel.close()
+
+    def stop(self):
+        self.channel.cancel()
+        self.join()
+
+
+# Runs a search strategy on the GUI thread a few milliseconds per tick. There
+# is no thread to start or join: dropping the object cancels the search.
+# pylint: disable=too-many-instance-attributes
+class TimeSlicedSearch:
+    TIME_BUDGET_IN_SECONDS = 0.004
+    # The clock is only read between batches of this many steps
+    BATCH_SIZE = 64
+
+    def __init__(
+        self,
+        search_strategy: SearchStrategy,
+        grid_graph: GridGraph,
+        start_cell: int,
+        goal_cell: Optional[int] = None,
+    ):
+        self.search_strategy = search_strategy
+        self.start_cell = start_cell
+        self.goal_cell = goal_cell
+        self.typecode = SearchTrace.get_typecode(grid_graph.number_of_cells)
+        # Both are only set once the search is finished
+        self.path = array(self.typecode)
+        self.statistics: Optional[SearchStatistics] = None
+        self.is_finished = False
+        self._search_seconds = 0.0
+
+        def collect_steps():
+            path = yield from search_strategy.get_steps(
+                grid_graph, start_cell, goal_cell
+            )
+            self.path.extend(path)
+
+        self._steps = collect_steps()
+
+    # Appends the steps found within the time budget to the trace
+    def advance(
+        self,
+        search_trace: SearchTrace,
+        time_budget_in_seconds: float = TIME_BUDGET_IN_SECONDS,
+    ):
+        if self.is_finished:
+            return
+        start_time = time.perf_counter()
+        deadline = start_time + time_budget_in_seconds
+        while True:
+            batch = array(
+                self.typecode,
+                itertools.islice(self._steps, TimeSlicedSearch.BATCH_SIZE),
+            )
+            search_trace.extend(batch)
+            if len(batch) < TimeSlicedSearch.BATCH_SIZE:
+                self.is_finished = True
+                break
+            if time.perf_counter() >= deadline:
+                break
+        self._search_seconds += time.perf_counter() - start_time
+        if self.is_finished:
+            self.statistics = SearchStatistics(
+                self.search_strategy.algorithm,
+                len(search_trace),
+                len(self.path),
+                self._search_seconds,
+            )
@@ -0,0 +1,485 @@
+import asyncio
+import base64
+import contextlib
+import hashlib
+import struct
+import zlib
+from array import array
+from enum import IntEnum
+from typing import AsyncIterator, List, Optional, Sequence, Set, Tuple
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from .algorithms import Algorithm, SearchStatistics
+from .batch import BatchRun, create_batch_problem
+from .grid_graph import np
+from .step_stream import SearchWorker
+from .utils import CellState, Utils
+
+# Sent first by plain TCP viewers, where browsers send a WebSocket request
+STREAM_MAGIC = b"GSSTREAM"
+STREAM_VERSION = 1
+# Frame type and payload length, in front of every frame
+STREAM_FRAME_HEADER = struct.Struct("<BI")
+# Version, grid width and height, start and goal cells (-1 without a goal),
+# seed, algorithm and heuristic
+STREAM_RUN_HEADER = struct.Struct("<HIIqqq32s16s")
+# Steps taken so far, in front of snapshots and deltas
+STREAM_STEP_COUNT = struct.Struct("<Q")
+# A cell index and its new CellState
+STREAM_DELTA = struct.Struct("<IB")
+# Expansions, path length and elapsed seconds, in front of the path cells
+STREAM_END_HEADER = struct.Struct("<QQd")
+STREAM_COMPRESSION_LEVEL = 1
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WEBSOCKET_BINARY_OPCODE = 0x2
+WEBSOCKET_CLOSE_OPCODE = 0x8
+
+
+class StreamFrameType(IntEnum):
+    # A new run and its problem
+    RUN = 1
+    # The state byte of every cell, compressed
+    SNAPSHOT = 2
+    DELTAS = 3
+    # Statistics and path of the finished run
+    END = 4
+    # In place of END for a run whose search raised, with the error as UTF-8
+    ERROR = 5
+
+
+def encode_frame(frame_type: StreamFrameType, payload: bytes) -> bytes:
+    return STREAM_FRAME_HEADER.pack(frame_type, len(payload)) + payload
+
+
+def encode_deltas(cells: Sequence[int], states: Sequence[int]) -> bytes:
+    if np is not None:
+        deltas = np.empty(len(cells), dtype=[("cell", "<u4"), ("state", "u1")])
+        deltas["cell"] = cells
+        deltas["state"] = states
+        return deltas.tobytes()
+    return b"".join(map(STREAM_DELTA.pack, cells, states))
+
+
+def encode_websocket_message(
+    payload: bytes, opcode: int = WEBSOCKET_BINARY_OPCODE
+) -> bytes:
+    first_byte = 0x80 | opcode
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", first_byte, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", first_byte, 126, length)
+    else:
+        header = struct.pack("!BBQ", first_byte, 127, length)
+    return header + payload
+
+
+# Viewers only send a WebSocket close, which like the end of the connection
+# means they are gone. Anything else they send is read and ignored.
+async def read_until_closed(reader: asyncio.StreamReader, is_websocket: bool):
+    try:
+        while True:
+            if not is_websocket:
+                if not await reader.read(4096):
+                    return
+                continue
+            first_byte, second_byte = await reader.readexactly(2)
+            length = second_byte & 0x7F
+            if length == 126:
+                (length,) = struct.unpack("!H", await reader.readexactly(2))
+            elif length == 127:
+                (length,) = struct.unpack("!Q", await reader.readexactly(8))
+            # Frames from browsers are masked, and the mask is skipped as well
+            await reader.readexactly(length + (4 if second_byte & 0x80 else 0))
+            if first_byte & 0x0F == WEBSOCKET_CLOSE_OPCODE:
+                return
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return
+
+
+# A connected viewer. Its frames wait in a bounded queue that its own task
+# writes out, so a slow connection only holds up itself.
+class StreamViewer:
+    MAXIMUM_QUEUED_FRAMES = 64
+    END_OF_STREAM = None
+
+    def __init__(self, writer: asyncio.StreamWriter, is_websocket: bool):
+        self.writer = writer
+        self.is_websocket = is_websocket
+        self.frames: asyncio.Queue = asyncio.Queue(StreamViewer.MAXIMUM_QUEUED_FRAMES)
+        # Times the viewer fell behind and skipped to the current state
+        self.number_of_resyncs = 0
+
+    def clear(self):
+        while not self.frames.empty():
+            self.frames.get_nowait()
+
+    async def write_frames(self):
+        while True:
+            frame = await self.frames.get()
+            if frame is StreamViewer.END_OF_STREAM:
+                if self.is_websocket:
+                    self.writer.write(
+                        encode_websocket_message(b"", WEBSOCKET_CLOSE_OPCODE)
+                    )
+                await self.writer.drain()
+                return
+            self.writer.write(
+                encode_websocket_message(frame) if self.is_websocket else frame
+            )
+            await self.writer.drain()
+
+
+# Runs searches headless, one after another, and streams their steps to any
+# number of viewers as frames of cell deltas. Plain TCP viewers send
+# STREAM_MAGIC and get the frames as they are, browsers connect with a
+# WebSocket and get a binary message per frame. A run only starts or goes on
+# while someone is watching, and viewers joining later start from a snapshot.
+# pylint: disable=too-many-instance-attributes
+class StreamServer:
+    # Wait between polls while the search has no steps ready
+    IDLE_WAIT_IN_SECONDS = 0.01
+
+    def __init__(
+        self,
+        batch_runs: List[BatchRun],
+        steps_per_frame: int = 1000,
+        frame_delay_in_milliseconds: int = 40,
+    ):
+        self.batch_runs = batch_runs
+        self.steps_per_frame = steps_per_frame
+        self.frame_delay_in_seconds = frame_delay_in_milliseconds / 1000
+        self.viewers: Set[StreamViewer] = set()
+        # Both are only set once serving, the port for servers asked for port 0
+        self.port: Optional[int] = None
+        self.is_serving: Optional[asyncio.Event] = None
+        self._has_viewers: Optional[asyncio.Event] = None
+        self._connections: Set[asyncio.Task] = set()
+        self._cell_states = bytearray()
+        self._number_of_steps = 0
+        self._run_frame: Optional[bytes] = None
+        self._end_frame: Optional[bytes] = None
+        # Kept until the state changes, for all the viewers catching up
+        self._state_frames: Optional[List[bytes]] = None
+
+    async def serve(self, host: str, port: int):
+        self.is_serving = asyncio.Event()
+        self._has_viewers = asyncio.Event()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        self.port = server.sockets[0].getsockname()[1]
+        print(f"Streaming {len(self.batch_runs)} runs on {host}:{self.port}")
+        self.is_serving.set()
+        async with server:
+            for batch_run in self.batch_runs:
+                await self._has_viewers.wait()
+                await self._stream_run(batch_run)
+            for viewer in self.viewers:
+                if viewer.frames.full():
+                    self._resync(viewer)
+                viewer.frames.put_nowait(StreamViewer.END_OF_STREAM)
+            await asyncio.gather(*self._connections, return_exceptions=True)
+
+    async def _stream_run(self, batch_run: BatchRun):
+        graph_data, start_point, goal_point = create_batch_problem(batch_run)
+        search_worker = Utils.start_search_worker(
+            graph_data,
+            batch_run.algorithm,
+            batch_run.heuristic_type,
+            start_point,
+            goal_point,
+        )
+        grid_size = graph_data.grid_size
+        # Blocked flags are 1, the same as CellState.WALL
+        self._cell_states = bytearray(graph_data.grid_graph.blocked)
+        self._number_of_steps = 0
+        self._run_frame = encode_frame(
+            StreamFrameType.RUN,
+            STREAM_RUN_HEADER.pack(
+                STREAM_VERSION,
+                grid_size.x,
+                grid_size.y,
+                search_worker.start_cell,
+                -1 if search_worker.goal_cell is None else search_worker.goal_cell,
+                batch_run.seed,
+                batch_run.algorithm.name.encode(),
+                batch_run.heuristic_type.name.encode(),
+            ),
+        )
+        self._end_frame = None
+        self._state_frames = None
+        self._broadcast(self._run_frame)
+        self._broadcast(self._get_snapshot_frame())
+        steps = array(search_worker.typecode)
+        previous_cell = None
+        loop = asyncio.get_running_loop()
+        try:
+            while steps or not search_worker.channel.is_finished:
+                # Paused while nobody is watching. The search waits on its
+                # full channel, and the next viewer starts from a snapshot.
+                await self._has_viewers.wait()
+                frame_time = loop.time()
+                self._receive_steps(search_worker, steps)
+                if not steps:
+                    await asyncio.sleep(StreamServer.IDLE_WAIT_IN_SECONDS)
+                    continue
+                previous_cell = self._broadcast_steps(
+                    steps[: self.steps_per_frame], previous_cell
+                )
+                del steps[: self.steps_per_frame]
+                await asyncio.sleep(
+                    max(0.0, frame_time + self.frame_delay_in_seconds - loop.time())
+                )
+        finally:
+            search_worker.stop()
+        self._end_frame = self._get_end_frame(search_worker)
+        self._state_frames = None
+        self._broadcast(self._end_frame)
+
+    # Viewers get an ERROR frame for a failed search, and the next run
+    # starts as usual
+    @staticmethod
+    def _get_end_frame(search_worker: SearchWorker) -> bytes:
+        statistics, path = search_worker.statistics, search_worker.path
+        if statistics is None:
+            return encode_frame(
+                StreamFrameType.ERROR, repr(search_worker.error).encode()
+            )
+        return encode_frame(
+            StreamFrameType.END,
+            STREAM_END_HEADER.pack(
+                statistics.expansions,
+                statistics.path_length,
+                statistics.elapsed_seconds,
+            )
+            + struct.pack(f"<{len(path)}I", *path),
+        )
+
+    def _receive_steps(self, search_worker: SearchWorker, steps: array):
+        channel = search_worker.channel
+        while len(steps) < self.steps_per_frame:
+            chunk = channel.get_nowait()
+            if chunk is None:
+                break
+            steps.extend(chunk)
+
+    # Each step makes its cell current and the one before visited, as in the
+    # GUI, and a cell is only sent with its last state of the frame
+    def _broadcast_steps(self, steps: array, previous_cell: Optional[int]) -> int:
+        deltas = dict.fromkeys(steps, CellState.VISITED)
+        if previous_cell is not None:
+            deltas.setdefault(previous_cell, CellState.VISITED)
+        deltas[steps[-1]] = CellState.CURRENT
+        cell_states = self._cell_states
+        for cell, state in deltas.items():
+            cell_states[cell] = state
+        self._number_of_steps += len(steps)
+        self._state_frames = None
+        self._broadcast(
+            encode_frame(
+                StreamFrameType.DELTAS,
+                STREAM_STEP_COUNT.pack(self._number_of_steps)
+                + encode_deltas(list(deltas), list(deltas.values())),
+            )
+        )
+        return steps[-1]
+
+    def _get_snapshot_frame(self) -> bytes:
+        return encode_frame(
+            StreamFrameType.SNAPSHOT,
+            STREAM_STEP_COUNT.pack(self._number_of_steps)
+            + zlib.compress(self._cell_states, STREAM_COMPRESSION_LEVEL),
+        )
+
+    # What a viewer needs to catch up with the current run
+    def _get_state_frames(self) -> List[bytes]:
+        if self._run_frame is None:
+            return []
+        if self._state_frames is None:
+            self._state_frames = [self._run_frame, self._get_snapshot_frame()]
+            if self._end_frame is not None:
+                self._state_frames.append(self._end_frame)
+        return self._state_frames
+
+    # Called with the state already changed, so a viewer that fell behind
+    # skips its queued frames, this one included, for the current state
+    # instead of holding up the run or the other viewers
+    def _broadcast(self, frame: bytes):
+        for viewer in self.viewers:
+            if viewer.frames.full():
+                self._resync(viewer)
+            else:
+                viewer.frames.put_nowait(frame)
+
+    def _resync(self, viewer: StreamViewer):
+        viewer.clear()
+        for state_frame in self._get_state_frames():
+            viewer.frames.put_nowait(state_frame)
+        viewer.number_of_resyncs += 1
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        viewer = None
+        try:
+            viewer = await self._accept_viewer(reader, writer)
+            if viewer is None:
+                return
+            for frame in self._get_state_frames():
+                viewer.frames.put_nowait(frame)
+            self.viewers.add(viewer)
+            self._has_viewers.set()
+            tasks = (
+                asyncio.create_task(read_until_closed(reader, viewer.is_websocket)),
+                asyncio.create_task(viewer.write_frames()),
+            )
+            done, pending = await asyncio.wait(
+                tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in done:
+                task.result()
+        except (
+            asyncio.IncompleteReadError,
+            asyncio.LimitOverrunError,
+            ConnectionError,
+        ):
+            pass
+        finally:
+            if viewer is not None:
+                self.viewers.discard(viewer)
+                if not self.viewers:
+                    self._has_viewers.clear()
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+            self._connections.discard(connection)
+
+    # Returns None for connections that are neither
+    async def _accept_viewer(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> Optional[StreamViewer]:
+        opening = await reader.readexactly(len(STREAM_MAGIC))
+        if opening == STREAM_MAGIC:
+            return StreamViewer(writer, is_websocket=False)
+        if not opening.startswith(b"GET "):
+            return None
+        request = opening + await reader.readuntil(b"\r\n\r\n")
+        key = None
+        for line in request.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"sec-websocket-key":
+                key = value.strip()
+        if key is None:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            return None
+        accept = base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest())
+        writer.write(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+            b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n"
+        )
+        return StreamViewer(writer, is_websocket=True)
+
+
+def run_stream_server(
+    batch_runs: List[BatchRun],
+    host: str,
+    port: int,
+    steps_per_frame: int = 1000,
+    frame_delay_in_milliseconds: int = 40,
+):
+    stream_server = StreamServer(
+        batch_runs, steps_per_frame, frame_delay_in_milliseconds
+    )
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(stream_server.serve(host, port))
+
+
+# Plain TCP viewer, yielding frames until the server ends the stream
+async def read_stream_frames(
+    host: str, port: int
+) -> AsyncIterator[Tuple[StreamFrameType, bytes]]:
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(STREAM_MAGIC)
+    try:
+        while True:
+            try:
+                header = await reader.readexactly(STREAM_FRAME_HEADER.size)
+            except asyncio.IncompleteReadError:
+                return
+            frame_type, length = STREAM_FRAME_HEADER.unpack(header)
+            yield StreamFrameType(frame_type), await reader.readexactly(length)
+    finally:
+        writer.close()
+
+
+# The run a viewer sees, built up from the frames of a stream
+# pylint: disable=too-many-instance-attributes
+class StreamView:
+    def __init__(self):
+        self.grid_size: Optional[Dim2D] = None
+        self.start_cell = -1
+        self.goal_cell = -1
+        self.seed = 0
+        self.algorithm: Optional[Algorithm] = None
+        self.heuristic = ""
+        self.cell_states = bytearray()
+        self.number_of_steps = 0
+        self.path: List[int] = []
+        # Only set once the run is finished, the error if its search failed
+        self.statistics: Optional[SearchStatistics] = None
+        self.error: Optional[str] = None
+
+    def apply(self, frame_type: StreamFrameType, payload: bytes):
+        if frame_type == StreamFrameType.RUN:
+            self._start_run(payload)
+        elif frame_type == StreamFrameType.SNAPSHOT:
+            (self.number_of_steps,) = STREAM_STEP_COUNT.unpack_from(payload)
+            self.cell_states = bytearray(
+                zlib.decompress(payload[STREAM_STEP_COUNT.size :])
+            )
+        elif frame_type == StreamFrameType.DELTAS:
+            (self.number_of_steps,) = STREAM_STEP_COUNT.unpack_from(payload)
+            cell_states = self.cell_states
+            for cell, state in STREAM_DELTA.iter_unpack(
+                payload[STREAM_STEP_COUNT.size :]
+            ):
+                cell_states[cell] = state
+        elif frame_type == StreamFrameType.END:
+            expansions, path_length, elapsed_seconds = STREAM_END_HEADER.unpack_from(
+                payload
+            )
+            self.path = list(
+                struct.unpack_from(f"<{path_length}I", payload, STREAM_END_HEADER.size)
+            )
+            self.statistics = SearchStatistics(
+                self.algorithm, expansions, path_length, elapsed_seconds
+            )
+        elif frame_type == StreamFrameType.ERROR:
+            self.error = payload.decode()
+
+    def _start_run(self, payload: bytes):
+        (
+            version,
+            width,
+            height,
+            self.start_cell,
+            self.goal_cell,
+            self.seed,
+            algorithm,
+            heuristic,
+        ) = STREAM_RUN_HEADER.unpack(payload)
+        if version != STREAM_VERSION:
+            raise ValueError(f"Stream version {version} is not {STREAM_VERSION}")
+        self.grid_size = Dim2D(width, height)
+        self.algorithm = Algorithm[algorithm.rstrip(b"\0").decode()]
+        self.heuristic = heuristic.rstrip(b"\0").decode()
+        self.cell_states = bytearray(width * height)
+        self.number_of_steps = 0
+        self.path = []
+        self.statistics = None
+        self.error = None
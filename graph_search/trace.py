@@ -0,0 +1,104 @@
+from array import array
+from typing import Iterable, Optional
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+
+class SearchTrace:
+    def __init__(
+        self,
+        grid_size: Dim2D,
+        steps: Iterable[int] = (),
+        start_cell: Optional[int] = None,
+        goal_cell: Optional[int] = None,
+    ):
+        self.grid_size = grid_size
+        typecode = SearchTrace.get_typecode(self.number_of_cells)
+        self.steps = array(typecode, steps)
+        self.start_cell = start_cell
+        self.goal_cell = goal_cell
+        self.path = array(typecode)
+        self.statistics = None
+        self._first_visit_steps = None
+
+    @staticmethod
+    def get_typecode(number_of_cells: int) -> str:
+        return "i" if number_of_cells < 2**31 else "q"
+
+    @property
+    def number_of_cells(self) -> int:
+        return self.grid_size.x * self.grid_size.y
+
+    # Includes the path and, once built, the first visit index
+    @property
+    def size_in_bytes(self) -> int:
+        size_in_bytes = self.steps.itemsize * (len(self.steps) + len(self.path))
+        if self._first_visit_steps is not None:
+            size_in_bytes += self.steps.itemsize * len(self._first_visit_steps)
+        return size_in_bytes
+
+    # Shares nothing with this trace, but takes its first visit index over
+    # instead of building it again
+    def copy(self) -> "SearchTrace":
+        search_trace = SearchTrace(
+            self.grid_size, start_cell=self.start_cell, goal_cell=self.goal_cell
+        )
+        search_trace.steps.extend(self.steps)
+        search_trace.path.extend(self.path)
+        search_trace.statistics = self.statistics
+        if self._first_visit_steps is not None:
+            SearchTrace._set_first_visit_steps(
+                search_trace, array(self.steps.typecode, self._first_visit_steps)
+            )
+        return search_trace
+
+    def _set_first_visit_steps(self, first_visit_steps: array):
+        self._first_visit_steps = first_visit_steps
+
+    def append(self, cell: int):
+        self.steps.append(cell)
+        if self._first_visit_steps is not None:
+            self._index_first_visits(len(self.steps) - 1)
+
+    # Steps streamed in after the index is built are indexed as they arrive
+    def extend(self, cells: Iterable[int]):
+        first_new_step = len(self.steps)
+        self.steps.extend(cells)
+        if self._first_visit_steps is not None:
+            self._index_first_visits(first_new_step)
+
+    def _index_first_visits(self, first_step: int):
+        first_visit_steps, steps = self._first_visit_steps, self.steps
+        for step in range(first_step, len(steps)):
+            if first_visit_steps[steps[step]] < 0:
+                first_visit_steps[steps[step]] = step
+
+    # Built once on first use, -1 marks cells the search never reaches
+    @property
+    def first_visit_steps(self) -> array:
+        if self._first_visit_steps is None:
+            self._first_visit_steps = (
+                array(self.steps.typecode, [-1]) * self.number_of_cells
+            )
+            self._index_first_visits(0)
+        return self._first_visit_steps
+
+    # For traces read back with the index they were saved with
+    def set_first_visit_steps(self, first_visit_steps: array):
+        self._first_visit_steps = first_visit_steps
+
+    def get_first_visit_step(self, cell: int) -> int:
+        return self.first_visit_steps[cell]
+
+    def get_step_range(self, start: int, end: int) -> array:
+        return self.steps[start:end]
+
+    def get_position(self, step: int) -> Dim2D:
+        cell = self.steps[step]
+        return Dim2D(cell % self.grid_size.x, cell // self.grid_size.x)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def __getitem__(self, step: int) -> int:
+        return self.steps[step]
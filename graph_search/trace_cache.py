@@ -0,0 +1,75 @@
+import os
+import struct
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from .trace import SearchTrace
+from .trace_file import TRACE_FILE_SUFFIX, TraceKey, read_trace_file, write_trace_file
+
+
+# Finished traces kept in memory up to a byte budget, least recently used
+# first out, and optionally in a directory that outlives the process
+class TraceCache:
+    DEFAULT_MAXIMUM_BYTES = 256 * 2**20
+    FILE_SUFFIX = TRACE_FILE_SUFFIX
+
+    def __init__(
+        self,
+        maximum_bytes: int = DEFAULT_MAXIMUM_BYTES,
+        directory: Optional[str] = None,
+    ):
+        self.maximum_bytes = maximum_bytes
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._traces: "OrderedDict[TraceKey, SearchTrace]" = OrderedDict()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._traces)
+
+    # Traces grow a first visit index once played, so sizes are measured
+    # again on every store instead of kept as a running total
+    @property
+    def size_in_bytes(self) -> int:
+        return sum(trace.size_in_bytes for trace in self._traces.values())
+
+    def get(self, key: TraceKey) -> Optional[SearchTrace]:
+        search_trace = self._traces.get(key)
+        if search_trace is None and self.directory:
+            search_trace = self._read(key)
+            if search_trace is not None:
+                self._store(key, search_trace)
+        if search_trace is None:
+            self.misses += 1
+            return None
+        self._traces.move_to_end(key)
+        self.hits += 1
+        return search_trace
+
+    def put(self, key: TraceKey, search_trace: SearchTrace):
+        self._store(key, search_trace)
+        if self.directory:
+            path = os.path.join(self.directory, key.file_name)
+            if not os.path.exists(path):
+                write_trace_file(path, search_trace, key)
+
+    def _read(self, key: TraceKey) -> Optional[SearchTrace]:
+        path = os.path.join(self.directory, key.file_name)
+        if not os.path.exists(path):
+            return None
+        try:
+            return read_trace_file(path)
+        except (OSError, ValueError, KeyError, struct.error, zlib.error):
+            return None
+
+    # The newest trace always stays, even when it is over the budget alone
+    def _store(self, key: TraceKey, search_trace: SearchTrace):
+        self._traces[key] = search_trace
+        self._traces.move_to_end(key)
+        size_in_bytes = self.size_in_bytes
+        while size_in_bytes > self.maximum_bytes and len(self._traces) > 1:
+            _, evicted_trace = self._traces.popitem(last=False)
+            size_in_bytes -= evicted_trace.size_in_bytes
@@ -0,0 +1,418 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from collections import OrderedDict
+from dataclasses import astuple, dataclass
+from enum import IntEnum
+from itertools import accumulate, chain
+from typing import List, Optional, Sequence, Tuple
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from .algorithms import Algorithm, HeuristicType, SearchStatistics
+from .grid_graph import GridGraph, np
+from .trace import SearchTrace
+
+TRACE_FILE_SUFFIX = ".trace"
+
+
+# Everything a finished trace depends on. The seed fixes the neighbour order
+# of randomised graphs.
+# pylint: disable=too-many-instance-attributes
+@dataclass(frozen=True)
+class TraceKey:
+    grid_width: int
+    grid_height: int
+    # Tells apart maps of the same size
+    blocked_hash: str
+    start_cell: int
+    # -1 for searches without a goal
+    goal_cell: int
+    algorithm: str
+    heuristic: str
+    neighbour_type: str
+    seed: int
+
+    @staticmethod
+    def create(
+        grid_graph: GridGraph,
+        start_cell: int,
+        goal_cell: Optional[int],
+        algorithm: Algorithm,
+        heuristic_type: HeuristicType,
+        seed: int,
+    ) -> "TraceKey":
+        return TraceKey(
+            grid_graph.grid_size.x,
+            grid_graph.grid_size.y,
+            get_blocked_hash(grid_graph.blocked),
+            start_cell,
+            -1 if goal_cell is None else goal_cell,
+            algorithm.name,
+            heuristic_type.name,
+            grid_graph.neighbour_type.name,
+            seed,
+        )
+
+    @property
+    def file_name(self) -> str:
+        return (
+            hashlib.blake2b(repr(astuple(self)).encode(), digest_size=16).hexdigest()
+            + TRACE_FILE_SUFFIX
+        )
+
+
+def get_blocked_hash(blocked: bytes) -> str:
+    return hashlib.blake2b(blocked, digest_size=16).hexdigest()
+
+
+# Version 2 files are a little endian header, the zlib compressed chunks of
+# each section in TraceSection order, and then the offset and size of every
+# chunk. Chunks hold a fixed number of values, so a step is found without
+# reading the ones before it.
+TRACE_FILE_MAGIC = b"GSTRACE\0"
+TRACE_FILE_VERSION = 2
+TRACE_FILE_HEADER = struct.Struct("<8sHcxIII32sqq32s16s16sqQdQQQQQ")
+TRACE_FILE_CHUNK_ENTRY = struct.Struct("<QQ")
+DEFAULT_CHUNK_LENGTH = 2**16
+TRACE_FILE_COMPRESSION_LEVEL = 1
+
+
+class TraceSection(IntEnum):
+    STEPS = 0
+    PATH = 1
+    FIRST_VISIT_STEPS = 2
+    # One byte per cell, so the file can be replayed without its map
+    WALLS = 3
+
+
+# Cells expanded one after another are mostly close, so their differences
+# compress far better than the cells themselves
+DELTA_ENCODED_SECTIONS = (TraceSection.STEPS, TraceSection.PATH)
+
+
+def encode_chunk(values: Sequence[int], typecode: str, is_delta_encoded: bool) -> bytes:
+    if np is not None:
+        chunk = np.asarray(values, dtype=typecode)
+        if is_delta_encoded:
+            chunk = np.diff(chunk, prepend=chunk.dtype.type(0))
+        return chunk.astype(chunk.dtype.newbyteorder("<"), copy=False).tobytes()
+    chunk = array(typecode, values)
+    if is_delta_encoded:
+        chunk = array(
+            typecode,
+            (value - previous for previous, value in zip(chain((0,), chunk), chunk)),
+        )
+    if sys.byteorder == "big":
+        chunk.byteswap()
+    return chunk.tobytes()
+
+
+def decode_chunk(data: bytes, typecode: str, is_delta_encoded: bool) -> array:
+    chunk = array(typecode)
+    if np is not None:
+        values = np.frombuffer(data, dtype=np.dtype(typecode).newbyteorder("<"))
+        if is_delta_encoded:
+            values = np.cumsum(values, dtype=typecode)
+        chunk.frombytes(values.astype(typecode, copy=False).tobytes())
+        return chunk
+    chunk.frombytes(data)
+    if sys.byteorder == "big":
+        chunk.byteswap()
+    return array(typecode, accumulate(chunk)) if is_delta_encoded else chunk
+
+
+# The key, when given, is stored so that the file can be matched to the
+# problem it solves, and the walls so that it can be replayed on its own
+def write_trace_file(
+    path: str,
+    search_trace: SearchTrace,
+    key: Optional[TraceKey] = None,
+    blocked: Optional[bytes] = None,
+    chunk_length: int = DEFAULT_CHUNK_LENGTH,
+):
+    statistics = search_trace.statistics
+    typecode = search_trace.steps.typecode
+    sections = (
+        search_trace.steps,
+        search_trace.path,
+        search_trace.first_visit_steps,
+        b"" if blocked is None else blocked,
+    )
+    chunk_entries = []
+    # Written next to the final path first, so readers never see half a file
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as trace_file:
+        trace_file.seek(TRACE_FILE_HEADER.size)
+        for section, values in zip(TraceSection, sections):
+            for start in range(0, len(values), chunk_length):
+                chunk = values[start : start + chunk_length]
+                if section != TraceSection.WALLS:
+                    chunk = encode_chunk(
+                        chunk, typecode, section in DELTA_ENCODED_SECTIONS
+                    )
+                data = zlib.compress(bytes(chunk), TRACE_FILE_COMPRESSION_LEVEL)
+                chunk_entries.append((trace_file.tell(), len(data)))
+                trace_file.write(data)
+        index_offset = trace_file.tell()
+        for chunk_entry in chunk_entries:
+            trace_file.write(TRACE_FILE_CHUNK_ENTRY.pack(*chunk_entry))
+        trace_file.seek(0)
+        trace_file.write(
+            TRACE_FILE_HEADER.pack(
+                TRACE_FILE_MAGIC,
+                TRACE_FILE_VERSION,
+                typecode.encode(),
+                chunk_length,
+                search_trace.grid_size.x,
+                search_trace.grid_size.y,
+                b"" if key is None else key.blocked_hash.encode(),
+                -1 if search_trace.start_cell is None else search_trace.start_cell,
+                -1 if search_trace.goal_cell is None else search_trace.goal_cell,
+                b"" if statistics is None else statistics.algorithm.name.encode(),
+                b"" if key is None else key.heuristic.encode(),
+                b"" if key is None else key.neighbour_type.encode(),
+                -1 if key is None else key.seed,
+                len(search_trace) if statistics is None else statistics.expansions,
+                0.0 if statistics is None else statistics.elapsed_seconds,
+                *(len(values) for values in sections),
+                index_offset,
+            )
+        )
+    os.replace(temporary_path, path)
+
+
+def read_trace_file(path: str) -> SearchTrace:
+    with MappedSearchTrace(path) as mapped_search_trace:
+        return mapped_search_trace.load()
+
+
+# A trace file opened memory mapped, read only. Steps are decoded a chunk at a
+# time as they are asked for and only the latest chunks are kept, so playing
+# or seeking a long trace costs the chunks it touches rather than the file.
+# pylint: disable=too-many-instance-attributes
+class MappedSearchTrace:
+    MAXIMUM_DECODED_CHUNKS = 8
+
+    def __init__(self, path: str):
+        self.file_path = path
+        with open(path, "rb") as trace_file:
+            self._mmap = mmap.mmap(trace_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header()
+            self.path = self._read_section(TraceSection.PATH)
+        except (ValueError, struct.error, zlib.error):
+            self.close()
+            raise
+        self._decoded_chunks: "OrderedDict[Tuple[int, int], array]" = OrderedDict()
+        self._first_visit_steps: Optional[array] = None
+
+    def _read_header(self):
+        if len(self._mmap) < TRACE_FILE_HEADER.size:
+            raise ValueError(f"{self.file_path} is truncated")
+        (
+            magic,
+            version,
+            typecode,
+            self.chunk_length,
+            grid_width,
+            grid_height,
+            blocked_hash,
+            start_cell,
+            goal_cell,
+            algorithm_name,
+            heuristic_name,
+            neighbour_type_name,
+            seed,
+            expansions,
+            elapsed_seconds,
+            *self._section_lengths,
+            index_offset,
+        ) = TRACE_FILE_HEADER.unpack_from(self._mmap)
+        if magic != TRACE_FILE_MAGIC or version != TRACE_FILE_VERSION:
+            raise ValueError(
+                f"{self.file_path} is not a version {TRACE_FILE_VERSION} trace file"
+            )
+        self.typecode = typecode.decode()
+        self.grid_size = Dim2D(grid_width, grid_height)
+        self.start_cell = None if start_cell < 0 else start_cell
+        self.goal_cell = None if goal_cell < 0 else goal_cell
+        algorithm_name = algorithm_name.rstrip(b"\0").decode()
+        self.statistics = (
+            SearchStatistics(
+                Algorithm[algorithm_name],
+                expansions,
+                self._section_lengths[TraceSection.PATH],
+                elapsed_seconds,
+            )
+            if algorithm_name
+            else None
+        )
+        blocked_hash = blocked_hash.rstrip(b"\0").decode()
+        # Only files written with the key of their problem can be matched to it
+        self.key = (
+            TraceKey(
+                grid_width,
+                grid_height,
+                blocked_hash,
+                start_cell,
+                goal_cell,
+                algorithm_name,
+                heuristic_name.rstrip(b"\0").decode(),
+                neighbour_type_name.rstrip(b"\0").decode(),
+                seed,
+            )
+            if blocked_hash and algorithm_name
+            else None
+        )
+        self._chunk_entries: List[List[Tuple[int, int]]] = []
+        offset = index_offset
+        for section_length in self._section_lengths:
+            number_of_chunks = -(-section_length // self.chunk_length)
+            self._chunk_entries.append(
+                [
+                    TRACE_FILE_CHUNK_ENTRY.unpack_from(
+                        self._mmap, offset + index * TRACE_FILE_CHUNK_ENTRY.size
+                    )
+                    for index in range(number_of_chunks)
+                ]
+            )
+            offset += number_of_chunks * TRACE_FILE_CHUNK_ENTRY.size
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self) -> "MappedSearchTrace":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    @property
+    def number_of_cells(self) -> int:
+        return self.grid_size.x * self.grid_size.y
+
+    # The decoded chunks, path and first visit index kept in memory
+    @property
+    def size_in_bytes(self) -> int:
+        itemsize = array(self.typecode).itemsize
+        size_in_bytes = itemsize * len(self.path)
+        size_in_bytes += sum(
+            chunk.itemsize * len(chunk) for chunk in self._decoded_chunks.values()
+        )
+        if self._first_visit_steps is not None:
+            size_in_bytes += itemsize * len(self._first_visit_steps)
+        return size_in_bytes
+
+    def _get_chunk(self, section: TraceSection, index: int) -> array:
+        chunk = self._decoded_chunks.get((section, index))
+        if chunk is not None:
+            self._decoded_chunks.move_to_end((section, index))
+            return chunk
+        offset, size = self._chunk_entries[section][index]
+        data = zlib.decompress(self._mmap[offset : offset + size])
+        if section == TraceSection.WALLS:
+            chunk = array("B", data)
+        else:
+            chunk = decode_chunk(data, self.typecode, section in DELTA_ENCODED_SECTIONS)
+        self._decoded_chunks[(section, index)] = chunk
+        if len(self._decoded_chunks) > MappedSearchTrace.MAXIMUM_DECODED_CHUNKS:
+            self._decoded_chunks.popitem(last=False)
+        return chunk
+
+    # Whole sections skip the chunk cache, which is kept for steps
+    def _read_section(self, section: TraceSection) -> array:
+        values = array("B" if section == TraceSection.WALLS else self.typecode)
+        for offset, size in self._chunk_entries[section]:
+            data = zlib.decompress(self._mmap[offset : offset + size])
+            if section == TraceSection.WALLS:
+                values.frombytes(data)
+            else:
+                values.extend(
+                    decode_chunk(data, self.typecode, section in DELTA_ENCODED_SECTIONS)
+                )
+        if len(values) != self._section_lengths[section]:
+            raise ValueError(f"{self.file_path} is truncated")
+        return values
+
+    @property
+    def has_walls(self) -> bool:
+        return self._section_lengths[TraceSection.WALLS] > 0
+
+    # None for files saved without their walls
+    def read_blocked(self) -> Optional[bytearray]:
+        if not self.has_walls:
+            return None
+        return bytearray(self._read_section(TraceSection.WALLS))
+
+    # Read whole on first use; cells only, so much smaller than the steps
+    @property
+    def first_visit_steps(self) -> array:
+        if self._first_visit_steps is None:
+            if self._section_lengths[TraceSection.FIRST_VISIT_STEPS]:
+                self._first_visit_steps = self._read_section(
+                    TraceSection.FIRST_VISIT_STEPS
+                )
+            else:
+                self._first_visit_steps = self.load().first_visit_steps
+        return self._first_visit_steps
+
+    def get_first_visit_step(self, cell: int) -> int:
+        return self.first_visit_steps[cell]
+
+    # Chunk by chunk, without a lookup per step
+    def get_step_range(self, start: int, end: int) -> array:
+        end = min(end, len(self))
+        steps = array(self.typecode)
+        for chunk_index in range(
+            start // self.chunk_length, -(-end // self.chunk_length)
+        ):
+            chunk_start = chunk_index * self.chunk_length
+            steps.extend(
+                self._get_chunk(TraceSection.STEPS, chunk_index)[
+                    max(start - chunk_start, 0) : end - chunk_start
+                ]
+            )
+        return steps
+
+    def get_position(self, step: int) -> Dim2D:
+        cell = self[step]
+        return Dim2D(cell % self.grid_size.x, cell // self.grid_size.x)
+
+    def __len__(self) -> int:
+        return self._section_lengths[TraceSection.STEPS]
+
+    def __getitem__(self, step: int) -> int:
+        number_of_steps = self._section_lengths[TraceSection.STEPS]
+        if step < 0:
+            step += number_of_steps
+        if not 0 <= step < number_of_steps:
+            raise IndexError("trace step out of range")
+        chunk_index, offset = divmod(step, self.chunk_length)
+        return self._get_chunk(TraceSection.STEPS, chunk_index)[offset]
+
+    # Everything decoded into an ordinary trace
+    def load(self) -> SearchTrace:
+        search_trace = SearchTrace(
+            self.grid_size, start_cell=self.start_cell, goal_cell=self.goal_cell
+        )
+        search_trace.steps = self._read_section(TraceSection.STEPS)
+        search_trace.path = array(self.typecode, self.path)
+        search_trace.statistics = self.statistics
+        if self._first_visit_steps is not None:
+            search_trace.set_first_visit_steps(
+                array(self.typecode, self._first_visit_steps)
+            )
+        elif self._section_lengths[TraceSection.FIRST_VISIT_STEPS]:
+            search_trace.set_first_visit_steps(
+                self._read_section(TraceSection.FIRST_VISIT_STEPS)
+            )
+        return search_trace
+
+    # Playback may change the trace it works on, which a read only file cannot
+    def copy(self) -> SearchTrace:
+        return self.load()
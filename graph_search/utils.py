@@ -1,17 +1,49 @@
 import random
-from enum import Enum, auto
+import struct
+import zlib
+from enum import Enum, IntEnum, auto
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional, Tuple
 
 from draw.tkinter_singleton import TkinterSingleton
 from draw.colour import Colour
-from draw.widget import PackData, ButtonData, WidgetData, TextData, LabelData, ScaleData
+from draw.renderer import (
+    Renderer,
+    NullRenderer,
+    RasterRenderer,
+    CanvasRectanglesRenderer,
+    PixelBufferRenderer,
+    np,
+)
+from draw.viewport import Viewport
+from draw.widget import (
+    PackData,
+    ButtonData,
+    WidgetData,
+    TextData,
+    LabelData,
+    ScaleData,
+    OptionMenuData,
+)
 
 from dekespo_ai_sdk.core.dimensions import Dim2D
-from dekespo_ai_sdk.core.graph import Graph
-from dekespo_ai_sdk.core.neighbour import NeighbourData, NeighbourType
-
-from dekespo_ai_sdk.algorithms.graph_search.api import GraphSearch
+from dekespo_ai_sdk.core.neighbour import NeighbourType
+from dekespo_ai_sdk.core.utils import error_print
+
+from .algorithms import (
+    Algorithm,
+    HeuristicType,
+    HEURISTICS,
+    SEARCH_STRATEGIES,
+    SearchStatistics,
+    SearchStrategy,
+)
+from .grid_graph import GridGraph
+from .grid_map import GridMap, GridMapLoader
+from .trace import SearchTrace
+from .trace_cache import TraceCache
+from .trace_file import MappedSearchTrace, TraceKey
+from .step_stream import SearchWorker, TimeSlicedSearch
 
 
 class Status(Enum):
@@ -22,27 +54,139 @@ class Status(Enum):
     SHOULD_PLAY_FORWARD = auto()
     SHOULD_RESET = auto()
     OPTIONS_SET = auto()
+    SEEK_STEP = auto()
+    SHOULD_COMPARE = auto()
+    SHOW_PROFILER = auto()
+    SHOULD_CYCLE_COLOUR_SCHEME = auto()
+    VIEWPORT_PAN = auto()
+    VIEWPORT_ZOOM = auto()
+    DRAG_POINT = auto()
+    TOGGLE_POINTS = auto()
+    SHOW_CLUSTERS = auto()
 
 
 class Options(Enum):
     TILE_SIZE = auto()
     GRID_SIZE = auto()
     STEPS_PER_SECOND = auto()
+    FRAMES_PER_SECOND = auto()
+    SEARCH_MODE = auto()
+    RENDER_BACKEND = auto()
+    ALGORITHM = auto()
+    HEURISTIC = auto()
+    MAP_PATH = auto()
+    # Directory the trace cache also keeps its traces in, empty for memory only
+    TRACE_CACHE_PATH = auto()
+    # Trace file to replay, with the grid and problem it was saved with
+    TRACE_PATH = auto()
+    # Seed of the first search problem, the next ones taking the seeds after
+    # it, or None for random problems
+    SEED = auto()
+
+
+class SearchMode(Enum):
+    THREADED = auto()
+    TRACE = auto()
+    COOPERATIVE = auto()
+
+
+class RenderBackend(Enum):
+    CANVAS_RECTANGLES = auto()
+    PIXEL_BUFFER = auto()
+    NUMPY_RASTER = auto()
+    NONE = auto()
+
+
+# What a cell shows, used as its renderer palette index
+class CellState(IntEnum):
+    UNVISITED = 0
+    WALL = 1
+    VISITED = 2
+    CURRENT = 3
+    # Unvisited cluster entrances of the hierarchical search, when shown
+    ENTRANCE = 4
+
+
+# One colour per cell state, in CellState order
+class ColourScheme(Enum):
+    CLASSIC = (Colour.BLACK, Colour.BROWN, Colour.WHITE, Colour.RED, Colour.BLUE)
+    LIGHT = (Colour.WHITE, Colour.BLACK, Colour.BLUE, Colour.RED, Colour.GREEN)
+    PURPLE = (Colour.BLACK, Colour.GREEN, Colour.PURPLE, Colour.WHITE, Colour.RED)
 
 
 @dataclass
 class GraphData:
     tile_size: Dim2D
     grid_size: Dim2D
-    graph: Graph
+    grid_graph: GridGraph
 
 
-# pylint: disable=too-few-public-methods
 class Scale:
     @staticmethod
     def on_scale(current_options, steps_per_second):
         current_options[Options.STEPS_PER_SECOND] = int(steps_per_second)
 
+    @staticmethod
+    def on_seek(status_dictionary, step):
+        status_dictionary[Status.SEEK_STEP] = int(step)
+
+
+# Canvas events only queue the change, which the next tick applies
+class ViewportControl:
+    KEY_PAN_IN_PIXELS = 100
+
+    @staticmethod
+    def pan(status_dictionary, offset_in_pixels: Dim2D):
+        pan = status_dictionary[Status.VIEWPORT_PAN]
+        status_dictionary[Status.VIEWPORT_PAN] = (
+            offset_in_pixels if pan is None else pan + offset_in_pixels
+        )
+
+    @staticmethod
+    def zoom(status_dictionary, steps, anchor_in_pixels=None):
+        zoom = status_dictionary[Status.VIEWPORT_ZOOM]
+        if zoom is not None:
+            steps += zoom[0]
+        status_dictionary[Status.VIEWPORT_ZOOM] = (steps, anchor_in_pixels)
+
+    @staticmethod
+    def on_key_pan(status_dictionary, direction: Dim2D):
+        ViewportControl.pan(
+            status_dictionary,
+            direction.constant_multiply(ViewportControl.KEY_PAN_IN_PIXELS),
+        )
+
+    @staticmethod
+    def on_drag_start(status_dictionary, event):
+        status_dictionary[Status.DRAG_POINT] = Dim2D(event.x, event.y)
+
+    # The grid follows the pointer, so the view moves the other way
+    @staticmethod
+    def on_drag(status_dictionary, event):
+        drag_point = status_dictionary[Status.DRAG_POINT]
+        if drag_point is None:
+            return
+        status_dictionary[Status.DRAG_POINT] = Dim2D(event.x, event.y)
+        ViewportControl.pan(
+            status_dictionary, Dim2D(drag_point.x - event.x, drag_point.y - event.y)
+        )
+
+    # X11 sends buttons 4 and 5, the others a signed delta
+    @staticmethod
+    def on_mouse_wheel(status_dictionary, event):
+        is_zooming_in = event.num == 4 or getattr(event, "delta", 0) > 0
+        ViewportControl.zoom(
+            status_dictionary, 1 if is_zooming_in else -1, Dim2D(event.x, event.y)
+        )
+
+
+class CellControl:
+    @staticmethod
+    def on_toggle(status_dictionary, event):
+        toggle_points = status_dictionary[Status.TOGGLE_POINTS] or []
+        toggle_points.append(Dim2D(event.x, event.y))
+        status_dictionary[Status.TOGGLE_POINTS] = toggle_points
+
 
 class Button:
     @staticmethod
@@ -75,22 +219,60 @@ class Button:
     def reset(status_dictionary):
         status_dictionary[Status.SHOULD_RESET] = True
 
+    @staticmethod
+    def compare(status_dictionary):
+        status_dictionary[Status.SHOULD_COMPARE] = True
+
+    @staticmethod
+    def cycle_colour_scheme(status_dictionary):
+        status_dictionary[Status.SHOULD_CYCLE_COLOUR_SCHEME] = True
+
+    @staticmethod
+    def toggle_profiler(status_dictionary):
+        status_dictionary[Status.SHOW_PROFILER] = not status_dictionary[
+            Status.SHOW_PROFILER
+        ]
+
+    @staticmethod
+    def toggle_clusters(status_dictionary):
+        status_dictionary[Status.SHOW_CLUSTERS] = not status_dictionary[
+            Status.SHOW_CLUSTERS
+        ]
+
     @staticmethod
     def open_options(args):
         # TODO: Instead use a button and use this for cancelling
         def remove_window(args):
             menu_window, status_dictionary = args
-            current_options[Options.TILE_SIZE].x = int(
-                TkinterSingleton.widgets["tile_size_x"].get("1.0", "end-1c")
-            )
-            current_options[Options.TILE_SIZE].y = int(
-                TkinterSingleton.widgets["tile_size_y"].get("1.0", "end-1c")
-            )
-            current_options[Options.GRID_SIZE].x = int(
-                TkinterSingleton.widgets["grid_size_x"].get("1.0", "end-1c")
-            )
-            current_options[Options.GRID_SIZE].y = int(
-                TkinterSingleton.widgets["grid_size_y"].get("1.0", "end-1c")
+
+            def get_size(id_prefix):
+                return Dim2D(
+                    int(
+                        TkinterSingleton.widgets[f"{id_prefix}_x"].get("1.0", "end-1c")
+                    ),
+                    int(
+                        TkinterSingleton.widgets[f"{id_prefix}_y"].get("1.0", "end-1c")
+                    ),
+                )
+
+            # New sizes rather than changed ones, so the GUI can tell what the
+            # old sizes were
+            current_options[Options.TILE_SIZE] = get_size("tile_size")
+            current_options[Options.GRID_SIZE] = get_size("grid_size")
+            current_options[Options.SEARCH_MODE] = SearchMode[
+                TkinterSingleton.get_widget_variable_value("search_mode").upper()
+            ]
+            current_options[Options.RENDER_BACKEND] = RenderBackend[
+                TkinterSingleton.get_widget_variable_value("render_backend").upper()
+            ]
+            current_options[Options.ALGORITHM] = Algorithm[
+                TkinterSingleton.get_widget_variable_value("algorithm").upper()
+            ]
+            current_options[Options.HEURISTIC] = HeuristicType[
+                TkinterSingleton.get_widget_variable_value("heuristic").upper()
+            ]
+            current_options[Options.MAP_PATH] = (
+                TkinterSingleton.widgets["map_path"].get("1.0", "end-1c").strip()
             )
             status_dictionary[Status.OPTIONS_SET] = True
             menu_window.destroy()
@@ -126,6 +308,60 @@ class Button:
             create_text_data(current_options[Options.GRID_SIZE].y, "grid_size_y"),
         ]
         GuiUtils.create_widgets(grid_size_widgets, grid_size_frame)
+
+        def create_option_menu_data(current_choice, choice_enum, id_):
+            return OptionMenuData(
+                current_choice.name.lower(),
+                id_=id_,
+                choices=[choice.name.lower() for choice in choice_enum],
+            )
+
+        search_mode_frame = TkinterSingleton.create_frame_with_pack(
+            PackData(side=None), menu_window
+        )
+        search_mode_widgets = [
+            LabelData("Search Mode: "),
+            create_option_menu_data(
+                current_options[Options.SEARCH_MODE], SearchMode, "search_mode"
+            ),
+        ]
+        GuiUtils.create_widgets(search_mode_widgets, search_mode_frame)
+        render_backend_frame = TkinterSingleton.create_frame_with_pack(
+            PackData(side=None), menu_window
+        )
+        render_backend_widgets = [
+            LabelData("Renderer: "),
+            create_option_menu_data(
+                current_options[Options.RENDER_BACKEND],
+                RenderBackend,
+                "render_backend",
+            ),
+        ]
+        GuiUtils.create_widgets(render_backend_widgets, render_backend_frame)
+        algorithm_frame = TkinterSingleton.create_frame_with_pack(
+            PackData(side=None), menu_window
+        )
+        algorithm_widgets = [
+            LabelData("Algorithm: "),
+            create_option_menu_data(
+                current_options[Options.ALGORITHM], Algorithm, "algorithm"
+            ),
+            LabelData("Heuristic: "),
+            create_option_menu_data(
+                current_options[Options.HEURISTIC], HeuristicType, "heuristic"
+            ),
+        ]
+        GuiUtils.create_widgets(algorithm_widgets, algorithm_frame)
+        map_frame = TkinterSingleton.create_frame_with_pack(
+            PackData(side=None), menu_window
+        )
+        map_widgets = [
+            LabelData("Map File (sets the grid size): "),
+            create_text_data(
+                current_options[Options.MAP_PATH], "map_path", number_of_characters=30
+            ),
+        ]
+        GuiUtils.create_widgets(map_widgets, map_frame)
         menu_window.protocol(
             "WM_DELETE_WINDOW",
             lambda args=[menu_window, status_dictionary]: remove_window(args),
@@ -135,40 +371,265 @@ class Button:
 
 
 class Utils:
+    MAXIMUM_CANVAS_SIZE = Dim2D(960, 720)
+
     @staticmethod
-    def create_rectangle_canvas(graph_data: GraphData) -> List[List]:
-        raw_data: List = []
-        for y in range(graph_data.grid_size.y):
-            row_raw_data: List = []
-            for x in range(graph_data.grid_size.x):
-                TkinterSingleton.create_rectangle_at(
-                    Dim2D(x, y), graph_data.tile_size, Colour.BLACK
-                )
-                row_raw_data.append(0)
-            raw_data.append(row_raw_data)
-        return raw_data
+    def create_grid_graph(
+        grid_size: Dim2D,
+        random_generator: Optional[random.Random] = None,
+        blocked: Optional[bytearray] = None,
+    ) -> GridGraph:
+        return GridGraph(
+            grid_size,
+            blocked,
+            neighbour_type=NeighbourType.CROSS,
+            random_output=True,
+            random_generator=random_generator,
+        )
+
+    @staticmethod
+    def create_renderer(
+        graph_data: GraphData,
+        render_backend: RenderBackend,
+        colour_scheme: ColourScheme,
+        viewport: Optional[Viewport] = None,
+    ) -> Renderer:
+        TkinterSingleton.clear_canvas()
+        grid_size, tile_size = graph_data.grid_size, graph_data.tile_size
+        palette = colour_scheme.value
+        if render_backend == RenderBackend.NUMPY_RASTER and np is None:
+            error_print("NumPy is not installed, drawing nothing instead")
+            render_backend = RenderBackend.NONE
+        if render_backend == RenderBackend.CANVAS_RECTANGLES:
+            return CanvasRectanglesRenderer(
+                grid_size, tile_size, palette, TkinterSingleton.canvas, viewport
+            )
+        if render_backend == RenderBackend.PIXEL_BUFFER:
+            return PixelBufferRenderer(
+                grid_size,
+                tile_size,
+                palette,
+                TkinterSingleton.canvas,
+                TkinterSingleton.toolkit,
+                viewport,
+            )
+        if render_backend == RenderBackend.NUMPY_RASTER:
+            return RasterRenderer(grid_size, tile_size, palette)
+        return NullRenderer(grid_size, tile_size, palette)
 
+    # Grids larger than this are shown through a viewport
     @staticmethod
-    def get_random_edge_point(grid_size):
+    def get_canvas_size(graph_data: GraphData) -> Dim2D:
+        size = graph_data.tile_size.vectoral_multiply(graph_data.grid_size)
+        return Dim2D(
+            min(size.x, Utils.MAXIMUM_CANVAS_SIZE.x),
+            min(size.y, Utils.MAXIMUM_CANVAS_SIZE.y),
+        )
+
+    @staticmethod
+    def get_random_edge_point(grid_size, random_generator=random):
         four_sides = ["top", "bottom", "left", "right"]
-        chosen_side = four_sides[random.randint(0, len(four_sides) - 1)]
+        chosen_side = four_sides[random_generator.randint(0, len(four_sides) - 1)]
         return {
-            "top": Dim2D(random.randint(0, grid_size.x - 1), 0),
-            "bottom": Dim2D(random.randint(0, grid_size.x - 1), grid_size.y - 1),
-            "left": Dim2D(0, random.randint(0, grid_size.y - 1)),
-            "right": Dim2D(grid_size.x - 1, random.randint(0, grid_size.y - 1)),
+            "top": Dim2D(random_generator.randint(0, grid_size.x - 1), 0),
+            "bottom": Dim2D(
+                random_generator.randint(0, grid_size.x - 1), grid_size.y - 1
+            ),
+            "left": Dim2D(0, random_generator.randint(0, grid_size.y - 1)),
+            "right": Dim2D(
+                grid_size.x - 1, random_generator.randint(0, grid_size.y - 1)
+            ),
         }[chosen_side]
 
+    # An edge point as on an empty grid, unless the map blocks it
+    @staticmethod
+    def get_random_start_point(
+        grid_graph: GridGraph, random_generator=random, maximum_attempts=100
+    ) -> Dim2D:
+        grid_size = grid_graph.grid_size
+        point = Utils.get_random_edge_point(grid_size, random_generator)
+        for _ in range(maximum_attempts):
+            if not grid_graph.is_blocked(grid_graph.get_cell(point)):
+                return point
+            point = Dim2D(
+                random_generator.randint(0, grid_size.x - 1),
+                random_generator.randint(0, grid_size.y - 1),
+            )
+        free_cell = grid_graph.blocked.find(0)
+        return point if free_cell < 0 else grid_graph.get_position(free_cell)
+
+    @staticmethod
+    def load_grid_map(map_path: str) -> Optional[GridMap]:
+        try:
+            return GridMapLoader.load(map_path)
+        except (OSError, ValueError, KeyError) as error:
+            error_print(f"Cannot load the map {map_path}: {error}")
+            return None
+
+    # Only files saved with their walls and problem can be replayed in the GUI
+    @staticmethod
+    def open_trace_file(trace_path: str) -> Optional[MappedSearchTrace]:
+        try:
+            trace_file = MappedSearchTrace(trace_path)
+        except (OSError, ValueError, KeyError, struct.error, zlib.error) as error:
+            error_print(f"Cannot open the trace {trace_path}: {error}")
+            return None
+        if trace_file.key is None or not trace_file.has_walls:
+            error_print(f"The trace {trace_path} was saved without its problem")
+            trace_file.close()
+            return None
+        return trace_file
+
     @staticmethod
-    def initialize_depth_first_search(graph_data: GraphData):
-        start_point = Utils.get_random_edge_point(graph_data.grid_size)
-        neighbour_data = NeighbourData(NeighbourType.CROSS, random_output=True)
-        depth_first_search = GraphSearch(
-            graph_data.graph, start_point
-        ).depth_first_search(neighbour_data, runs_with_thread=True)
-        depth_first_search.event_set()
-        depth_first_search.start()
-        return depth_first_search
+    def get_flat_index(position: Dim2D, grid_size: Dim2D) -> int:
+        return position.y * grid_size.x + position.x
+
+    @staticmethod
+    def get_position(flat_index: int, grid_size: Dim2D) -> Dim2D:
+        return Dim2D(flat_index % grid_size.x, flat_index // grid_size.x)
+
+    # The strategy and the grid_graph, start_cell, goal_cell arguments it runs
+    # with, whether it is traced up front, threaded or time sliced
+    @staticmethod
+    def get_search_problem(
+        graph_data: GraphData,
+        algorithm: Algorithm,
+        heuristic_type: HeuristicType,
+        start_point: Dim2D = None,
+        goal_point: Dim2D = None,
+    ) -> Tuple[SearchStrategy, GridGraph, int, Optional[int]]:
+        grid_size = graph_data.grid_size
+        if start_point is None:
+            start_point = Utils.get_random_start_point(graph_data.grid_graph)
+        if goal_point is None:
+            goal_point = Utils.get_random_start_point(graph_data.grid_graph)
+        search_strategy = SEARCH_STRATEGIES[algorithm](HEURISTICS[heuristic_type])
+        return (
+            search_strategy,
+            graph_data.grid_graph,
+            Utils.get_flat_index(start_point, grid_size),
+            (
+                Utils.get_flat_index(goal_point, grid_size)
+                if search_strategy.is_goal_directed
+                else None
+            ),
+        )
+
+    @staticmethod
+    def create_search_trace(
+        graph_data: GraphData,
+        algorithm: Algorithm,
+        heuristic_type: HeuristicType,
+        start_point: Dim2D = None,
+        goal_point: Dim2D = None,
+    ) -> SearchTrace:
+        search_strategy, *search_arguments = Utils.get_search_problem(
+            graph_data, algorithm, heuristic_type, start_point, goal_point
+        )
+        return search_strategy.create_trace(*search_arguments)
+
+    @staticmethod
+    def start_search_worker(
+        graph_data: GraphData,
+        algorithm: Algorithm,
+        heuristic_type: HeuristicType,
+        start_point: Dim2D,
+        goal_point: Dim2D,
+    ) -> SearchWorker:
+        search_worker = SearchWorker(
+            *Utils.get_search_problem(
+                graph_data, algorithm, heuristic_type, start_point, goal_point
+            )
+        )
+        search_worker.start()
+        return search_worker
+
+    @staticmethod
+    def create_time_sliced_search(
+        graph_data: GraphData,
+        algorithm: Algorithm,
+        heuristic_type: HeuristicType,
+        start_point: Dim2D,
+        goal_point: Dim2D,
+    ) -> TimeSlicedSearch:
+        return TimeSlicedSearch(
+            *Utils.get_search_problem(
+                graph_data, algorithm, heuristic_type, start_point, goal_point
+            )
+        )
+
+    # A copy of the graph whose neighbour order only depends on the seed, so
+    # searches on it can be cached and replayed
+    @staticmethod
+    def get_seeded_graph_data(graph_data: GraphData, seed: int) -> GraphData:
+        return GraphData(
+            graph_data.tile_size,
+            graph_data.grid_size,
+            graph_data.grid_graph.copy_with_random_generator(random.Random(seed)),
+        )
+
+    @staticmethod
+    def get_trace_key(
+        graph_data: GraphData,
+        algorithm: Algorithm,
+        heuristic_type: HeuristicType,
+        start_point: Dim2D,
+        goal_point: Dim2D,
+        seed: int,
+    ) -> TraceKey:
+        _, grid_graph, start_cell, goal_cell = Utils.get_search_problem(
+            graph_data, algorithm, heuristic_type, start_point, goal_point
+        )
+        return TraceKey.create(
+            grid_graph, start_cell, goal_cell, algorithm, heuristic_type, seed
+        )
+
+    # The graph's neighbour order must follow from the seed, as with a seeded
+    # graph, for the cached trace to be the one the search would give
+    @staticmethod
+    def create_cached_search_trace(
+        trace_cache: TraceCache,
+        graph_data: GraphData,
+        algorithm: Algorithm,
+        heuristic_type: HeuristicType,
+        start_point: Dim2D,
+        goal_point: Dim2D,
+        seed: int,
+    ) -> SearchTrace:
+        trace_key = Utils.get_trace_key(
+            graph_data, algorithm, heuristic_type, start_point, goal_point, seed
+        )
+        search_trace = trace_cache.get(trace_key)
+        if search_trace is None:
+            search_trace = Utils.create_search_trace(
+                graph_data, algorithm, heuristic_type, start_point, goal_point
+            )
+            trace_cache.put(trace_key, search_trace)
+        return search_trace
+
+    # Runs every registered algorithm from the same start and goal, each on
+    # its own seeded graph so that the order they run in does not matter
+    @staticmethod
+    def compare_search_algorithms(
+        graph_data: GraphData,
+        heuristic_type: HeuristicType,
+        start_point: Dim2D,
+        goal_point: Dim2D,
+        seed: int,
+        trace_cache: TraceCache,
+    ) -> List[SearchStatistics]:
+        return [
+            Utils.create_cached_search_trace(
+                trace_cache,
+                Utils.get_seeded_graph_data(graph_data, seed),
+                algorithm,
+                heuristic_type,
+                start_point,
+                goal_point,
+                seed,
+            ).statistics
+            for algorithm in SEARCH_STRATEGIES
+        ]
 
     @staticmethod
     def get_default_status_dictionary():
@@ -180,6 +641,18 @@ class Utils:
             Status.SHOULD_PLAY_FORWARD: True,
             Status.SHOULD_RESET: False,
             Status.OPTIONS_SET: False,
+            Status.SEEK_STEP: None,
+            Status.SHOULD_COMPARE: False,
+            Status.SHOW_PROFILER: False,
+            Status.SHOULD_CYCLE_COLOUR_SCHEME: False,
+            # Pixels to pan by, accumulated until the next tick
+            Status.VIEWPORT_PAN: None,
+            # Zoom steps and the pixel to zoom around
+            Status.VIEWPORT_ZOOM: None,
+            Status.DRAG_POINT: None,
+            # Pixels of the cells to block or free on the next tick
+            Status.TOGGLE_POINTS: None,
+            Status.SHOW_CLUSTERS: False,
         }
 
     @staticmethod
@@ -188,6 +661,15 @@ class Utils:
             Options.TILE_SIZE: Dim2D(10, 10),
             Options.GRID_SIZE: Dim2D(60, 60),
             Options.STEPS_PER_SECOND: 60,
+            Options.FRAMES_PER_SECOND: 60,
+            Options.SEARCH_MODE: SearchMode.TRACE,
+            Options.RENDER_BACKEND: RenderBackend.CANVAS_RECTANGLES,
+            Options.ALGORITHM: Algorithm.DEPTH_FIRST_SEARCH,
+            Options.HEURISTIC: HeuristicType.MANHATTAN,
+            Options.MAP_PATH: "",
+            Options.TRACE_CACHE_PATH: "",
+            Options.TRACE_PATH: "",
+            Options.SEED: None,
         }
 
 
@@ -220,11 +702,65 @@ class GuiUtils:
             ButtonData(
                 "options", Button.open_options, [status_dictionary, current_options]
             ),
+            ButtonData("compare", Button.compare, status_dictionary),
+            ButtonData("profile", Button.toggle_profiler, status_dictionary),
+            ButtonData("colours", Button.cycle_colour_scheme, status_dictionary),
+            ButtonData("clusters", Button.toggle_clusters, status_dictionary),
         ]
         GuiUtils.create_widgets(others_buttons, others_frame)
 
+        statistics_frame = TkinterSingleton.create_frame_with_pack(PackData(side=None))
+        GuiUtils.create_widgets(
+            [
+                LabelData("", id_="statistics_label"),
+                LabelData("", id_="profiler_label"),
+            ],
+            statistics_frame,
+        )
+
+    # Arrow keys and dragging pan, the mouse wheel and +/- zoom
+    @staticmethod
+    def bind_viewport_controls(status_dictionary):
+        for key, direction in (
+            ("<Left>", Dim2D(-1, 0)),
+            ("<Right>", Dim2D(1, 0)),
+            ("<Up>", Dim2D(0, -1)),
+            ("<Down>", Dim2D(0, 1)),
+        ):
+            TkinterSingleton.bind_root(
+                key,
+                lambda _, direction=direction: ViewportControl.on_key_pan(
+                    status_dictionary, direction
+                ),
+            )
+        for key, steps in (("<plus>", 1), ("<equal>", 1), ("<minus>", -1)):
+            TkinterSingleton.bind_root(
+                key,
+                lambda _, steps=steps: ViewportControl.zoom(status_dictionary, steps),
+            )
+        TkinterSingleton.bind_canvas(
+            "<ButtonPress-1>",
+            lambda event: ViewportControl.on_drag_start(status_dictionary, event),
+        )
+        TkinterSingleton.bind_canvas(
+            "<B1-Motion>",
+            lambda event: ViewportControl.on_drag(status_dictionary, event),
+        )
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            TkinterSingleton.bind_canvas(
+                sequence,
+                lambda event: ViewportControl.on_mouse_wheel(status_dictionary, event),
+            )
+
+    @staticmethod
+    def bind_cell_controls(status_dictionary):
+        TkinterSingleton.bind_canvas(
+            "<ButtonPress-3>",
+            lambda event: CellControl.on_toggle(status_dictionary, event),
+        )
+
     @staticmethod
-    def create_slider_layer(current_options):
+    def create_slider_layer(status_dictionary, current_options):
         slider_frame = TkinterSingleton.create_frame_with_pack(PackData(side=None))
         sliders = [
             ScaleData(
@@ -233,11 +769,48 @@ class GuiUtils:
                 callback_function=Scale.on_scale,
                 parameters=current_options,
                 from_=1,
-                to=1000,
+                to=20000,
                 orientation="horizontal",
-            )
+            ),
+            LabelData(GuiUtils.get_achieved_speed_text(0), id_="achieved_speed_label"),
+            ScaleData(
+                text="Step",
+                id_="timeline_scaler",
+                callback_function=Scale.on_seek,
+                parameters=status_dictionary,
+                from_=0,
+                to=1,
+                orientation="horizontal",
+                length=400,
+            ),
         ]
         GuiUtils.create_widgets(sliders, slider_frame)
         TkinterSingleton.widgets["speed_scaler"].set(
             current_options[Options.STEPS_PER_SECOND]
         )
+
+    @staticmethod
+    def get_achieved_speed_text(steps_per_second):
+        return f"Achieved: {round(steps_per_second)} steps/s"
+
+    @staticmethod
+    def update_timeline(step, number_of_steps):
+        timeline_scaler = TkinterSingleton.widgets["timeline_scaler"]
+        timeline_scaler.configure(to=max(1, number_of_steps))
+        timeline_scaler.set(step)
+
+    @staticmethod
+    def update_statistics(statistics: List[SearchStatistics]):
+        TkinterSingleton.widgets["statistics_label"].configure(
+            text="\n".join(str(search_statistics) for search_statistics in statistics)
+        )
+
+    @staticmethod
+    def update_achieved_speed(steps_per_second):
+        TkinterSingleton.widgets["achieved_speed_label"].configure(
+            text=GuiUtils.get_achieved_speed_text(steps_per_second)
+        )
+
+    @staticmethod
+    def update_profiler_overlay(text):
+        TkinterSingleton.widgets["profiler_label"].configure(text=text)
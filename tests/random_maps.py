@@ -0,0 +1,53 @@
+import random
+from typing import List, Optional, Tuple
+
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from graph_search.algorithms import SearchStrategy
+from graph_search.grid_graph import GridGraph
+
+
+# Sides from one cell up to a few clusters of the hierarchical search, so grids
+# narrower than a cluster come up often
+def create_random_grid_graph(
+    random_generator: random.Random, maximum_side: int = 40, wall_ratio: float = 0.35
+) -> GridGraph:
+    grid_size = Dim2D(
+        random_generator.randint(1, maximum_side),
+        random_generator.randint(1, maximum_side),
+    )
+    blocked = bytearray(
+        random_generator.random() < wall_ratio for _ in range(grid_size.x * grid_size.y)
+    )
+    return GridGraph(grid_size, blocked)
+
+
+# None when every cell is blocked
+def get_random_problem(
+    random_generator: random.Random, grid_graph: GridGraph
+) -> Optional[Tuple[int, int]]:
+    free_cells = [
+        cell
+        for cell in range(grid_graph.number_of_cells)
+        if not grid_graph.blocked[cell]
+    ]
+    if not free_cells:
+        return None
+    return random_generator.choice(free_cells), random_generator.choice(free_cells)
+
+
+def get_path(
+    search_strategy: SearchStrategy, grid_graph: GridGraph, start_cell: int, goal_cell
+) -> List[int]:
+    return list(search_strategy.create_trace(grid_graph, start_cell, goal_cell).path)
+
+
+def assert_valid_path(
+    grid_graph: GridGraph, path: List[int], start_cell: int, goal_cell: int
+):
+    width = grid_graph.grid_size.x
+    assert path[0] == start_cell and path[-1] == goal_cell
+    assert not any(grid_graph.blocked[cell] for cell in path)
+    for cell, next_cell in zip(path, path[1:]):
+        (y, x), (next_y, next_x) = divmod(cell, width), divmod(next_cell, width)
+        assert abs(x - next_x) + abs(y - next_y) == 1
@@ -0,0 +1,121 @@
+import random
+from typing import List
+
+import pytest
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from graph_search.algorithms import (
+    SEARCH_STRATEGIES,
+    Algorithm,
+    BreadthFirstSearch,
+    LifelongPlanningAStar,
+)
+from graph_search.grid_graph import GridGraph
+from tests.random_maps import (
+    assert_valid_path,
+    create_random_grid_graph,
+    get_path,
+    get_random_problem,
+)
+
+SHORTEST_PATH_ALGORITHMS = [
+    Algorithm.BREADTH_FIRST_SEARCH,
+    Algorithm.DIJKSTRA,
+    Algorithm.A_STAR,
+    Algorithm.LIFELONG_PLANNING_A_STAR,
+    Algorithm.JUMP_POINT_SEARCH,
+]
+
+
+def create_narrow_grid_graph(random_generator: random.Random) -> GridGraph:
+    grid_size = Dim2D(random_generator.randint(1, 3), random_generator.randint(1, 60))
+    if random_generator.random() < 0.5:
+        grid_size = Dim2D(grid_size.y, grid_size.x)
+    blocked = bytearray(
+        random_generator.random() < 0.2 for _ in range(grid_size.x * grid_size.y)
+    )
+    return GridGraph(grid_size, blocked)
+
+
+@pytest.mark.parametrize("algorithm", list(Algorithm))
+@pytest.mark.parametrize(
+    "create_grid_graph", [create_random_grid_graph, create_narrow_grid_graph]
+)
+def test_paths_match_breadth_first_search(algorithm, create_grid_graph):
+    random_generator = random.Random(algorithm.value)
+    for _ in range(60):
+        grid_graph = create_grid_graph(random_generator)
+        problem = get_random_problem(random_generator, grid_graph)
+        if problem is None:
+            continue
+        path = get_path(SEARCH_STRATEGIES[algorithm](), grid_graph, *problem)
+        shortest_path = get_path(BreadthFirstSearch(), grid_graph, *problem)
+        assert bool(path) == bool(shortest_path)
+        if not path:
+            continue
+        assert_valid_path(grid_graph, path, *problem)
+        if algorithm in SHORTEST_PATH_ALGORITHMS:
+            assert len(path) == len(shortest_path)
+        else:
+            assert len(path) >= len(shortest_path)
+
+
+# Without a goal, the searches that do not need one expand every reachable cell
+@pytest.mark.parametrize(
+    "algorithm", [Algorithm.DEPTH_FIRST_SEARCH, Algorithm.BREADTH_FIRST_SEARCH]
+)
+def test_searches_without_a_goal_expand_every_reachable_cell(algorithm):
+    random_generator = random.Random(algorithm.value)
+    for _ in range(30):
+        grid_graph = create_random_grid_graph(random_generator)
+        problem = get_random_problem(random_generator, grid_graph)
+        if problem is None:
+            continue
+        start_cell, _ = problem
+        trace = SEARCH_STRATEGIES[algorithm]().create_trace(grid_graph, start_cell)
+        reachable_cells = set()
+        open_cells = [start_cell]
+        while open_cells:
+            cell = open_cells.pop()
+            if cell not in reachable_cells:
+                reachable_cells.add(cell)
+                open_cells.extend(grid_graph.get_neighbour_cells(cell))
+        assert sorted(trace.steps) == sorted(reachable_cells)
+        assert not trace.path
+
+
+def get_returned_path(steps) -> List[int]:
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+
+# Walls toggled a few at a time, as in the GUI, away from the start and goal
+@pytest.mark.parametrize("seed", range(4))
+def test_repaired_paths_match_a_new_search(seed):
+    random_generator = random.Random(seed)
+    for _ in range(20):
+        grid_graph = create_random_grid_graph(random_generator, wall_ratio=0.25)
+        problem = get_random_problem(random_generator, grid_graph)
+        if problem is None:
+            continue
+        planner = LifelongPlanningAStar(grid_graph, *problem)
+        get_returned_path(planner.get_steps())
+        for _ in range(5):
+            cells = [
+                cell
+                for cell in random_generator.sample(
+                    range(grid_graph.number_of_cells),
+                    min(4, grid_graph.number_of_cells),
+                )
+                if cell not in problem
+            ]
+            for cell in cells:
+                grid_graph.blocked[cell] ^= 1
+            path = get_returned_path(planner.get_repair_steps(cells))
+            shortest_path = get_path(BreadthFirstSearch(), grid_graph, *problem)
+            assert len(path) == len(shortest_path)
+            if path:
+                assert_valid_path(grid_graph, path, *problem)
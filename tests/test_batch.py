@@ -0,0 +1,25 @@
+import pytest
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from graph_search.algorithms import Algorithm, HeuristicType
+from graph_search.batch import create_seeded_problem
+from graph_search.utils import Utils
+
+
+# The GUI gives each search a copy of the graph seeded like this, so the same
+# trace key means the same trace in the batch, the GUI and a shared cache
+@pytest.mark.parametrize("seed", range(5))
+def test_seeded_problem_trace_matches_the_gui_trace(seed):
+    graph_data, start_point, goal_point = create_seeded_problem(seed, Dim2D(30, 30))
+    search_arguments = (
+        Algorithm.DEPTH_FIRST_SEARCH,
+        HeuristicType.MANHATTAN,
+        start_point,
+        goal_point,
+    )
+    batch_trace = Utils.create_search_trace(graph_data, *search_arguments)
+    gui_trace = Utils.create_search_trace(
+        Utils.get_seeded_graph_data(graph_data, seed), *search_arguments
+    )
+    assert list(batch_trace.steps) == list(gui_trace.steps)
+    assert list(batch_trace.path) == list(gui_trace.path)
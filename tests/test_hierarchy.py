@@ -0,0 +1,93 @@
+import random
+
+import pytest
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from graph_search import hierarchy
+from graph_search.algorithms import BreadthFirstSearch, HierarchicalAStarSearch
+from graph_search.grid_graph import GridGraph, np
+from graph_search.hierarchy import ClusterAbstraction
+from tests.random_maps import (
+    assert_valid_path,
+    create_random_grid_graph,
+    get_path,
+    get_random_problem,
+)
+
+
+@pytest.mark.skipif(np is None, reason="NumPy is not installed")
+@pytest.mark.parametrize("cluster_side", [4, ClusterAbstraction.DEFAULT_CLUSTER_SIDE])
+def test_numpy_distances_match_python_distances(monkeypatch, cluster_side):
+    random_generator = random.Random(cluster_side)
+    for _ in range(100):
+        grid_graph = create_random_grid_graph(random_generator)
+        numpy_abstraction = ClusterAbstraction(grid_graph, cluster_side)
+        with monkeypatch.context() as patch:
+            patch.setattr(hierarchy, "np", None)
+            python_abstraction = ClusterAbstraction(grid_graph, cluster_side)
+        assert numpy_abstraction.distances == python_abstraction.distances
+
+
+# An 18x33 map with 35% walls used to fail, as cells at the end of a row
+# stepped to the start of the next one
+def test_grids_narrower_than_a_cluster_find_valid_paths():
+    random_generator = random.Random(18)
+    width, height = 18, 33
+    for _ in range(100):
+        blocked = bytearray(
+            random_generator.random() < 0.35 for _ in range(width * height)
+        )
+        grid_graph = GridGraph(Dim2D(width, height), blocked)
+        problem = get_random_problem(random_generator, grid_graph)
+        path = get_path(HierarchicalAStarSearch(), grid_graph, *problem)
+        shortest_path = get_path(BreadthFirstSearch(), grid_graph, *problem)
+        assert bool(path) == bool(shortest_path)
+        if path:
+            assert_valid_path(grid_graph, path, *problem)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_paths_are_valid_and_no_shorter_than_breadth_first(seed):
+    random_generator = random.Random(seed)
+    for _ in range(75):
+        grid_graph = create_random_grid_graph(random_generator, maximum_side=70)
+        problem = get_random_problem(random_generator, grid_graph)
+        if problem is None:
+            continue
+        path = get_path(HierarchicalAStarSearch(), grid_graph, *problem)
+        shortest_path = get_path(BreadthFirstSearch(), grid_graph, *problem)
+        assert bool(path) == bool(shortest_path)
+        if path:
+            assert_valid_path(grid_graph, path, *problem)
+            assert len(path) >= len(shortest_path)
+
+
+def test_updated_abstraction_matches_a_new_one():
+    random_generator = random.Random(0)
+    grid_graph = create_random_grid_graph(random_generator, wall_ratio=0.2)
+    abstraction = ClusterAbstraction(grid_graph, 8)
+    cells = random_generator.sample(range(grid_graph.number_of_cells), 5)
+    for cell in cells:
+        grid_graph.blocked[cell] ^= 1
+    abstraction.update(cells, grid_graph.blocked)
+    new_abstraction = ClusterAbstraction(grid_graph, 8)
+    assert abstraction.crossings == new_abstraction.crossings
+    assert abstraction.distances == new_abstraction.distances
+
+
+def test_cached_abstraction_is_not_changed_by_later_walls():
+    random_generator = random.Random(1)
+    blocked = bytearray(random_generator.random() < 0.2 for _ in range(40 * 40))
+    grid_graph = GridGraph(Dim2D(40, 40), blocked)
+    abstraction = hierarchy.get_cluster_abstraction(grid_graph, 8)
+    crossings = {cell: set(others) for cell, others in abstraction.crossings.items()}
+    distances = dict(abstraction.distances)
+    blocked = bytes(abstraction.blocked)
+    for cell in random_generator.sample(range(grid_graph.number_of_cells), 5):
+        grid_graph.blocked[cell] ^= 1
+    updated_abstraction = hierarchy.get_cluster_abstraction(grid_graph, 8)
+    assert updated_abstraction is not abstraction
+    assert updated_abstraction.blocked == grid_graph.blocked
+    assert abstraction.crossings == crossings
+    assert abstraction.distances == distances
+    assert abstraction.blocked == blocked
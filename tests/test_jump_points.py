@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+from graph_search.grid_graph import np
+from graph_search.jump_points import (
+    create_jump_distances,
+    create_jump_distances_with_numpy,
+)
+from tests.random_maps import create_random_grid_graph
+
+
+@pytest.mark.skipif(np is None, reason="NumPy is not installed")
+@pytest.mark.parametrize("wall_ratio", [0.05, 0.2, 0.4])
+def test_numpy_jump_distances_match_python_jump_distances(wall_ratio):
+    random_generator = random.Random(int(wall_ratio * 100))
+    for _ in range(50):
+        grid_graph = create_random_grid_graph(random_generator, wall_ratio=wall_ratio)
+        arguments = (grid_graph.grid_size.x, grid_graph.grid_size.y)
+        blocked = bytes(grid_graph.blocked)
+        numpy_distances = create_jump_distances_with_numpy(*arguments, blocked)
+        python_distances = create_jump_distances(*arguments, blocked)
+        free_cells = [
+            cell for cell in range(grid_graph.number_of_cells) if not blocked[cell]
+        ]
+        for direction in ("east", "west", "south", "north"):
+            numpy_direction = getattr(numpy_distances, direction)
+            python_direction = getattr(python_distances, direction)
+            assert [numpy_direction[cell] for cell in free_cells] == [
+                python_direction[cell] for cell in free_cells
+            ]
+
+
+# Two free cells, then a wall, in a single row
+def test_jump_distances_count_free_cells_before_a_wall():
+    jump_distances = create_jump_distances(4, 1, bytes([0, 0, 0, 1]))
+    assert list(jump_distances.east[:3]) == [-2, -1, 0]
+    assert list(jump_distances.west[:3]) == [0, -1, -2]
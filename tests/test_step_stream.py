@@ -0,0 +1,41 @@
+from dekespo_ai_sdk.core.dimensions import Dim2D
+
+from graph_search.algorithms import BreadthFirstSearch
+from graph_search.grid_graph import GridGraph
+from graph_search.step_stream import SearchWorker
+
+
+class FailingSearch(BreadthFirstSearch):
+    def get_steps(self, grid_graph, start_cell, goal_cell=None):
+        yield start_cell
+        raise ValueError("No way through")
+
+
+def get_steps(search_worker: SearchWorker):
+    steps = []
+    while not search_worker.channel.is_finished:
+        chunk = search_worker.channel.get_nowait()
+        if chunk is not None:
+            steps.extend(chunk)
+    search_worker.join()
+    return steps
+
+
+def test_worker_finishes_with_path_and_statistics():
+    grid_graph = GridGraph(Dim2D(8, 8), bytearray(64))
+    search_worker = SearchWorker(BreadthFirstSearch(), grid_graph, 0, 63)
+    search_worker.start()
+    steps = get_steps(search_worker)
+    assert search_worker.error is None
+    assert search_worker.statistics.expansions == len(steps)
+    assert len(search_worker.path) == 15
+
+
+def test_worker_keeps_the_error_of_a_failed_search():
+    grid_graph = GridGraph(Dim2D(8, 8), bytearray(64))
+    search_worker = SearchWorker(FailingSearch(), grid_graph, 0, 63)
+    search_worker.start()
+    get_steps(search_worker)
+    assert isinstance(search_worker.error, ValueError)
+    assert search_worker.statistics is None
+    assert not search_worker.path
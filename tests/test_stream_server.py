@@ -0,0 +1,179 @@
+import asyncio
+
+from graph_search.algorithms import Algorithm, BreadthFirstSearch, HeuristicType
+from graph_search.batch import BatchRun, create_batch_problem
+from graph_search.stream_server import (
+    StreamFrameType,
+    StreamServer,
+    StreamView,
+    StreamViewer,
+    read_stream_frames,
+)
+from graph_search.utils import CellState, Utils
+
+
+def get_batch_run(seed: int, algorithm: Algorithm) -> BatchRun:
+    return BatchRun(seed, 30, algorithm, HeuristicType.MANHATTAN)
+
+
+async def start_serving(stream_server: StreamServer) -> asyncio.Task:
+    serving = asyncio.create_task(stream_server.serve("127.0.0.1", 0))
+    # The event is made once serving starts
+    while stream_server.is_serving is None:
+        await asyncio.sleep(0)
+    await stream_server.is_serving.wait()
+    return serving
+
+
+# Serves the runs to one viewer and returns the view at the end of each run
+async def watch_runs(batch_runs):
+    stream_server = StreamServer(batch_runs, frame_delay_in_milliseconds=0)
+    serving = await start_serving(stream_server)
+    stream_view = StreamView()
+    finished_views = []
+    async for frame_type, payload in read_stream_frames(
+        "127.0.0.1", stream_server.port
+    ):
+        stream_view.apply(frame_type, payload)
+        if frame_type in (StreamFrameType.END, StreamFrameType.ERROR):
+            finished_views.append(
+                (stream_view.statistics, stream_view.error, stream_view.algorithm)
+            )
+    await serving
+    return finished_views
+
+
+def test_failed_search_ends_its_run_with_an_error(monkeypatch):
+    def get_failing_steps(_self, _grid_graph, start_cell, _goal_cell=None):
+        yield start_cell
+        raise ValueError("No way through")
+
+    monkeypatch.setattr(BreadthFirstSearch, "get_steps", get_failing_steps)
+    finished_views = asyncio.run(
+        watch_runs(
+            [
+                get_batch_run(1, Algorithm.BREADTH_FIRST_SEARCH),
+                get_batch_run(2, Algorithm.A_STAR),
+            ]
+        )
+    )
+    (failed_statistics, error, _), (statistics, no_error, algorithm) = finished_views
+    assert failed_statistics is None and "No way through" in error
+    assert no_error is None and algorithm == Algorithm.A_STAR
+    assert statistics.expansions > 0
+
+
+# The cell states, path and expansions a viewer should end the run with
+def get_finished_run(batch_run: BatchRun):
+    graph_data, start_point, goal_point = create_batch_problem(batch_run)
+    search_trace = Utils.create_search_trace(
+        graph_data,
+        batch_run.algorithm,
+        batch_run.heuristic_type,
+        start_point,
+        goal_point,
+    )
+    cell_states = bytearray(graph_data.grid_graph.blocked)
+    for cell in search_trace.steps:
+        cell_states[cell] = CellState.VISITED
+    cell_states[search_trace.steps[-1]] = CellState.CURRENT
+    return cell_states, list(search_trace.path), len(search_trace)
+
+
+async def watch_until_the_end(port: int, first_frame: asyncio.Event) -> StreamView:
+    stream_view = StreamView()
+    async for frame_type, payload in read_stream_frames("127.0.0.1", port):
+        stream_view.apply(frame_type, payload)
+        first_frame.set()
+    return stream_view
+
+
+# The second viewer writes its frames slowly enough to fall behind and skip
+# to snapshots, and still ends where the first one does
+def test_slow_and_fast_viewers_end_with_the_last_run(monkeypatch):
+    batch_runs = [
+        BatchRun(1, 60, Algorithm.DEPTH_FIRST_SEARCH, HeuristicType.MANHATTAN),
+        BatchRun(2, 60, Algorithm.A_STAR, HeuristicType.MANHATTAN),
+    ]
+    viewers = []
+    create_viewer = StreamViewer.__init__
+
+    def create_slow_viewer(viewer, writer, is_websocket):
+        create_viewer(viewer, writer, is_websocket)
+        viewers.append(viewer)
+        if len(viewers) == 1:
+            return
+        drain = writer.drain
+
+        async def drain_slowly():
+            await asyncio.sleep(0.002)
+            await drain()
+
+        writer.drain = drain_slowly
+
+    monkeypatch.setattr(StreamViewer, "__init__", create_slow_viewer)
+
+    async def watch():
+        stream_server = StreamServer(
+            batch_runs, steps_per_frame=20, frame_delay_in_milliseconds=0
+        )
+        serving = await start_serving(stream_server)
+        first_frame = asyncio.Event()
+        fast_watching = asyncio.create_task(
+            watch_until_the_end(stream_server.port, first_frame)
+        )
+        await first_frame.wait()
+        slow_view = await watch_until_the_end(stream_server.port, asyncio.Event())
+        fast_view = await fast_watching
+        await serving
+        return fast_view, slow_view
+
+    fast_view, slow_view = asyncio.run(asyncio.wait_for(watch(), 60))
+    cell_states, path, expansions = get_finished_run(batch_runs[-1])
+    for stream_view in (fast_view, slow_view):
+        assert stream_view.algorithm == Algorithm.A_STAR
+        assert stream_view.cell_states == cell_states
+        assert stream_view.path == path
+        assert stream_view.number_of_steps == expansions
+        assert stream_view.statistics.expansions == expansions
+    fast_viewer, slow_viewer = viewers
+    assert fast_viewer.number_of_resyncs == 0
+    assert slow_viewer.number_of_resyncs > 0
+
+
+# The only viewer leaves partway through the run, and the next one picks it up
+def test_run_pauses_without_viewers(monkeypatch):
+    batch_run = BatchRun(1, 60, Algorithm.DEPTH_FIRST_SEARCH, HeuristicType.MANHATTAN)
+    stream_server = StreamServer(
+        [batch_run], steps_per_frame=20, frame_delay_in_milliseconds=5
+    )
+    viewers_per_frame = []
+    broadcast_steps = getattr(StreamServer, "_broadcast_steps")
+
+    def count_viewers(server, *arguments):
+        viewers_per_frame.append(len(server.viewers))
+        return broadcast_steps(server, *arguments)
+
+    monkeypatch.setattr(StreamServer, "_broadcast_steps", count_viewers)
+
+    async def watch():
+        serving = await start_serving(stream_server)
+        frames = read_stream_frames("127.0.0.1", stream_server.port)
+        for _ in range(5):
+            await frames.__anext__()
+        await frames.aclose()
+        while stream_server.viewers:
+            await asyncio.sleep(0.01)
+        number_of_frames = len(viewers_per_frame)
+        await asyncio.sleep(0.2)
+        assert len(viewers_per_frame) == number_of_frames
+        stream_view = await watch_until_the_end(stream_server.port, asyncio.Event())
+        await serving
+        return stream_view
+
+    stream_view = asyncio.run(asyncio.wait_for(watch(), 60))
+    cell_states, path, expansions = get_finished_run(batch_run)
+    assert stream_view.cell_states == cell_states
+    assert stream_view.path == path
+    assert stream_view.statistics.expansions == expansions
+    assert 0 not in viewers_per_frame
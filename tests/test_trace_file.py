@@ -0,0 +1,66 @@
+import random
+
+from graph_search.algorithms import Algorithm, DepthFirstSearch, HeuristicType
+from graph_search.trace_file import MappedSearchTrace, TraceKey, write_trace_file
+from tests.random_maps import create_random_grid_graph, get_random_problem
+
+
+def create_search_trace():
+    random_generator = random.Random(0)
+    grid_graph = create_random_grid_graph(random_generator, wall_ratio=0.2)
+    while (problem := get_random_problem(random_generator, grid_graph)) is None:
+        grid_graph = create_random_grid_graph(random_generator, wall_ratio=0.2)
+    search_trace = DepthFirstSearch().create_trace(grid_graph, *problem)
+    return grid_graph, problem, search_trace
+
+
+# Short chunks, so that reads cross chunk boundaries
+def test_mapped_trace_reads_what_was_written(tmp_path):
+    grid_graph, (start_cell, goal_cell), search_trace = create_search_trace()
+    trace_key = TraceKey.create(
+        grid_graph,
+        start_cell,
+        goal_cell,
+        Algorithm.DEPTH_FIRST_SEARCH,
+        HeuristicType.MANHATTAN,
+        0,
+    )
+    trace_path = str(tmp_path / "run.trace")
+    write_trace_file(
+        trace_path, search_trace, trace_key, grid_graph.blocked, chunk_length=7
+    )
+    with MappedSearchTrace(trace_path) as mapped_trace:
+        assert mapped_trace.key == trace_key
+        assert mapped_trace.read_blocked() == grid_graph.blocked
+        assert mapped_trace.grid_size == search_trace.grid_size
+        assert mapped_trace.start_cell == start_cell
+        assert mapped_trace.goal_cell == goal_cell
+        assert mapped_trace.statistics == search_trace.statistics
+        assert list(mapped_trace.path) == list(search_trace.path)
+        assert len(mapped_trace) == len(search_trace)
+        number_of_steps = len(search_trace)
+        for step in random.Random(1).sample(range(number_of_steps), 20):
+            assert mapped_trace[step] == search_trace[step]
+        assert mapped_trace[-1] == search_trace[-1]
+        assert list(mapped_trace.get_step_range(3, number_of_steps + 5)) == list(
+            search_trace.steps[3:]
+        )
+        assert list(mapped_trace.first_visit_steps) == list(
+            search_trace.first_visit_steps
+        )
+        loaded_trace = mapped_trace.load()
+    assert list(loaded_trace.steps) == list(search_trace.steps)
+    assert list(loaded_trace.path) == list(search_trace.path)
+
+
+def test_trace_without_problem_has_no_walls(tmp_path):
+    _, _, search_trace = create_search_trace()
+    trace_path = str(tmp_path / "run.trace")
+    write_trace_file(trace_path, search_trace)
+    with MappedSearchTrace(trace_path) as mapped_trace:
+        assert mapped_trace.key is None
+        assert not mapped_trace.has_walls
+        assert mapped_trace.read_blocked() is None
+        assert list(mapped_trace.get_step_range(0, len(mapped_trace))) == list(
+            search_trace.steps
+        )